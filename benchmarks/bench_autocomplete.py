@@ -0,0 +1,80 @@
+"""
+Benchmark: /game autocomplete title search.
+
+Times the old LIKE '%q%' scan, DatabaseHandler.search_game_titles (FTS5
+trigram MATCH) and the in-process AutocompleteIndex that GameService serves
+autocomplete from, on a large shared library.
+
+Usage: python -m benchmarks.bench_autocomplete
+"""
+
+import asyncio
+import random
+import sqlite3
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from utils.autocomplete import AutocompleteIndex
+from utils.database import DatabaseHandler
+
+GUILD_ID = 12345
+GAME_COUNT = 50_000
+QUERIES = ["port", "galactic", "sim", "xyzzy", "the", "war 3"]
+RUNS = 200
+
+
+def seed(db_path: str):
+    rng = random.Random(7)
+    words = ["Portal", "Galactic", "Simulator", "War", "Farm", "Space", "Deep", "Rock", "The", "Legend", "Craft", "Tycoon"]
+
+    def title(i):
+        return " ".join(rng.sample(words, 3)) + f" {i} " + "".join(rng.choices(string.ascii_lowercase, k=4))
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO games (title, guild_id, notes) VALUES (?, ?, ?)",
+                     [(title(i), rng.choice([GUILD_ID, 0, 999]), "") for i in range(GAME_COUNT)])
+    conn.commit()
+    conn.close()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(db_path=str(Path(tmp) / "bench.db"))
+        await db.setup_tables()
+        seed(db.db_path)
+
+        async def legacy(q):
+            async with db.get_connection(readonly=True) as conn:
+                async with conn.execute("SELECT title FROM games WHERE title LIKE ? AND guild_id IN (?, 0) LIMIT 25",
+                                        (f"%{q}%", GUILD_ID)) as cursor:
+                    return await cursor.fetchall()
+
+        start = time.perf_counter()
+        index = AutocompleteIndex(await db.get_game_titles(GUILD_ID))
+        build_ms = (time.perf_counter() - start) * 1000
+
+        async def in_process(q):
+            return index.search(q)
+
+        print(f"Library: {GAME_COUNT} games. Median of {RUNS} runs per query.")
+        print(f"In-process index: {len(index)} titles, built once in {build_ms:.0f} ms")
+        print(f"{'query':<10} {'LIKE scan':>12} {'FTS5 MATCH':>12} {'in-process':>12}")
+        for q in QUERIES:
+            row = []
+            for fn in (legacy, lambda q: db.search_game_titles(q, GUILD_ID), in_process):
+                timings = []
+                for _ in range(RUNS):
+                    start = time.perf_counter()
+                    await fn(q)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                row.append(timings[len(timings) // 2] * 1000)
+            print(f"{q!r:<10} {row[0]:>9.3f} ms {row[1]:>9.3f} ms {row[2]:>9.3f} ms")
+
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
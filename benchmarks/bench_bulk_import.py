@@ -0,0 +1,74 @@
+"""
+Benchmark: seeding the game library.
+
+Compares the per-row add_game path (one transaction per game) with the
+streaming bulk_import_games importer, then runs a 100k-row import to show
+memory stays flat while the input is consumed from a generator.
+
+Usage: python -m benchmarks.bench_bulk_import
+"""
+
+import asyncio
+import tempfile
+import time
+import resource
+from pathlib import Path
+
+from utils.database import DatabaseHandler
+
+COMPARE_ROWS = 2_000
+LARGE_ROWS = 100_000
+TAGS = ["Automation", "Co-op", "Survival", "Space", "Shooter", "Puzzle", "Party", "Horror"]
+
+
+def records(count: int):
+    for i in range(count):
+        yield {
+            "title": f"Simulation {i:06d}",
+            "tags": TAGS[i % len(TAGS):][:3],
+            "min_players": 1,
+            "max_players": 1 + i % 8,
+            "notes": "Mandatory fun.",
+        }
+
+
+async def fresh_db(tmp: str, name: str) -> DatabaseHandler:
+    db = DatabaseHandler(db_path=str(Path(tmp) / f"{name}.db"))
+    await db.setup_tables()
+    return db
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = await fresh_db(tmp, "per_row")
+        start = time.perf_counter()
+        for record in records(COMPARE_ROWS):
+            fields = {k: v for k, v in record.items() if k not in ("title", "tags")}
+            await db.add_game(title=record["title"], added_by=0, guild_id=0, tags=record["tags"], **fields)
+        per_row = time.perf_counter() - start
+        await db.close()
+
+        db = await fresh_db(tmp, "bulk")
+        start = time.perf_counter()
+        await db.bulk_import_games(records(COMPARE_ROWS))
+        bulk = time.perf_counter() - start
+        await db.close()
+
+        print(f"{COMPARE_ROWS} games, per-row add_game:   {per_row * 1000:8.1f} ms")
+        print(f"{COMPARE_ROWS} games, bulk_import_games: {bulk * 1000:8.1f} ms  ({per_row / bulk:.0f}x faster)")
+
+        db = await fresh_db(tmp, "large")
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        counts = await db.bulk_import_games(records(LARGE_ROWS))
+        elapsed = time.perf_counter() - start
+        rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+        await db.close()
+
+        # ru_maxrss is in KB on Linux; growth includes SQLite's own page cache
+        print(f"{LARGE_ROWS} games, bulk_import_games: {elapsed:8.2f} s, "
+              f"peak RSS growth {rss_growth / 1024:.1f} MB, {counts}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark: get_game_library rating/tag aggregation.
+
+Compares the old single GROUP BY over games x ratings x tags against the
+per-game subquery version on a 10k-game, 100k-rating library.
+
+Usage: python -m benchmarks.bench_game_library
+"""
+
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from utils.database import DatabaseHandler
+
+GUILD_ID = 12345
+GAME_COUNT = 10_000
+RATING_COUNT = 100_000
+TAGS_PER_GAME = 3
+RUNS = 5
+
+LEGACY_QUERY = """
+    SELECT g.*,
+           AVG(r.rating) as avg_rating,
+           GROUP_CONCAT(t.name, ', ') as tags
+    FROM games g
+    LEFT JOIN game_ratings r ON g.id = r.game_id
+    LEFT JOIN game_tags gt ON g.id = gt.game_id
+    LEFT JOIN tags t ON gt.tag_id = t.id
+    WHERE g.guild_id IN (?, 0)
+    GROUP BY g.id ORDER BY g.title ASC
+"""
+
+
+def seed(db_path: str):
+    """Fill the database synchronously; we're timing reads, not the seeding."""
+    rng = random.Random(42)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO games (title, guild_id, min_players, max_players) VALUES (?, ?, 1, 4)",
+                     [(f"Game {i:05d}", GUILD_ID) for i in range(GAME_COUNT)])
+    conn.executemany("INSERT INTO tags (name, guild_id) VALUES (?, ?)",
+                     [(f"Tag {i}", GUILD_ID) for i in range(50)])
+    conn.executemany("INSERT OR IGNORE INTO game_tags (game_id, tag_id) VALUES (?, ?)",
+                     [(g, rng.randint(1, 50)) for g in range(1, GAME_COUNT + 1) for _ in range(TAGS_PER_GAME)])
+    conn.executemany("INSERT OR IGNORE INTO game_ratings (game_id, user_id, guild_id, rating) VALUES (?, ?, ?, ?)",
+                     [(rng.randint(1, GAME_COUNT), u, GUILD_ID, rng.randint(1, 10)) for u in range(RATING_COUNT)])
+    conn.commit()
+    conn.close()
+
+
+async def time_it(label: str, fn):
+    timings = []
+    result = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = await fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings) * 1000
+    print(f"{label:<28} best of {RUNS}: {best:8.1f} ms  ({len(result)} rows)")
+    return result
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(db_path=str(Path(tmp) / "bench.db"))
+        await db.setup_tables()
+        seed(db.db_path)
+
+        async def legacy():
+            async with db.get_connection(readonly=True) as conn:
+                async with conn.execute(LEGACY_QUERY, (GUILD_ID,)) as cursor:
+                    return await cursor.fetchall()
+
+        print(f"Library: {GAME_COUNT} games, {RATING_COUNT} ratings, {TAGS_PER_GAME} tags/game")
+        legacy_rows = await time_it("legacy GROUP BY join", legacy)
+        rows = await time_it("per-game subqueries", lambda: db.get_game_library(GUILD_ID))
+
+        # Same averages, but the legacy tag lists repeat once per rating
+        legacy_tags = max(len(r[-1].split(", ")) for r in legacy_rows if r[-1])
+        new_tags = max(len(r["tags"].split(", ")) for r in rows if r["tags"])
+        print(f"Longest tag list: legacy {legacy_tags} entries, subqueries {new_tags} entries")
+
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
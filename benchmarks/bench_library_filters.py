@@ -0,0 +1,98 @@
+"""
+Benchmark: multi-criteria /game list filtering.
+
+Compares the SQL path (DatabaseHandler.get_game_library / count_games with
+chained predicates and per-tag FTS subqueries) against the cached bitmap
+filter engine (GameLibraryCache) on a 10k-game library, for single filters
+and multi-tag AND/OR combinations.
+
+Usage: python -m benchmarks.bench_library_filters
+"""
+
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from utils.database import DatabaseHandler
+from utils.game_cache import GameLibraryCache
+
+GUILD_ID = 12345
+GAME_COUNT = 10_000
+TAG_COUNT = 40
+TAGS_PER_GAME = 4
+RUNS = 20
+
+QUERIES = [
+    ("status", {"status_filter": "playing"}),
+    ("players", {"player_count": 5}),
+    ("one tag", {"tag_filter": "Tag 07"}),
+    ("3 tags, AND", {"tag_filter": ["Tag 01", "Tag 02", "Tag 03"]}),
+    ("3 tags, OR", {"tag_filter": ["Tag 11", "Tag 22", "Tag 33"], "match_all_tags": False}),
+    ("tags+status+players", {"tag_filter": ["Tag 05", "Tag 06"], "match_all_tags": False,
+                             "status_filter": "played", "player_count": 4}),
+]
+
+
+def seed(db_path: str):
+    """Fill the database synchronously; we're timing reads, not the seeding."""
+    rng = random.Random(3)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO games (title, guild_id, min_players, max_players, status) VALUES (?, ?, ?, ?, ?)",
+        [(f"Game {i:05d}", GUILD_ID, rng.randint(1, 4), rng.choice([2, 4, 8, 16, 65535]),
+          rng.choice(["playing", "played", "unknown", "wishlisted", "avoid"])) for i in range(GAME_COUNT)])
+    conn.executemany("INSERT INTO tags (name, guild_id) VALUES (?, ?)",
+                     [(f"Tag {i:02d}", GUILD_ID) for i in range(TAG_COUNT)])
+    conn.executemany("INSERT OR IGNORE INTO game_tags (game_id, tag_id) VALUES (?, ?)",
+                     [(g, rng.randint(1, TAG_COUNT)) for g in range(1, GAME_COUNT + 1) for _ in range(TAGS_PER_GAME)])
+    conn.commit()
+    conn.close()
+
+
+async def median_ms(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(db_path=str(Path(tmp) / "bench.db"))
+        await db.setup_tables()
+        seed(db.db_path)
+        # Rebuild the FTS index over the raw-inserted rows
+        async with db.get_connection() as conn:
+            await db._index_games(conn, range(1, GAME_COUNT + 1))
+            await conn.commit()
+
+        cache = GameLibraryCache(db)
+        start = time.perf_counter()
+        await cache.count(GUILD_ID)
+        print(f"Library: {GAME_COUNT} games, {TAG_COUNT} tags, {TAGS_PER_GAME} links/game. "
+              f"Cache load + index build: {(time.perf_counter() - start) * 1000:.0f} ms")
+        print(f"Median of {RUNS} runs.")
+        print(f"{'filters':<22} {'rows':>6} {'SQL count':>11} {'bitmap count':>13} {'SQL page':>10} {'bitmap page':>12}")
+
+        for label, filters in QUERIES:
+            rows = await cache.count(GUILD_ID, **filters)
+            assert rows == await db.count_games(GUILD_ID, **filters)
+            timings = [
+                await median_ms(lambda: db.count_games(GUILD_ID, **filters)),
+                await median_ms(lambda: cache.count(GUILD_ID, **filters)),
+                await median_ms(lambda: db.get_game_library(GUILD_ID, limit=10, **filters)),
+                await median_ms(lambda: cache.get_page(GUILD_ID, limit=10, **filters)),
+            ]
+            print(f"{label:<22} {rows:>6} " + " ".join(f"{t:>8.2f} ms" for t in timings))
+
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark: per-request ClientSession vs the shared Ollama session.
+
+Starts a stub Ollama server on localhost (answers /api/generate instantly
+after an optional artificial delay) and compares the old pattern, a fresh
+aiohttp.ClientSession per call, against AIHandler's long-lived session with
+a pooled TCPConnector. Since the stub does no work, the difference is the
+connection setup/teardown each request used to pay; against a remote box
+add the real round trip (and DNS lookup) on top.
+
+Usage: python -m benchmarks.bench_ollama_session
+"""
+
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from config import BotConfig
+from utils.ai_handler import AIHandler
+
+RUNS = 300
+CONCURRENCY = [1, 8]
+# Simulated generation time in seconds; 0 isolates the connection overhead
+DELAY = 0.0
+
+
+async def start_stub():
+    async def generate(request):
+        body = await request.json()
+        if DELAY:
+            await asyncio.sleep(DELAY)
+        return web.json_response({"model": body["model"], "response": "Science!", "done": True})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+async def generate_per_call(url: str, model: str, prompt: str) -> str:
+    """The old AIHandler._generate: a new session (and connection) every call."""
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json={"model": model, "prompt": prompt, "stream": False}) as resp:
+            resp.raise_for_status()
+            return (await resp.json()).get("response", "")
+
+
+async def run(fn, concurrency: int) -> list:
+    """Per-request latencies (ms) for RUNS calls issued `concurrency` at a time."""
+    timings = []
+
+    async def one(i):
+        start = time.perf_counter()
+        await fn(f"prompt {i}")
+        timings.append((time.perf_counter() - start) * 1000)
+
+    for batch in range(0, RUNS, concurrency):
+        await asyncio.gather(*(one(i) for i in range(batch, min(batch + concurrency, RUNS))))
+    return sorted(timings)
+
+
+def summary(timings: list) -> str:
+    return f"p50 {timings[len(timings) // 2]:6.2f} ms  p99 {timings[int(len(timings) * 0.99)]:6.2f} ms"
+
+
+async def main():
+    runner, port = await start_stub()
+    BotConfig.OLLAMA_URL = f"http://127.0.0.1:{port}"
+    BotConfig.OLLAMA_URLS = []
+    handler = AIHandler(db_handler=None)
+    # Measure connection handling, not the scheduler's queueing
+    handler.scheduler.max_concurrent = max(CONCURRENCY)
+    await handler.start()
+    url = f"{handler.pool.backends[0].url}/api/generate"
+
+    print(f"{RUNS} requests against a stub Ollama on port {port}\n")
+    try:
+        for concurrency in CONCURRENCY:
+            # Warm up both paths once
+            await generate_per_call(url, handler.model_name, "warmup")
+            await handler._generate("warmup")
+
+            per_call = await run(lambda p: generate_per_call(url, handler.model_name, p), concurrency)
+            shared = await run(handler._generate, concurrency)
+            saved = per_call[len(per_call) // 2] - shared[len(shared) // 2]
+            print(f"concurrency {concurrency}")
+            print(f"  session per call: {summary(per_call)}")
+            print(f"  shared session:   {summary(shared)}")
+            print(f"  saved per request (p50): {saved:.2f} ms\n")
+    finally:
+        await handler.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""
+Benchmark: item-item collaborative filtering recommender.
+
+Builds a GuildRatingModel for a guild with thousands of users and games, then
+times incremental rating updates and per-user / per-game queries.
+
+Usage: python -m benchmarks.bench_recommender
+"""
+
+import random
+import time
+
+from utils.recommender import GuildRatingModel
+
+USERS = 3_000
+GAMES = 2_000
+RATINGS_PER_USER = 40
+RUNS = 200
+
+
+def ratings(rng: random.Random):
+    # Users fall into taste groups so similarities aren't pure noise
+    rows = []
+    for user in range(USERS):
+        group = user % 20
+        for game in rng.sample(range(GAMES), RATINGS_PER_USER):
+            liked = game % 20 == group
+            rows.append((user, game, rng.randint(7, 10) if liked else rng.randint(1, 6)))
+    return rows
+
+
+def time_it(label: str, fn):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{label:<28} median {timings[len(timings) // 2] * 1000:8.3f} ms   p99 {timings[int(len(timings) * 0.99)] * 1000:8.3f} ms")
+
+
+def main():
+    rng = random.Random(11)
+    rows = ratings(rng)
+
+    start = time.perf_counter()
+    model = GuildRatingModel(rows)
+    print(f"{USERS} users x {GAMES} games, {len(rows)} ratings: full build {time.perf_counter() - start:.2f} s")
+
+    time_it("recommend for user", lambda: model.recommend(rng.randrange(USERS), 10))
+    time_it("similar games", lambda: model.similar(rng.randrange(GAMES), 10))
+    time_it("incremental rating update", lambda: model.update(rng.randrange(USERS), rng.randrange(GAMES), rng.randint(1, 10)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: random game recommendations.
+
+Compares ORDER BY RANDOM() against DatabaseHandler.sample_games() (cached
+candidate ids + random.sample + primary key lookups) as the library grows
+from 100 to 100k games.
+
+Usage: python -m benchmarks.bench_sample_games
+"""
+
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from utils.database import DatabaseHandler
+
+GUILD_ID = 12345
+SIZES = [100, 1_000, 10_000, 100_000]
+LIMIT = 5
+RUNS = 50
+
+LEGACY_QUERY = """
+    SELECT title, min_players, max_players, notes FROM games
+    WHERE guild_id IN (?, 0) AND max_players >= ?
+    ORDER BY RANDOM() LIMIT ?
+"""
+
+
+def seed(db_path: str, count: int):
+    """Fill the database synchronously; we're timing reads, not the seeding."""
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO games (title, guild_id, min_players, max_players, notes) VALUES (?, ?, 1, ?, ?)",
+                     [(f"Game {i:06d}", GUILD_ID, 2 + i % 7, "x" * 200) for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+async def time_it(fn) -> float:
+    """Median latency in milliseconds over RUNS calls."""
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+async def run_size(count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(db_path=str(Path(tmp) / "bench.db"))
+        await db.setup_tables()
+        seed(db.db_path, count)
+
+        async def legacy():
+            async with db.get_connection(readonly=True) as conn:
+                async with conn.execute(LEGACY_QUERY, (GUILD_ID, 4, LIMIT)) as cursor:
+                    return await cursor.fetchall()
+
+        legacy_ms = await time_it(legacy)
+        sampled_ms = await time_it(lambda: db.sample_games(GUILD_ID, min_players=4, limit=LIMIT))
+        print(f"{count:>8} games   ORDER BY RANDOM() {legacy_ms:8.2f} ms   sample_games {sampled_ms:6.2f} ms")
+
+        await db.close()
+
+
+async def main():
+    print(f"Median of {RUNS} calls, {LIMIT} picks, max_players >= 4")
+    for count in SIZES:
+        await run_size(count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
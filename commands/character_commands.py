@@ -14,10 +14,10 @@ class CharacterCommands(commands.Cog):
         self.config = bot.config
         self.ai_handler = bot.ai_handler
     
-    async def _get_character_response(self, character: str, user_input: str = None):
+    async def _get_character_response(self, character: str, user_input: str = None, user_id: int = None):
         """Get a response from a character, AI first then fallback"""
         if user_input and self.ai_handler.is_available():
-            ai_response = await self.ai_handler.get_character_response(character, user_input)
+            ai_response = await self.ai_handler.get_character_response(character, user_input, user_id=user_id)
             if ai_response:
                 return ai_response
         
@@ -28,14 +28,14 @@ class CharacterCommands(commands.Cog):
     @app_commands.command(name='hank', description="Get a Hank Hill response")
     async def hank_command(self, interaction: discord.Interaction, user_input: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('hank', user_input)
+        response = await self._get_character_response('hank', user_input, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['hank']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
     @app_commands.command(name='dale', description="Dale Gribble conspiracy wisdom")
     async def dale_command(self, interaction: discord.Interaction, user_input: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('dale', user_input)
+        response = await self._get_character_response('dale', user_input, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['dale']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
@@ -55,7 +55,7 @@ class CharacterCommands(commands.Cog):
     @app_commands.command(name='cartman', description="Cartman being Cartman")
     async def cartman_command(self, interaction: discord.Interaction, user_input: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('cartman', user_input)
+        response = await self._get_character_response('cartman', user_input, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['cartman']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
@@ -63,7 +63,7 @@ class CharacterCommands(commands.Cog):
     @app_commands.command(name='redgreen', description="Get Red Green's handy advice")
     async def red_green_command(self, interaction: discord.Interaction, problem: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('redgreen', problem)
+        response = await self._get_character_response('redgreen', problem, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['redgreen']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
@@ -71,7 +71,7 @@ class CharacterCommands(commands.Cog):
     @app_commands.command(name='trek', description="Get a Star Trek technical solution")
     async def trek_command(self, interaction: discord.Interaction, problem: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('trek', problem)
+        response = await self._get_character_response('trek', problem, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['trek']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
@@ -80,7 +80,7 @@ class CharacterCommands(commands.Cog):
     async def conspiracy_command(self, interaction: discord.Interaction, topic: str = None):
         await interaction.response.defer()
         if topic and self.ai_handler.is_available():
-            ai_response = await self.ai_handler.get_character_response('alexjones', topic)
+            ai_response = await self.ai_handler.get_character_response('alexjones', topic, user_id=interaction.user.id)
             if ai_response:
                 char_info = self.config.CHARACTER_INFO['alexjones']
                 await interaction.followup.send(f"{char_info['name']}: {ai_response}")
@@ -106,21 +106,21 @@ class CharacterCommands(commands.Cog):
     @app_commands.command(name='snake', description="Solid Snake tactical wisdom")
     async def snake_command(self, interaction: discord.Interaction, user_input: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('snake', user_input)
+        response = await self._get_character_response('snake', user_input, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['snake']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
     @app_commands.command(name='kratos', description="Kratos godly wisdom and rage")
     async def kratos_command(self, interaction: discord.Interaction, user_input: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('kratos', user_input)
+        response = await self._get_character_response('kratos', user_input, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['kratos']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
     @app_commands.command(name='dante', description="Dante's wisdom from the depths of hell")
     async def dante_command(self, interaction: discord.Interaction, user_input: str = None):
         await interaction.response.defer()
-        response = await self._get_character_response('dante', user_input)
+        response = await self._get_character_response('dante', user_input, interaction.user.id)
         char_info = self.config.CHARACTER_INFO['dante']
         await interaction.followup.send(f"{char_info['name']}: {response}")
     
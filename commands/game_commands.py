@@ -9,6 +9,121 @@ from typing import List, Optional
 
 logger = logging.getLogger(__name__)
 
+LIBRARY_PAGE_SIZE = 10
+
+class LibraryPageView(discord.ui.View):
+    """
+    Prev/next pager for /game list. Only the page on screen is held by the view;
+    each button press fetches the neighbouring page by keyset (title, id) from
+    GameService's cached filter bitmaps.
+    """
+    def __init__(self, game_service, guild_id: int, filters: dict, header: str):
+        super().__init__(timeout=300)
+        self.game_service = game_service
+        self.guild_id = guild_id
+        self.filters = filters
+        self.header = header
+        self.message = None
+        
+        self.games = []
+        self.page = 0
+        self.total = 0
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // LIBRARY_PAGE_SIZE))
+
+    def _key(self, game) -> tuple:
+        return (game['title'], game['id'])
+
+    async def load_first_page(self) -> bool:
+        """Fetch the total and the first page. Returns False if nothing matched."""
+        self.total = await self.game_service.count_library(self.guild_id, **self.filters)
+        self.games = await self.game_service.get_library_page(self.guild_id, limit=LIBRARY_PAGE_SIZE, **self.filters)
+        self.page = 0
+        self._update_buttons()
+        return bool(self.games)
+
+    def _update_buttons(self):
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = self.page + 1 >= self.page_count
+
+    def build_embed(self) -> discord.Embed:
+        description = self.header + f"\nTotal Simulations: {self.total}"
+        
+        embed = discord.Embed(
+            title="🔬 Aperture Science Mandatory Fun Modules",
+            description=description,
+            color=0xFFA500 # Aperture Orange
+        )
+        
+        # Helper to format game line
+        def format_game(g):
+            rating = f"{g['avg_rating']:.1f}" if g['avg_rating'] else "N/A"
+            players = f"{g['min_players']}-{g['max_players']}"
+            ideal = f" (Ideal: {g['ideal_players']})" if g['ideal_players'] else ""
+            state = f"[{g['release_state']}]" if g['release_state'] else ""
+            return f"• **{g['title']}** {state}\n  ╚ Rating: {rating}/10 | Players: {players}{ideal}"
+
+        # Group the page by status if no status filter is applied
+        if not self.filters.get('status_filter'):
+            for status in ["playing", "wishlisted", "unknown", "played", "avoid"]:
+                status_games = [g for g in self.games if (g['status'] or 'unknown').lower() == status]
+                if status_games:
+                    field_value = ""
+                    for game in status_games:
+                         field_value += format_game(game) + "\n"
+                    
+                    if len(field_value) > 1024: field_value = field_value[:1020] + "..."
+                    embed.add_field(name=f"📂 {status.title()}", value=field_value, inline=False)
+        else:
+            # Simple flat list if filtered by status
+            field_value = ""
+            for game in self.games:
+                field_value += format_game(game) + "\n"
+            
+            if len(field_value) > 4000: field_value = field_value[:4000] + "..." # Description limit
+            embed.description += "\n\n" + field_value
+
+        footer = "Testing must continue indefinitely."
+        if self.page_count > 1:
+            footer += f" | Page {self.page + 1}/{self.page_count}"
+        embed.set_footer(text=footer)
+        return embed
+
+    async def _show(self, interaction: discord.Interaction, games: list, page: int):
+        if not games:
+            # The library shrank underneath us; start over from the top
+            await self.load_first_page()
+        else:
+            self.games = games
+            self.page = page
+            self._update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="Prev", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        games = await self.game_service.get_library_page(
+            self.guild_id, limit=LIBRARY_PAGE_SIZE, before=self._key(self.games[0]), **self.filters
+        )
+        await self._show(interaction, games, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        games = await self.game_service.get_library_page(
+            self.guild_id, limit=LIBRARY_PAGE_SIZE, after=self._key(self.games[-1]), **self.filters
+        )
+        await self._show(interaction, games, self.page + 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
 class GameCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -97,12 +212,18 @@ class GameCommands(commands.Cog):
         await interaction.followup.send(message)
 
     @game_group.command(name="list", description="View the dossier of available simulations")
-    @app_commands.autocomplete(tag_search=tag_autocomplete)
+    @app_commands.autocomplete(tag_search=tags_autocomplete)
     @app_commands.rename(
-        tag_search="tag",
+        tag_search="tags",
+        tag_mode="tag-mode",
         players="players",
         release_state="release-state"
     )
+    @app_commands.describe(tag_search="One or more tags, comma separated")
+    @app_commands.choices(tag_mode=[
+        app_commands.Choice(name="Match all tags", value="all"),
+        app_commands.Choice(name="Match any tag", value="any")
+    ])
     @app_commands.choices(status_filter=[
         app_commands.Choice(name="Unknown", value="unknown"),
         app_commands.Choice(name="Playing", value="playing"),
@@ -119,69 +240,82 @@ class GameCommands(commands.Cog):
                          status_filter: app_commands.Choice[str] = None,
                          tag_search: str = None,
                          players: int = None,
-                         release_state: app_commands.Choice[str] = None):
+                         release_state: app_commands.Choice[str] = None,
+                         tag_mode: app_commands.Choice[str] = None):
         """List all games with optional filtering"""
         await interaction.response.defer()
         
         status_val = status_filter.value if status_filter else None
         state_val = release_state.value if release_state else None
+        tag_list = [t.strip() for t in tag_search.split(',') if t.strip()] if tag_search else []
+        match_all = not tag_mode or tag_mode.value == "all"
         
-        # Async DB Call
-        games = await self.game_service.get_library(
-            guild_id=interaction.guild.id,
-            status_filter=status_val,
-            tag_search=tag_search,
-            players=players,
-            release_state=state_val
-        )
+        filters = {
+            'status_filter': status_val,
+            'tag_search': tag_list,
+            'players': players,
+            'release_state': state_val,
+            'match_all_tags': match_all
+        }
         
-        if not games:
-            msg = self.bot.dialogue.get('cave_johnson', 'game_list_empty')
-            await interaction.followup.send(msg)
-            return
-            
         desc = []
         if status_val: desc.append(f"Status: **{status_val.upper()}**")
         if state_val: desc.append(f"State: **{state_val.upper()}**")
-        if tag_search: desc.append(f"Tag: **{tag_search}**")
+        if tag_list:
+            joiner = " + " if match_all else " or "
+            desc.append(f"Tag{'s' if len(tag_list) > 1 else ''}: **{joiner.join(tag_list)}**")
         if players: desc.append(f"Player Count: **{players}**")
         
-        description = "\n".join(desc) + f"\nTotal Simulations: {len(games)}"
+        view = LibraryPageView(self.game_service, interaction.guild.id, filters, "\n".join(desc))
+        if not await view.load_first_page():
+            msg = self.bot.dialogue.get('cave_johnson', 'game_list_empty')
+            await interaction.followup.send(msg)
+            return
+        
+        if view.page_count > 1:
+            view.message = await interaction.followup.send(embed=view.build_embed(), view=view)
+        else:
+            await interaction.followup.send(embed=view.build_embed())
+
+    @game_group.command(name="recommend", description="Let the Aperture rating matrix pick your next simulation")
+    @app_commands.autocomplete(like=game_title_autocomplete, tag_search=tag_autocomplete)
+    @app_commands.rename(tag_search="tag")
+    async def recommend_games(self, interaction: discord.Interaction,
+                              like: str = None,
+                              players: int = None,
+                              tag_search: str = None):
+        """Recommend games from the server's ratings"""
+        await interaction.response.defer()
+        
+        games, personalised = await self.game_service.get_recommendations(
+            interaction.guild_id, interaction.user.id,
+            like_title=like, players=players, tag=tag_search
+        )
+        
+        if not games:
+            msg = self.bot.dialogue.get('cave_johnson', 'game_recommend_empty')
+            await interaction.followup.send(msg, ephemeral=True)
+            return
+        
+        if like:
+            description = f"Subjects who rated **{like}** also liked:"
+        else:
+            description = f"Selected for {interaction.user.mention} from their ratings:"
+        if not personalised:
+            description = "Not enough ratings to go on yet, so here are some random picks:"
         
         embed = discord.Embed(
-            title="🔬 Aperture Science Mandatory Fun Modules",
+            title="🧪 Aperture Science Recommended Testing",
             description=description,
             color=0xFFA500 # Aperture Orange
         )
         
-        # Helper to format game line
-        def format_game(g):
+        lines = []
+        for g in games:
             rating = f"{g['avg_rating']:.1f}" if g['avg_rating'] else "N/A"
-            players = f"{g['min_players']}-{g['max_players']}"
-            ideal = f" (Ideal: {g['ideal_players']})" if g['ideal_players'] else ""
-            state = f"[{g['release_state']}]" if g['release_state'] else ""
-            return f"• **{g['title']}** {state}\n  ╚ Rating: {rating}/10 | Players: {players}{ideal}"
-
-        # Group by status if no status filter is applied
-        if not status_val:
-            for status in ["playing", "wishlisted", "unknown", "played", "avoid"]:
-                status_games = [g for g in games if g['status'].lower() == status]
-                if status_games:
-                    field_value = ""
-                    for game in status_games:
-                         field_value += format_game(game) + "\n"
-                    
-                    if len(field_value) > 1024: field_value = field_value[:1020] + "..."
-                    embed.add_field(name=f"📂 {status.title()}", value=field_value, inline=False)
-        else:
-            # Simple flat list if filtered by status
-            field_value = ""
-            for game in games:
-                field_value += format_game(game) + "\n"
-            
-            if len(field_value) > 4000: field_value = field_value[:4000] + "..." # Description limit
-            embed.description += "\n\n" + field_value
-
+            lines.append(f"• **{g['title']}**\n  ╚ Rating: {rating}/10 | Players: {g['min_players']}-{g['max_players']}")
+        embed.add_field(name="📂 Simulations", value="\n".join(lines)[:1024], inline=False)
+        
         embed.set_footer(text="Testing must continue indefinitely.")
         await interaction.followup.send(embed=embed)
 
@@ -29,7 +29,7 @@ class ImageCog(commands.Cog):
                 # Notify user we are enhancing
                 await interaction.followup.send(self.bot.dialogue.get("system", "image_processing", prompt=prompt), ephemeral=True)
                 
-                enhanced_prompt = await self.bot.ai_handler.enhance_image_prompt(prompt)
+                enhanced_prompt = await self.bot.ai_handler.enhance_image_prompt(prompt, user_id=interaction.user.id)
                 
                 if enhanced_prompt == "SAFE_REFUSAL":
                     await interaction.channel.send(self.bot.dialogue.get("system", "image_denied"))
@@ -10,6 +10,8 @@ import io
 import asyncio
 from ping3 import ping
 
+from utils.streaming import relay_stream
+
 logger = logging.getLogger(__name__)
 
 class MiscCommands(commands.Cog):
@@ -24,17 +26,26 @@ class MiscCommands(commands.Cog):
         await interaction.response.defer()
         
         if self.ai_handler.is_available():
-            # Call the SAME handler that on_message uses
-            response = await self.ai_handler.get_chat_response(
-                user_id=interaction.user.id,
-                message=prompt,
-                guild_id=interaction.guild.id
-            )
+            # Call the SAME handler that on_message uses, streamed into the followup
+            msg = self.bot.dialogue.get('cave_johnson', 'ai_overheating')
+            try:
+                response = await relay_stream(
+                    self.ai_handler.stream_chat_response(
+                        user_id=interaction.user.id,
+                        message=prompt,
+                        guild_id=interaction.guild.id
+                    ),
+                    send=lambda text: interaction.followup.send(text, wait=True),
+                    edit=lambda sent, text: sent.edit(content=text),
+                    interval=self.config.AI_STREAM_EDIT_INTERVAL,
+                    failure_text=msg
+                )
+            except Exception as e:
+                # relay_stream already marked the reply as failed
+                logger.error(f"AI chat command failed: {e}")
+                return
             
-            if response:
-                await interaction.followup.send(f"{response}")
-            else:
-                msg = self.bot.dialogue.get('cave_johnson', 'ai_overheating')
+            if not response:
                 await interaction.followup.send(msg)
         else:
             msg = self.bot.dialogue.get('cave_johnson', 'ai_disabled')
@@ -54,7 +65,7 @@ class MiscCommands(commands.Cog):
         
         # Try AI first
         if self.ai_handler.is_available():
-            ai_response = await self.ai_handler.get_beer_recommendation(preferences)
+            ai_response = await self.ai_handler.get_beer_recommendation(preferences, user_id=interaction.user.id)
             if ai_response:
                 await interaction.followup.send(f"🍺 {ai_response}")
                 return
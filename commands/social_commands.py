@@ -37,7 +37,7 @@ class SocialCommands(commands.Cog):
         if self.ai_handler.is_available():
             history = await self.bot.db.get_ai_history(member.id, interaction.guild.id if interaction.guild else None, limit=15)
             
-            ai_response = await self.ai_handler.get_roast_response(character, member.display_name, chat_history=history)
+            ai_response = await self.ai_handler.get_roast_response(character, member.display_name, chat_history=history, user_id=interaction.user.id)
             if ai_response:
                 await interaction.followup.send(f"{member.mention} {char_info['name']}: {ai_response}")
                 return
@@ -72,7 +72,7 @@ class SocialCommands(commands.Cog):
             # fetch history for context
             history = await self.bot.db.get_ai_history(member.id, interaction.guild.id if interaction.guild else None, limit=15)
 
-            ai_response = await self.ai_handler.get_compliment_response(character, member.display_name, chat_history=history)
+            ai_response = await self.ai_handler.get_compliment_response(character, member.display_name, chat_history=history, user_id=interaction.user.id)
             if ai_response:
                 await interaction.followup.send(f"{char_info['name']}: {ai_response}")
                 return
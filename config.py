@@ -220,6 +220,60 @@ class BotConfig:
 
     # AI Configuration
     OLLAMA_URL = os.getenv('OLLAMA_URL')
+    # Comma-separated Ollama nodes to balance across (defaults to just OLLAMA_URL)
+    OLLAMA_URLS = [url.strip() for url in os.getenv('OLLAMA_URLS', '').split(',') if url.strip()]
+    # Seconds between /api/tags health probes (only run with more than one node)
+    OLLAMA_PROBE_INTERVAL_SECONDS = float(os.getenv('OLLAMA_PROBE_INTERVAL_SECONDS', '30'))
+    # Consecutive request failures before a node is ejected, and for how long
+    OLLAMA_MAX_FAILURES = int(os.getenv('OLLAMA_MAX_FAILURES', '3'))
+    OLLAMA_EJECT_SECONDS = float(os.getenv('OLLAMA_EJECT_SECONDS', '30'))
+    # Seconds to wait for a TCP connection to a node before counting it as failed
+    OLLAMA_CONNECT_TIMEOUT_SECONDS = float(os.getenv('OLLAMA_CONNECT_TIMEOUT_SECONDS', '5'))
+    # Longest a non-streamed generation may take before the request fails (and counts against the node)
+    OLLAMA_GENERATE_TIMEOUT_SECONDS = float(os.getenv('OLLAMA_GENERATE_TIMEOUT_SECONDS', '300'))
+    # Longest a streamed generation may go without sending a chunk (the first one includes prompt processing)
+    OLLAMA_STREAM_READ_TIMEOUT_SECONDS = float(os.getenv('OLLAMA_STREAM_READ_TIMEOUT_SECONDS', '120'))
+    # Connections AIHandler keeps open to Ollama (shared by every request)
+    OLLAMA_POOL_LIMIT = int(os.getenv('OLLAMA_POOL_LIMIT', '8'))
+    # Seconds an idle keep-alive connection is held open for reuse
+    OLLAMA_KEEPALIVE_SECONDS = float(os.getenv('OLLAMA_KEEPALIVE_SECONDS', '60'))
+    # Seconds a resolved Ollama host address is cached
+    OLLAMA_DNS_CACHE_SECONDS = int(os.getenv('OLLAMA_DNS_CACHE_SECONDS', '300'))
+    # Generations sent to each Ollama node at once; the rest wait in the scheduler queue
+    LLM_MAX_CONCURRENT = int(os.getenv('LLM_MAX_CONCURRENT', '2'))
+    # Requests allowed to wait per priority class before new ones are turned away
+    LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '20'))
+    # Cached responses for character, beer and image-prompt requests; 0 disables the cache
+    LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '512'))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', '86400'))
+    # Distinct responses collected per prompt before repeats are served from cache
+    LLM_CACHE_VARIANTS = int(os.getenv('LLM_CACHE_VARIANTS', '3'))
+    # Also keep cached responses in SQLite so they survive restarts ('1' or '0')
+    LLM_CACHE_PERSIST = os.getenv('LLM_CACHE_PERSIST', '1') == '1'
+    # Token budget for a chat prompt; the oldest history turns are dropped to stay under it
+    AI_PROMPT_TOKEN_BUDGET = int(os.getenv('AI_PROMPT_TOKEN_BUDGET', '1536'))
+    # Summarize a user's older chat turns once this many messages aren't in their summary yet
+    # (keep it at or below the 20-message chat window); 0 disables summaries
+    AI_SUMMARY_THRESHOLD = int(os.getenv('AI_SUMMARY_THRESHOLD', '20'))
+    # Newest messages left out of each summary so they stay verbatim in the prompt
+    AI_SUMMARY_KEEP_RECENT = int(os.getenv('AI_SUMMARY_KEEP_RECENT', '8'))
+    # Minimum seconds between edits while a streamed chat reply fills in
+    AI_STREAM_EDIT_INTERVAL = float(os.getenv('AI_STREAM_EDIT_INTERVAL', '1.0'))
+
+    # Database Configuration
+    # Reader connections kept open alongside the single writer
+    DB_READER_POOL_SIZE = int(os.getenv('DB_READER_POOL_SIZE', '4'))
+    # PRAGMA profile: 'fast' (WAL, synchronous=NORMAL) or 'durable' (WAL, synchronous=FULL)
+    DB_PRAGMA_PROFILE = os.getenv('DB_PRAGMA_PROFILE', 'fast')
+    # Guild game libraries kept in memory by GameService (least recently used are evicted)
+    GAME_LIBRARY_CACHE_GUILDS = int(os.getenv('GAME_LIBRARY_CACHE_GUILDS', '64'))
+
+    # AI History Retention
+    # Turns (user message + reply) kept per user; 0 disables the cap
+    AI_HISTORY_KEEP_TURNS = int(os.getenv('AI_HISTORY_KEEP_TURNS', '100'))
+    # Drop history older than this many days; 0 keeps it forever
+    AI_HISTORY_MAX_AGE_DAYS = int(os.getenv('AI_HISTORY_MAX_AGE_DAYS', '0'))
+    AI_HISTORY_PRUNE_INTERVAL_MINUTES = float(os.getenv('AI_HISTORY_PRUNE_INTERVAL_MINUTES', '60'))
 
     # Music Configuration
     MUSIC_DEFAULT_VOLUME = float(os.getenv('MUSIC_DEFAULT_VOLUME', '0.5'))
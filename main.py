@@ -18,6 +18,8 @@ from utils.ai_handler import AIHandler
 from utils.reaction_handler import ReactionHandler
 from utils.database import DatabaseHandler
 from utils.dialogue_manager import DialogueManager
+from utils.history_retention import HistoryRetention
+from utils.streaming import relay_stream
 from commands.character_commands import CharacterCommands
 from commands.social_commands import SocialCommands
 from commands.game_commands import GameCommands
@@ -53,15 +55,29 @@ class DoodsBot(commands.Bot):
         self.config = BotConfig()
         
         # Initialize Database
-        self.db = DatabaseHandler()
+        self.db = DatabaseHandler(
+            reader_pool_size=self.config.DB_READER_POOL_SIZE,
+            pragma_profile=self.config.DB_PRAGMA_PROFILE
+        )
         
         # Initialize Service Layer abstractions
         self.dialogue = DialogueManager()
         
         self.gift_service = GiftService(self.db)
-        self.game_service = GameService(self.db, self.dialogue)
+        self.game_service = GameService(
+            self.db,
+            self.dialogue,
+            library_cache_size=self.config.GAME_LIBRARY_CACHE_GUILDS
+        )
         
         self.ai_handler = AIHandler(self.db, self)
+        self.history_retention = HistoryRetention(
+            self.db,
+            keep_turns=self.config.AI_HISTORY_KEEP_TURNS,
+            max_age_days=self.config.AI_HISTORY_MAX_AGE_DAYS,
+            interval_minutes=self.config.AI_HISTORY_PRUNE_INTERVAL_MINUTES,
+            response_cache=self.ai_handler.response_cache
+        )
         self.reaction_handler = ReactionHandler(self.dialogue)
         
         # User conversation histories for AI
@@ -71,6 +87,8 @@ class DoodsBot(commands.Bot):
         """Called when the bot is starting up"""
         # Setup Database Tables
         await self.db.setup_tables()
+        await self.ai_handler.start()
+        self.history_retention.start()
         
         # Add cogs
         await self.add_cog(CharacterCommands(self))
@@ -83,6 +101,13 @@ class DoodsBot(commands.Bot):
         await self.add_cog(MusicCommands(self))
         
         logger.info("All cogs loaded successfully")
+
+    async def close(self):
+        """Called when the bot is shutting down"""
+        await super().close()
+        await self.history_retention.stop()
+        await self.ai_handler.close()
+        await self.db.close()
     
     async def on_ready(self):
         """Called when bot connects to Discord"""
@@ -131,11 +156,20 @@ class DoodsBot(commands.Bot):
                             pass
                     # ---------------------------------
 
-                    response = await self.ai_handler.get_chat_response(message.author.id, content, guild_id, reply_context=reply_context)
-                    if response:
-                        await message.reply(response)
-                    else:
-                        await message.reply("🤖 *confused processing noises* (AI error)")
+                    # Stream the reply: post at the first token, then edit it as the rest arrives.
+                    # On failure relay_stream has already marked the reply with the overheating line.
+                    try:
+                        response = await relay_stream(
+                            self.ai_handler.stream_chat_response(message.author.id, content, guild_id, reply_context=reply_context),
+                            send=message.reply,
+                            edit=lambda sent, text: sent.edit(content=text),
+                            interval=self.config.AI_STREAM_EDIT_INTERVAL,
+                            failure_text=self.dialogue.get('cave_johnson', 'ai_overheating')
+                        )
+                        if not response:
+                            await message.reply("🤖 *confused processing noises* (AI error)")
+                    except Exception as e:
+                        logger.error(f"AI chat reply failed: {e}")
             else:
                 await message.reply("🤖 AI features are currently disabled (Missing API Key).")
         
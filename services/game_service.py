@@ -1,25 +1,29 @@
 import logging
 from typing import List, Tuple, Optional, Dict, Any
+from utils.database import format_recommendations
+from utils.game_cache import GameLibraryCache
+from utils.autocomplete import AutocompleteCache
+from utils.recommender import GameRecommender
 
 logger = logging.getLogger(__name__)
 
 class GameService:
     """Service layer for handling game registry and library logic."""
     
-    def __init__(self, db, dialogue_manager):
+    def __init__(self, db, dialogue_manager, library_cache_size: int = 64):
         self.db = db
         self.dialogue = dialogue_manager
+        self.library_cache = GameLibraryCache(db, max_guilds=library_cache_size)
+        self.autocomplete = AutocompleteCache(db, max_guilds=library_cache_size)
+        self.recommender = GameRecommender(db, max_guilds=library_cache_size)
 
     async def search_game_titles(self, current: str, guild_id: int) -> List[str]:
-        return await self.db.search_game_titles(current, guild_id)
+        return await self.autocomplete.search_titles(guild_id, current)
 
     async def get_filtered_tags(self, current: str, guild_id: int) -> List[str]:
-        tags = await self.db.get_tags(guild_id)
-        return [t for t in tags if current.lower() in t.lower()]
+        return await self.autocomplete.search_tags(guild_id, current)
 
     async def get_comma_separated_tags(self, current: str, guild_id: int) -> List[Tuple[str, str]]:
-        all_tags = await self.db.get_tags(guild_id)
-        
         if ',' in current:
             prefix, sep, search_term = current.rpartition(',')
             prefix += sep + " "
@@ -28,10 +32,10 @@ class GameService:
             prefix = ""
             search_term = current.strip()
 
-        filtered = [t for t in all_tags if search_term.lower() in t.lower()]
+        filtered = await self.autocomplete.search_tags(guild_id, search_term)
         
         choices = []
-        for t in filtered[:25]:
+        for t in filtered:
             display = f"{prefix}{t}"
             if len(display) > 100:
                 display = display[:97] + "..."
@@ -57,6 +61,8 @@ class GameService:
         )
         
         if game_id != -1:
+            self.library_cache.invalidate(guild_id)
+            self.autocomplete.add_game(guild_id, title, tag_list)
             msg = self.dialogue.get('cave_johnson', 'game_added_success', title=title)
             return True, msg
         else:
@@ -71,29 +77,56 @@ class GameService:
             else:
                 return False, self.dialogue.get('cave_johnson', 'game_rate_out_of_bounds')
 
-        games = await self.db.search_game_titles(title_search, guild_id)
-        if title_search not in games:
+        game_id = await self.db.get_game_id(title_search, guild_id)
+        if game_id is None:
              return False, self.dialogue.get('cave_johnson', 'game_rate_not_found', title_search=title_search)
 
-        library = await self.db.get_game_library(guild_id) 
-        game = next((g for g in library if g['title'] == title_search), None)
-        
-        if game:
-            await self.db.rate_game(game['id'], user_id, guild_id, score)
-            msg = self.dialogue.get('cave_johnson', 'game_rate_success', title_search=title_search, score=score)
-            return True, msg
-        else:
-            return False, self.dialogue.get('cave_johnson', 'system_error')
+        self.db.queue_rating(game_id, user_id, guild_id, score)
+        await self.recommender.record_rating(guild_id, user_id, game_id, score)
+        # avg_rating depends on every rating, so reload rather than patch
+        self.library_cache.invalidate_game(game_id)
+        msg = self.dialogue.get('cave_johnson', 'game_rate_success', title_search=title_search, score=score)
+        return True, msg
 
     async def get_library(self, guild_id: int, status_filter: str = None, tag_search: str = None, 
-                          players: int = None, release_state: str = None) -> List[Dict]:
-        """Fetch filtered game library."""
-        return await self.db.get_game_library(
+                          players: int = None, release_state: str = None, match_all_tags: bool = True) -> List[Dict]:
+        """Fetch filtered game library. `tag_search` may be one tag or a list of them."""
+        return await self.library_cache.get_library(
             guild_id=guild_id,
             status_filter=status_filter,
             tag_filter=tag_search,
             player_count=players,
-            release_state=release_state
+            release_state=release_state,
+            match_all_tags=match_all_tags
+        )
+
+    async def get_library_page(self, guild_id: int, status_filter: str = None, tag_search: str = None,
+                               players: int = None, release_state: str = None, match_all_tags: bool = True,
+                               limit: int = 10, after: Tuple[str, int] = None,
+                               before: Tuple[str, int] = None) -> List[Dict]:
+        """Fetch one keyset page of the filtered library from the cached filter bitmaps."""
+        return await self.library_cache.get_page(
+            guild_id=guild_id,
+            status_filter=status_filter,
+            tag_filter=tag_search,
+            player_count=players,
+            release_state=release_state,
+            match_all_tags=match_all_tags,
+            limit=limit,
+            after=after,
+            before=before
+        )
+
+    async def count_library(self, guild_id: int, status_filter: str = None, tag_search: str = None,
+                            players: int = None, release_state: str = None, match_all_tags: bool = True) -> int:
+        """Count the games matching the library filters."""
+        return await self.library_cache.count(
+            guild_id=guild_id,
+            status_filter=status_filter,
+            tag_filter=tag_search,
+            player_count=players,
+            release_state=release_state,
+            match_all_tags=match_all_tags
         )
 
     async def update_game(self, title_search: str, guild_id: int, updates: dict) -> Tuple[bool, str]:
@@ -101,9 +134,16 @@ class GameService:
         if not updates:
              return False, self.dialogue.get('cave_johnson', 'game_update_empty')
 
-        success = await self.db.update_game(title_search, guild_id, **updates)
+        # Only the guild's own games can be edited, never the global ones
+        game_id = await self.db.get_game_id(title_search, guild_id, include_global=False)
+        success = game_id is not None and await self.db.update_game(title_search, guild_id, **updates)
         
         if success:
+             if 'status' in updates:
+                 updates = {**updates, 'status': updates['status'].lower()}
+             self.library_cache.patch_game(guild_id, game_id, updates)
+             if 'title' in updates:
+                 self.autocomplete.rename_game(guild_id, title_search, updates['title'])
              changes = ", ".join(updates.keys())
              new_title = updates.get('title', title_search)
              msg = self.dialogue.get('cave_johnson', 'game_update_success', new_title=new_title, changes=changes)
@@ -111,3 +151,37 @@ class GameService:
         else:
              msg = self.dialogue.get('cave_johnson', 'game_update_fail', title_search=title_search)
              return False, msg
+
+    async def get_recommendations(self, guild_id: int, user_id: int, like_title: Optional[str] = None,
+                                  players: int = 0, tag: Optional[str] = None, limit: int = 10) -> Tuple[List[Dict], bool]:
+        """
+        Games for a user from the guild's ratings: the closest matches to `like_title`, or
+        predictions from the user's own ratings. Topped up with random picks when the
+        ratings don't say enough. Returns (games, whether any came from the ratings).
+        """
+        if like_title:
+            game_id = await self.db.get_game_id(like_title, guild_id)
+            if game_id is None:
+                return [], False
+            # Ask for extra so filtering still leaves enough
+            ranked = await self.recommender.similar_games(guild_id, game_id, limit=limit * 4)
+        else:
+            game_id = None
+            ranked = await self.recommender.recommend_for_user(guild_id, user_id, limit=limit * 4)
+
+        games = (await self.library_cache.get_games(guild_id, ranked, min_players=players or 0, tag=tag))[:limit]
+        personalised = bool(games)
+        if len(games) < limit:
+            exclude = {g['id'] for g in games} | {game_id}
+            games += await self.library_cache.sample(guild_id, min_players=players or 0, tag=tag,
+                                                     limit=limit - len(games), exclude=exclude)
+        return games, personalised
+
+    async def recommend_games(self, guild_id: int, min_players: int = 0, tag: Optional[str] = None, limit: int = 5,
+                              user_id: Optional[int] = None) -> str:
+        """Picks for the AI's game RAG context: rating-based for `user_id` when possible, otherwise random."""
+        if user_id is not None:
+            rows, _ = await self.get_recommendations(guild_id, user_id, players=min_players, tag=tag, limit=limit)
+        else:
+            rows = await self.library_cache.sample(guild_id, min_players=min_players, tag=tag, limit=limit)
+        return format_recommendations(rows)
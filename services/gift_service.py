@@ -26,7 +26,7 @@ class GiftService:
     async def get_wishlist(self, user_id: int, guild_id: int) -> List[Tuple]:
         """Retrieve a user's wishlist."""
         try:
-            async with self.db.get_connection() as conn:
+            async with self.db.get_connection(readonly=True) as conn:
                 async with conn.execute(
                     "SELECT id, item_name, link, claimed_by FROM gifts WHERE user_id = ? AND guild_id = ?", 
                     (user_id, guild_id)
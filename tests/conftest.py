@@ -32,6 +32,8 @@ async def temp_db(tmp_path):
     
     yield db
     
+    await db.close()
+    
 # (Deleted redundant real_temp_db)
 
 # -----------------------------------------------------------------------------
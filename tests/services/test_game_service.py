@@ -45,3 +45,80 @@ async def test_game_service_workflow(temp_db, tmp_path):
     assert len(library) == 1
     assert library[0]["status"] == "playing"
     assert library[0]["avg_rating"] == 10.0
+
+@pytest.mark.asyncio
+async def test_game_service_library_cache_stays_in_sync(temp_db):
+    """Writes through GameService are visible on the next cached read."""
+    service = GameService(temp_db, DialogueManager())
+    guild_id = 88
+
+    await service.add_game("Portal", 1, guild_id, 1, 2)
+    assert [g["title"] for g in await service.get_library(guild_id)] == ["Portal"]
+
+    await service.add_game("Valheim", 1, guild_id, 1, 10, tags="Survival")
+    assert [g["title"] for g in await service.get_library(guild_id, tag_search="surv")] == ["Valheim"]
+
+    await service.update_game("Valheim", guild_id, {"status": "Playing"})
+    assert (await service.get_library(guild_id, status_filter="playing"))[0]["title"] == "Valheim"
+
+    await service.rate_game("Portal", 7, 1, guild_id)
+    await service.rate_game("Portal", 9, 2, guild_id)
+    portal = (await service.get_library(guild_id, players=2))[0]
+    assert portal["avg_rating"] == 8.0 and portal["rating_count"] == 2
+
+    success, _ = await service.rate_game("Half-Life 3", 10, 1, guild_id)
+    assert success is False
+
+    text = await service.recommend_games(guild_id, min_players=5)
+    assert "Valheim" in text and "Portal" not in text
+    assert service.library_cache.hits > 0
+
+@pytest.mark.asyncio
+async def test_game_service_rename_and_global_games(temp_db):
+    """Renames go through the point lookup; global games can be rated but not edited."""
+    service = GameService(temp_db, DialogueManager())
+    await temp_db.add_game(title="Factorio", added_by=0, guild_id=0)
+    await service.add_game("Raft", 1, 88, 1, 8)
+    await service.get_library(88)
+
+    success, _ = await service.update_game("Raft", 88, {"title": "Raft 2"})
+    assert success is True
+    assert [g["title"] for g in await service.get_library(88)] == ["Factorio", "Raft 2"]
+
+    success, _ = await service.update_game("Factorio", 88, {"status": "played"})
+    assert success is False
+
+    success, _ = await service.rate_game("Factorio", 6, 1, 88)
+    assert success is True
+    factorio = next(g for g in await service.get_library(88) if g["title"] == "Factorio")
+    assert factorio["avg_rating"] == 6.0
+
+@pytest.mark.asyncio
+async def test_game_service_recommendations(temp_db):
+    """Recommendations come from ratings when there are some, random picks otherwise."""
+    service = GameService(temp_db, DialogueManager())
+    guild_id = 88
+    for title, players in (("Portal", 2), ("Portal 2", 2), ("Raft", 8), ("Valheim", 10)):
+        await service.add_game(title, 1, guild_id, 1, players)
+
+    games, personalised = await service.get_recommendations(guild_id, 1, limit=2)
+    assert len(games) == 2 and personalised is False
+
+    for user in (1, 2, 3):
+        await service.rate_game("Portal", 9, user, guild_id)
+        await service.rate_game("Portal 2", 10, user, guild_id)
+        await service.rate_game("Raft", 2, user, guild_id)
+    await service.rate_game("Portal", 10, 4, guild_id)
+    await service.rate_game("Raft", 1, 4, guild_id)
+
+    games, personalised = await service.get_recommendations(guild_id, 4, limit=1)
+    assert personalised is True and [g["title"] for g in games] == ["Portal 2"]
+
+    games, personalised = await service.get_recommendations(guild_id, 4, like_title="Portal", limit=1)
+    assert personalised is True and [g["title"] for g in games] == ["Portal 2"]
+
+    games, _ = await service.get_recommendations(guild_id, 4, players=8, limit=3)
+    assert {g["title"] for g in games} <= {"Raft", "Valheim"}
+
+    assert await service.get_recommendations(guild_id, 4, like_title="Half-Life 3") == ([], False)
+    assert "Portal 2" in await service.recommend_games(guild_id, user_id=4, limit=1)
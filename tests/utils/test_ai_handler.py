@@ -1,7 +1,45 @@
+import asyncio
+import json
 import pytest
+from aiohttp import web
 from unittest.mock import AsyncMock, patch
+from config import BotConfig
 from utils.ai_handler import AIHandler
 
+
+@pytest.fixture
+async def ollama_stub(monkeypatch):
+    """A local stand-in for Ollama's /api/generate that records the client port of every request."""
+    peers = []
+
+    async def generate(request):
+        peers.append(request.transport.get_extra_info("peername")[1])
+        body = await request.json()
+        if not body.get("stream"):
+            return web.json_response({"response": f"echo: {body['prompt']}"})
+
+        # Streaming: one JSON object per line, a few characters at a time
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        for word in ["Science ", "isn't ", "about ", "why."]:
+            await resp.write(json.dumps({"response": word, "done": False}).encode() + b"\n")
+        await resp.write(json.dumps({"response": "", "done": True}).encode() + b"\n")
+        await resp.write_eof()
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(BotConfig, "OLLAMA_URL", f"http://127.0.0.1:{port}")
+
+    yield peers
+
+    await runner.cleanup()
+
 @pytest.mark.asyncio
 async def test_get_chat_response(temp_db, mock_config, mocker):
     """
@@ -80,3 +118,123 @@ async def test_roast_response(temp_db, mock_config, mocker):
     handler.client.models.generate_content.assert_called_once()
     args, kwargs = handler.client.models.generate_content.call_args
     assert "Wheatley" in kwargs['contents'] # Check our generated prompt contents
+
+
+@pytest.mark.asyncio
+async def test_generate_reuses_one_connection(temp_db, ollama_stub):
+    """Sequential generations share the handler's session and its keep-alive connection."""
+    handler = AIHandler(temp_db, None)
+    await handler.start()
+    session = handler._session
+
+    assert await handler._generate("one") == "echo: one"
+    assert await handler._generate("two") == "echo: two"
+
+    assert handler._session is session
+    assert len(ollama_stub) == 2
+    assert len(set(ollama_stub)) == 1  # Same client port: the connection was reused
+
+    await handler.close()
+    assert session.closed
+    assert handler._session is None
+
+
+@pytest.mark.asyncio
+async def test_generate_opens_session_lazily(temp_db, ollama_stub):
+    """Without start() the first generation opens the session; after close() a new one is made."""
+    handler = AIHandler(temp_db, None)
+    assert await handler._generate("hi") == "echo: hi"
+    first = handler._session
+
+    await handler.close()
+    assert await handler._generate("again") == "echo: again"
+    assert handler._session is not first
+    await handler.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_response(temp_db, ollama_stub):
+    """Streamed fragments arrive in order and the finished turn is saved to history."""
+    handler = AIHandler(temp_db, None)
+    fragments = [f async for f in handler.stream_chat_response(user_id=1, message="Why?", guild_id=None)]
+    await handler.close()
+
+    assert fragments == ["Science ", "isn't ", "about ", "why."]
+    history = await temp_db.get_ai_history(user_id=1, guild_id=None)
+    assert history[-2:] == [("user", "Why?"), ("model", "Science isn't about why.")]
+
+
+@pytest.mark.asyncio
+async def test_character_responses_are_cached(temp_db, ollama_stub, monkeypatch):
+    """Repeats of a deterministic prompt are served from the response cache once enough variants exist."""
+    monkeypatch.setattr(BotConfig, "LLM_CACHE_VARIANTS", 1)
+    handler = AIHandler(temp_db, None)
+
+    first = await handler.get_character_response("hank", "propane")
+    second = await handler.get_character_response("hank", "propane")
+    await handler.close()
+
+    assert first == second and first.startswith("echo:")
+    assert len(ollama_stub) == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_prompts_share_a_generation(temp_db, ollama_stub):
+    """Several users asking the same thing at once cost one Ollama call."""
+    handler = AIHandler(temp_db, None)
+    results = await asyncio.gather(*(handler.enhance_image_prompt("a dog", user_id=i) for i in range(4)))
+    await handler.close()
+
+    assert len(set(results)) == 1
+    assert len(ollama_stub) == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_prompt_is_budgeted(temp_db, ollama_stub):
+    """The location appears once and old history is dropped to fit the token budget."""
+    handler = AIHandler(temp_db, None)
+    for i in range(20):
+        await temp_db.add_ai_message(user_id=1, guild_id=None, role="user", content=f"turn {i} " + "x" * 200)
+
+    handler.prompt_token_budget = 10_000
+    full = await handler._build_chat_prompt(user_id=1, message="Hi", guild_id=None)
+    assert full.count("LOCATION: Private Secure Line.") == 1
+    assert "turn 0 " in full and "turn 19 " in full
+
+    handler.prompt_token_budget = handler.count_tokens(full) - 100
+    trimmed = await handler._build_chat_prompt(user_id=1, message="Hi", guild_id=None)
+    assert handler.count_tokens(trimmed) <= handler.prompt_token_budget
+    assert "turn 0 " not in trimmed and "turn 19 " in trimmed
+    assert 'User: "Hi"' in trimmed
+
+
+@pytest.mark.asyncio
+async def test_chat_prompt_uses_summary_instead_of_old_turns(temp_db, ollama_stub):
+    handler = AIHandler(temp_db, None)
+    for i in range(3):
+        await temp_db.add_ai_message(user_id=1, guild_id=None, role="user", content=f"turn {i}")
+    await temp_db.save_ai_summary(1, "Tester prefers propane.", 2)
+
+    prompt = await handler._build_chat_prompt(user_id=1, message="Hi", guild_id=None)
+    assert "Tester prefers propane." in prompt
+    assert "turn 0" not in prompt and "turn 1" not in prompt
+    assert "turn 2" in prompt
+
+
+@pytest.mark.asyncio
+async def test_stream_failure_propagates_and_is_not_saved(temp_db, ollama_stub, monkeypatch):
+    handler = AIHandler(temp_db, None)
+
+    async def cut_off(prompt, priority, user_id):
+        yield "Science "
+        raise ConnectionError("stream reset")
+
+    monkeypatch.setattr(handler, "_stream", cut_off)
+    received = []
+    with pytest.raises(ConnectionError):
+        async for fragment in handler.stream_chat_response(user_id=1, message="Why?", guild_id=None):
+            received.append(fragment)
+    await handler.close()
+
+    assert received == ["Science "]
+    assert await temp_db.get_ai_history(user_id=1, guild_id=None) == []
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from utils.autocomplete import AutocompleteIndex, AutocompleteCache
+
+def test_index_ranks_prefix_then_length():
+    """Prefix hits come first, then shorter names, like search_game_titles."""
+    index = AutocompleteIndex(["Portal 2", "Portal", "Teleportation Lab", "Factorio", "Deep Rock Galactic"])
+
+    assert index.search("port") == ["Portal", "Portal 2", "Teleportation Lab"]
+    assert index.search("PO") == ["Portal", "Portal 2", "Teleportation Lab"]
+    assert index.search("rock gal") == ["Deep Rock Galactic"]
+    assert index.search("xyz") == []
+    assert index.search("") == ["Deep Rock Galactic", "Factorio", "Portal", "Portal 2", "Teleportation Lab"]
+    assert index.search("o", limit=2) == ["Portal", "Factorio"]
+
+def test_index_long_query_checks_adjacency():
+    """Longer queries need the whole substring, not just each trigram somewhere."""
+    index = AutocompleteIndex(["abcXbcd", "abcd"])
+    assert index.search("abcd") == ["abcd"]
+
+def test_index_add_remove_is_reference_counted():
+    """A title shared by a local and a global game stays until both are gone."""
+    index = AutocompleteIndex(["Raft", "Raft"])
+    index.rename("Raft", "Raft 2")
+    assert index.search("raft") == ["Raft", "Raft 2"]
+
+    index.remove("Raft")
+    assert index.search("raft") == ["Raft 2"]
+    assert "Raft" not in index and len(index) == 1
+
+@pytest.mark.asyncio
+async def test_cache_builds_once_and_tracks_writes(temp_db):
+    """The guild index is loaded once, then kept current without the database."""
+    await temp_db.add_game(title="Portal", added_by=1, guild_id=0, tags=["Puzzle"])
+    await temp_db.add_game(title="Valheim", added_by=1, guild_id=12345, tags=["Survival"])
+    cache = AutocompleteCache(temp_db)
+
+    assert await cache.search_titles(12345, "a") == ["Portal", "Valheim"]
+    assert await cache.search_tags(12345, "") == ["Puzzle", "Survival"]
+
+    # Writes behind the cache's back aren't seen...
+    await temp_db.add_game(title="Valley", added_by=1, guild_id=12345)
+    assert await cache.search_titles(12345, "val") == ["Valheim"]
+
+    # ...but the incremental hooks are
+    cache.add_game(12345, "Valley", ["Co-op", "Survival"])
+    cache.rename_game(12345, "Valheim", "Valheim Mistlands")
+    assert await cache.search_titles(12345, "val") == ["Valley", "Valheim Mistlands"]
+    assert await cache.search_tags(12345, "") == ["Co-op", "Puzzle", "Survival"]
+
+    cache.invalidate(0)
+    assert await cache.search_titles(12345, "val") == ["Valley", "Valheim"]
+
+async def held_build(cache, db, guild_id):
+    """Start building a guild's index and hold it after the titles were read. Returns (task, release)."""
+    loading, release = asyncio.Event(), asyncio.Event()
+    get_tags = db.get_tags
+
+    async def held_get_tags(guild_id):
+        loading.set()
+        await release.wait()
+        return await get_tags(guild_id)
+
+    db.get_tags = held_get_tags
+    task = asyncio.create_task(cache.search_titles(guild_id, ""))
+    await loading.wait()
+    db.get_tags = get_tags
+    return task, release
+
+@pytest.mark.asyncio
+async def test_cache_write_during_build_is_not_lost(temp_db):
+    """A game added or renamed while a guild's index is still loading isn't missing once it's loaded."""
+    await temp_db.add_game(title="Raft", added_by=1, guild_id=5)
+    cache = AutocompleteCache(temp_db)
+
+    build, release = await held_build(cache, temp_db, 5)
+    await temp_db.add_game(title="Portal 2", added_by=1, guild_id=5)
+    cache.add_game(5, "Portal 2")
+    release.set()
+    await build
+    assert await cache.search_titles(5, "portal") == ["Portal 2"]
+
+    cache.invalidate(5)
+    build, release = await held_build(cache, temp_db, 5)
+    await temp_db.update_game("Raft", guild_id=5, title="Raft 2")
+    cache.rename_game(5, "Raft", "Raft 2")
+    release.set()
+    await build
+    assert await cache.search_titles(5, "raft") == ["Raft 2"]
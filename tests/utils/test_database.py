@@ -1,4 +1,9 @@
 import pytest
+import asyncio
+import sqlite3
+import aiosqlite
+
+from utils.database import DatabaseHandler
 
 @pytest.mark.asyncio
 async def test_database_initialization(temp_db):
@@ -140,3 +145,409 @@ async def test_recommend_games(temp_db):
     # Search for non-existent
     result_empty = await temp_db.recommend_games(guild_id=12345, min_players=10)
     assert "No simulations found" in result_empty
+
+@pytest.mark.asyncio
+async def test_connection_pool_reuses_connections(temp_db):
+    """Pooled connections should be long-lived and reset between borrowers."""
+    async with temp_db.get_connection() as conn:
+        writer = conn
+        conn.row_factory = aiosqlite.Row
+
+    async with temp_db.get_connection() as conn:
+        assert conn is writer, "Writer connection was not reused."
+        assert conn.row_factory is None, "Row factory leaked to the next borrower."
+
+    # Readers are read-only and come from a separate set of connections
+    async with temp_db.get_connection(readonly=True) as conn:
+        assert conn is not writer
+        with pytest.raises(sqlite3.OperationalError):
+            await conn.execute("INSERT INTO tags (name, guild_id) VALUES ('Nope', 1)")
+
+@pytest.mark.asyncio
+async def test_concurrent_pooled_reads(temp_db):
+    """More concurrent readers than pooled connections should queue, not fail."""
+    await temp_db.add_game(title="Portal 2", added_by=123, guild_id=12345, tags=["Co-op"])
+
+    results = await asyncio.gather(*[
+        temp_db.search_game_titles("Portal", guild_id=12345) for _ in range(20)
+    ])
+    assert all(r == ["Portal 2"] for r in results)
+
+@pytest.mark.asyncio
+async def test_pragma_profiles(tmp_path):
+    """Both PRAGMA profiles run in WAL mode and differ in fsync strategy."""
+    expected_sync = {"durable": 2, "fast": 1}  # FULL, NORMAL
+
+    for profile, sync_level in expected_sync.items():
+        db = DatabaseHandler(db_path=str(tmp_path / f"{profile}.db"), pragma_profile=profile)
+        await db.setup_tables()
+        try:
+            async with db.get_connection(readonly=True) as conn:
+                async with conn.execute("PRAGMA journal_mode") as cursor:
+                    assert (await cursor.fetchone())[0] == "wal"
+                async with conn.execute("PRAGMA synchronous") as cursor:
+                    assert (await cursor.fetchone())[0] == sync_level
+                async with conn.execute("PRAGMA temp_store") as cursor:
+                    assert (await cursor.fetchone())[0] == 2  # MEMORY
+        finally:
+            await db.close()
+
+    with pytest.raises(ValueError):
+        DatabaseHandler(db_path=str(tmp_path / "bogus.db"), pragma_profile="ludicrous")
+
+@pytest.mark.asyncio
+async def test_readers_not_blocked_by_open_write(temp_db):
+    """
+    In WAL mode a reader must see the last committed state immediately, even while
+    the writer holds an EXCLUSIVE transaction. In rollback-journal mode this read
+    would sit on busy_timeout (5s) and blow the 1s deadline below.
+    """
+    await temp_db.add_ai_message(1, 999, "user", "committed")
+
+    async with temp_db.get_connection() as writer:
+        await writer.execute("BEGIN EXCLUSIVE")
+        await writer.execute("INSERT INTO ai_history (user_id, guild_id, role, content) VALUES (1, 999, 'user', 'pending')")
+
+        history = await asyncio.wait_for(temp_db.get_ai_history(1, 999), timeout=1.0)
+        assert history == [("user", "committed")]
+
+        await writer.commit()
+
+    history = await temp_db.get_ai_history(1, 999)
+    assert len(history) == 2
+
+@pytest.mark.asyncio
+async def test_migrations_recorded(temp_db):
+    """setup_tables() applies every migration once and records the schema version."""
+    from utils.database import MIGRATIONS
+
+    async with temp_db.get_connection() as conn:
+        async with conn.execute("PRAGMA user_version") as cursor:
+            assert (await cursor.fetchone())[0] == MIGRATIONS[-1][0]
+
+    # Running setup again on an up-to-date database is a no-op
+    await temp_db.setup_tables()
+    async with temp_db.get_connection() as conn:
+        async with conn.execute("PRAGMA user_version") as cursor:
+            assert (await cursor.fetchone())[0] == MIGRATIONS[-1][0]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query, params", [
+    ("SELECT role, content FROM ai_history WHERE user_id = ? ORDER BY id DESC LIMIT ?", (1, 20)),
+    ("SELECT role, content FROM ai_history WHERE user_id = ? AND guild_id = ? ORDER BY id DESC LIMIT ?", (1, 2, 20)),
+    ("SELECT id, item_name, link, claimed_by FROM gifts WHERE user_id = ? AND guild_id = ?", (1, 2)),
+    ("SELECT gt.game_id FROM game_tags gt JOIN tags t ON gt.tag_id = t.id WHERE t.name = ? AND t.guild_id = ?", ("Co-op", 2)),
+])
+async def test_hot_queries_use_indexes(temp_db, query, params):
+    """EXPLAIN QUERY PLAN must show index searches, never a full scan or a sort."""
+    async with temp_db.get_connection(readonly=True) as conn:
+        async with conn.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+            plan = [row[3] for row in await cursor.fetchall()]
+
+    assert any("USING" in step and "INDEX" in step for step in plan), plan
+    assert not any(step.startswith("SCAN") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+@pytest.mark.asyncio
+async def test_prune_ai_history_keeps_newest_turns(temp_db):
+    """Pruning keeps the newest N turns per user and leaves other users alone."""
+    for i in range(10):
+        await temp_db.add_ai_message(1, 999, "user", f"question {i}")
+        await temp_db.add_ai_message(1, 999, "model", f"answer {i}")
+    await temp_db.add_ai_message(2, 999, "user", "lone message")
+
+    deleted = await temp_db.prune_ai_history(keep_turns=3, batch_size=4)
+    assert deleted == 14
+
+    history = await temp_db.get_ai_history(1, None, limit=100)
+    assert len(history) == 6
+    assert history[0] == ("user", "question 7")
+    assert history[-1] == ("model", "answer 9")
+    assert len(await temp_db.get_ai_history(2, None)) == 1
+
+@pytest.mark.asyncio
+async def test_prune_ai_history_by_age(temp_db):
+    """Rows older than max_age_days are expired regardless of the turn cap."""
+    await temp_db.add_ai_message(1, 999, "user", "ancient")
+    await temp_db.add_ai_message(1, 999, "user", "fresh")
+    async with temp_db.get_connection() as conn:
+        await conn.execute("UPDATE ai_history SET timestamp = datetime('now', '-40 days') WHERE content = 'ancient'")
+        await conn.commit()
+
+    deleted = await temp_db.prune_ai_history(keep_turns=0, max_age_days=30)
+    assert deleted == 1
+    assert await temp_db.get_ai_history(1, None) == [("user", "fresh")]
+
+@pytest.mark.asyncio
+async def test_incremental_vacuum(temp_db):
+    """Fresh databases are created in incremental auto_vacuum mode and can be vacuumed."""
+    async with temp_db.get_connection(readonly=True) as conn:
+        async with conn.execute("PRAGMA auto_vacuum") as cursor:
+            assert (await cursor.fetchone())[0] == 2
+
+    assert await temp_db.incremental_vacuum() is True
+
+@pytest.mark.asyncio
+async def test_incremental_vacuum_converts_legacy_file(tmp_path):
+    """Databases created before auto_vacuum was enabled get converted on first vacuum."""
+    legacy_path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(legacy_path)
+    legacy.execute("CREATE TABLE leftovers (id INTEGER PRIMARY KEY)")
+    legacy.commit()
+    legacy.close()
+
+    db = DatabaseHandler(db_path=str(legacy_path))
+    await db.setup_tables()
+    try:
+        assert await db.incremental_vacuum() is True
+        # Ask the writer: readers opened before the VACUUM keep reporting the old mode
+        async with db.get_connection() as conn:
+            async with conn.execute("PRAGMA auto_vacuum") as cursor:
+                assert (await cursor.fetchone())[0] == 2
+    finally:
+        await db.close()
+
+@pytest.mark.asyncio
+async def test_library_aggregates_ratings_and_tags_independently(temp_db):
+    """Ratings and tags must not multiply each other: exact averages, no repeated tags."""
+    game_id = await temp_db.add_game(title="Deep Rock Galactic", added_by=123, guild_id=12345,
+                                     tags=["Co-op", "Shooter", "Horde"])
+    await temp_db.add_game(title="Unrated", added_by=123, guild_id=12345)
+    for user_id, rating in enumerate([10, 7, 4, 8], start=1):
+        await temp_db.rate_game(game_id, user_id=user_id, guild_id=12345, rating=rating)
+
+    library = await temp_db.get_game_library(guild_id=12345)
+    assert [g["title"] for g in library] == ["Deep Rock Galactic", "Unrated"]
+
+    drg = library[0]
+    assert drg["avg_rating"] == 7.25
+    assert drg["rating_count"] == 4
+    assert sorted(drg["tags"].split(", ")) == ["Co-op", "Horde", "Shooter"]
+
+    assert library[1]["avg_rating"] is None
+    assert library[1]["rating_count"] == 0
+    assert library[1]["tags"] is None
+
+@pytest.mark.asyncio
+async def test_fts_index_tracks_games_and_tags(temp_db):
+    """The FTS index follows inserts, renames, note edits and tag links via triggers."""
+    await temp_db.add_game(title="Half-Life 2", added_by=123, guild_id=12345, tags=["Sci-Fi"], notes="Crowbar physics")
+    await temp_db.add_game(title="Portal", added_by=123, guild_id=0, tags=["Puzzle"])
+    await temp_db.add_game(title="Other Guild Game", added_by=123, guild_id=777)
+
+    # Substring (not just prefix), case-insensitive, local + global scope only
+    assert await temp_db.search_game_titles("life", guild_id=12345) == ["Half-Life 2"]
+    assert await temp_db.search_game_titles("PORT", guild_id=12345) == ["Portal"]
+    assert await temp_db.search_game_titles("Guild", guild_id=12345) == []
+
+    # Renames are picked up
+    async with temp_db.get_connection() as conn:
+        await conn.execute("UPDATE games SET title = 'Half-Life 2: Episode One' WHERE title = 'Half-Life 2'")
+        await conn.commit()
+    assert await temp_db.search_game_titles("Episode", guild_id=12345) == ["Half-Life 2: Episode One"]
+
+    # Tags added later are searchable through the library filter
+    game_id = (await temp_db.get_game_library(12345, tag_filter="sci-fi"))[0]["id"]
+    await temp_db.add_tags(game_id, ["Shooter"], guild_id=12345)
+    assert [g["title"] for g in await temp_db.get_game_library(12345, tag_filter="shoot")] == ["Half-Life 2: Episode One"]
+    assert [g["title"] for g in await temp_db.get_game_library(12345, tag_filter="puzz")] == ["Portal"]
+
+@pytest.mark.asyncio
+async def test_search_ranks_prefix_matches_first(temp_db):
+    """Titles starting with the query outrank titles that merely contain it."""
+    await temp_db.add_game(title="Super Mario 64", added_by=123, guild_id=12345)
+    await temp_db.add_game(title="Mario Kart", added_by=123, guild_id=12345)
+
+    assert await temp_db.search_game_titles("mario", guild_id=12345) == ["Mario Kart", "Super Mario 64"]
+
+@pytest.mark.asyncio
+async def test_short_and_quoted_queries(temp_db):
+    """Queries too short for trigrams, or containing FTS syntax, still work."""
+    await temp_db.add_game(title='The "Quoted" Game', added_by=123, guild_id=12345, tags=["VR"])
+    await temp_db.add_game(title="Halo", added_by=123, guild_id=12345)
+
+    assert await temp_db.search_game_titles("Ha", guild_id=12345) == ["Halo"]
+    assert await temp_db.search_game_titles('"Quoted"', guild_id=12345) == ['The "Quoted" Game']
+    assert [g["title"] for g in await temp_db.get_game_library(12345, tag_filter="vr")] == ['The "Quoted" Game']
+
+@pytest.mark.asyncio
+async def test_autocomplete_uses_fts_index(temp_db):
+    """Title search must be answered by the FTS index rather than a scan of games."""
+    async with temp_db.get_connection(readonly=True) as conn:
+        async with conn.execute(
+            "EXPLAIN QUERY PLAN SELECT g.title FROM games_fts f JOIN games g ON g.id = f.rowid "
+            "WHERE games_fts MATCH ? AND g.guild_id IN (?, 0)", ('title : "port"', 1)
+        ) as cursor:
+            plan = [row[3] for row in await cursor.fetchall()]
+
+    assert any("VIRTUAL TABLE INDEX" in step for step in plan), plan
+    assert not any(step.startswith("SCAN g") for step in plan), plan
+
+@pytest.mark.asyncio
+async def test_fts_migration_backfills_existing_games(temp_db):
+    """Upgrading a database that already has games indexes them during the migration."""
+    await temp_db.add_game(title="Factorio", added_by=123, guild_id=12345, tags=["Automation"])
+
+    # Roll the database back to before the FTS migration
+    async with temp_db.get_connection() as conn:
+        await conn.execute("DROP TABLE games_fts")
+        await conn.execute("PRAGMA user_version = 1")
+        await conn.commit()
+
+    await temp_db.setup_tables()
+    assert await temp_db.search_game_titles("facto", guild_id=12345) == ["Factorio"]
+    assert len(await temp_db.get_game_library(12345, tag_filter="automat")) == 1
+
+@pytest.mark.asyncio
+async def test_add_game_with_tags_is_atomic(temp_db):
+    """A rejected duplicate game must not leave its tags behind."""
+    await temp_db.add_game(title="Valheim", added_by=123, guild_id=12345, tags=["Survival", " Co-op ", "Survival", ""])
+    assert await temp_db.get_tags(12345) == ["Co-op", "Survival"]
+
+    duplicate_id = await temp_db.add_game(title="Valheim", added_by=456, guild_id=12345, tags=["Vikings"])
+    assert duplicate_id == -1
+    assert "Vikings" not in await temp_db.get_tags(12345)
+
+@pytest.mark.asyncio
+async def test_add_tags_bulk(temp_db):
+    """Tags for many games are created once and linked in a single call."""
+    raft = await temp_db.add_game(title="Raft", added_by=123, guild_id=12345)
+    forest = await temp_db.add_game(title="The Forest", added_by=123, guild_id=12345)
+
+    await temp_db.add_tags_bulk({raft: ["Survival", "Ocean"], forest: ["Survival", "Horror"]}, guild_id=12345)
+    # Re-tagging is idempotent
+    await temp_db.add_tags(raft, ["Ocean"], guild_id=12345)
+
+    assert await temp_db.get_tags(12345) == ["Horror", "Ocean", "Survival"]
+    library = {g["title"]: sorted(g["tags"].split(", ")) for g in await temp_db.get_game_library(12345)}
+    assert library == {"Raft": ["Ocean", "Survival"], "The Forest": ["Horror", "Survival"]}
+
+@pytest.mark.asyncio
+async def test_bulk_import_games(temp_db):
+    """Bulk import streams records in chunks, links tags and reports duplicates."""
+    await temp_db.add_game(title="Already Here", added_by=1, guild_id=0)
+
+    def records():
+        yield {"title": "Factorio", "tags": ["Automation", "Co-op"], "min_players": 1, "max_players": 65535}
+        yield {"title": "Satisfactory", "tags": "Automation, First Person", "status": "playing"}
+        yield {"title": "Factorio"}        # Repeat within the import
+        yield {"title": "Already Here"}    # Already in the database
+        yield {"title": "  "}              # No title
+        for i in range(7):
+            yield {"title": f"Filler {i}", "tags": ["Automation"]}
+
+    counts = await temp_db.bulk_import_games(records(), guild_id=0, added_by=0, chunk_size=3)
+    assert counts == {"inserted": 9, "duplicates": 2, "invalid": 1}
+
+    library = {g["title"]: g for g in await temp_db.get_game_library(12345)}
+    assert len(library) == 10
+    assert library["Factorio"]["max_players"] == 65535
+    assert library["Factorio"]["status"] == "unknown"
+    assert library["Satisfactory"]["status"] == "playing"
+    assert sorted(library["Satisfactory"]["tags"].split(", ")) == ["Automation", "First Person"]
+    assert await temp_db.get_tags(12345) == ["Automation", "Co-op", "First Person"]
+
+    # Imported games are searchable straight away
+    assert (await temp_db.search_game_titles("factor", 12345))[0] == "Factorio"
+
+@pytest.mark.asyncio
+async def test_bulk_import_failed_chunk_counts_each_record_once(temp_db):
+    """A chunk that fails after finding duplicates reports them as invalid only, so counts add up to the input."""
+    await temp_db.add_game(title="Already Here", added_by=1, guild_id=0)
+
+    async def broken_attach_tags(*args):
+        raise RuntimeError("disk full")
+
+    temp_db._attach_tags = broken_attach_tags
+    records = [{"title": "Already Here"}, {"title": "New One"}, {"title": "New Two"}]
+    counts = await temp_db.bulk_import_games(records, guild_id=0, added_by=0)
+    assert counts == {"inserted": 0, "duplicates": 0, "invalid": 3}
+    assert [g["title"] for g in await temp_db.get_game_library(0)] == ["Already Here"]
+
+@pytest.mark.asyncio
+async def test_sample_games_respects_filters(temp_db):
+    """Random sampling only returns distinct games that match the filters."""
+    for i in range(10):
+        await temp_db.add_game(title=f"Duo {i}", added_by=1, guild_id=12345, min_players=1, max_players=2)
+    for i in range(10):
+        await temp_db.add_game(title=f"Party {i}", added_by=1, guild_id=12345, min_players=2, max_players=8,
+                               tags=["Party"])
+    await temp_db.add_game(title="Other Guild", added_by=1, guild_id=999, min_players=1, max_players=8)
+
+    picks = await temp_db.sample_games(12345, min_players=4, limit=5)
+    titles = [g["title"] for g in picks]
+    assert len(titles) == 5 and len(set(titles)) == 5
+    assert all(t.startswith("Party") for t in titles)
+
+    tagged = await temp_db.sample_games(12345, tag="party", limit=50)
+    assert sorted(g["title"] for g in tagged) == sorted(f"Party {i}" for i in range(10))
+
+    assert await temp_db.sample_games(12345, min_players=20) == []
+
+@pytest.mark.asyncio
+async def test_sample_games_cache_invalidated_by_writes(temp_db):
+    """Cached candidate ids are dropped when the library changes."""
+    await temp_db.add_game(title="First", added_by=1, guild_id=12345, min_players=1, max_players=4)
+    assert [g["title"] for g in await temp_db.sample_games(12345)] == ["First"]
+
+    await temp_db.add_game(title="Second", added_by=1, guild_id=12345, min_players=1, max_players=4)
+    assert sorted(g["title"] for g in await temp_db.sample_games(12345)) == ["First", "Second"]
+
+    await temp_db.update_game("Second", 12345, max_players=1)
+    assert [g["title"] for g in await temp_db.sample_games(12345, min_players=2)] == ["First"]
+
+@pytest.mark.asyncio
+async def test_get_game_id_prefers_local_then_global(temp_db):
+    """Title lookups resolve the guild's own game before the global one."""
+    global_id = await temp_db.add_game(title="Portal", added_by=1, guild_id=0)
+    local_id = await temp_db.add_game(title="Portal", added_by=1, guild_id=12345)
+
+    assert await temp_db.get_game_id("Portal", 12345) == local_id
+    assert await temp_db.get_game_id("Portal", 999) == global_id
+    assert await temp_db.get_game_id("Portal", 999, include_global=False) is None
+    assert await temp_db.get_game_id("portal", 12345) is None
+
+    async with temp_db.get_connection(readonly=True) as conn:
+        async with conn.execute("EXPLAIN QUERY PLAN SELECT id FROM games WHERE title = ? AND guild_id = ?",
+                                ("Portal", 12345)) as cursor:
+            plan = [row[3] for row in await cursor.fetchall()]
+    assert any("INDEX sqlite_autoindex_games" in step for step in plan), plan
+
+@pytest.mark.asyncio
+async def test_update_game_can_rename(temp_db):
+    """A title keyword updates the title instead of clashing with the lookup argument."""
+    await temp_db.add_game(title="Raft", added_by=1, guild_id=12345)
+    assert await temp_db.update_game("Raft", 12345, title="Raft 2", status="Playing") is True
+
+    library = await temp_db.get_game_library(12345)
+    assert [(g["title"], g["status"]) for g in library] == [("Raft 2", "playing")]
+    assert await temp_db.search_game_titles("raft 2", 12345) == ["Raft 2"]
+
+@pytest.mark.asyncio
+async def test_game_library_keyset_pagination(temp_db):
+    """Pages walk the filtered library in (title, id) order in both directions."""
+    # Duplicate titles (local + global) make sure the id tiebreak is honoured
+    for i in range(12):
+        await temp_db.add_game(title=f"Game {i:02d}", added_by=1, guild_id=12345, min_players=1, max_players=4)
+    for i in range(0, 12, 3):
+        await temp_db.add_game(title=f"Game {i:02d}", added_by=1, guild_id=0, min_players=1, max_players=2)
+
+    full = [(g["title"], g["id"]) for g in await temp_db.get_game_library(12345)]
+    assert len(full) == 16 and await temp_db.count_games(12345) == 16
+
+    pages, after = [], None
+    while True:
+        page = await temp_db.get_game_library(12345, limit=5, after=after)
+        if not page:
+            break
+        pages.append([(g["title"], g["id"]) for g in page])
+        after = pages[-1][-1]
+    assert [key for page in pages for key in page] == full
+    assert [len(page) for page in pages] == [5, 5, 5, 1]
+
+    back = await temp_db.get_game_library(12345, limit=5, before=pages[2][0])
+    assert [(g["title"], g["id"]) for g in back] == pages[1]
+
+    filtered = await temp_db.get_game_library(12345, player_count=3, limit=5, after=("Game 04", 0))
+    assert [g["title"] for g in filtered] == ["Game 04", "Game 05", "Game 06", "Game 07", "Game 08"]
+    assert await temp_db.count_games(12345, player_count=3) == 12
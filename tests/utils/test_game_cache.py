@@ -0,0 +1,157 @@
+import asyncio
+import random
+import pytest
+from utils.game_cache import GameLibraryCache
+
+@pytest.mark.asyncio
+async def test_cache_hits_and_filters(temp_db):
+    """Repeat reads are served from memory with the same filters as the database."""
+    await temp_db.add_game(title="Portal 2", added_by=1, guild_id=12345, min_players=1, max_players=2,
+                           status="playing", tags=["Puzzle", "Co-op"])
+    await temp_db.add_game(title="Factorio", added_by=1, guild_id=0, min_players=1, max_players=8,
+                           tags=["Automation"])
+    await temp_db.add_game(title="Elsewhere", added_by=1, guild_id=999)
+    cache = GameLibraryCache(temp_db)
+
+    library = await cache.get_library(12345)
+    assert [g["title"] for g in library] == ["Factorio", "Portal 2"]
+    assert library == await temp_db.get_game_library(12345)
+    assert cache.stats() == {"guilds": 1, "hits": 0, "misses": 1, "evictions": 0}
+
+    for kwargs in ({"status_filter": "PLAYING"}, {"tag_filter": "co-"}, {"player_count": 5},
+                   {"release_state": "tba"}):
+        assert await cache.get_library(12345, **kwargs) == await temp_db.get_game_library(12345, **kwargs)
+    assert cache.hits == 4 and cache.misses == 1
+
+    assert {g["title"]: g["guild_id"] for g in library} == {"Factorio": 0, "Portal 2": 12345}
+
+@pytest.mark.asyncio
+async def test_cache_lru_eviction(temp_db):
+    """The least recently used guild is evicted once the cache is full."""
+    cache = GameLibraryCache(temp_db, max_guilds=2)
+    await cache.get_library(1)
+    await cache.get_library(2)
+    await cache.get_library(1)
+    await cache.get_library(3)  # Evicts guild 2
+
+    assert cache.stats() == {"guilds": 2, "hits": 1, "misses": 3, "evictions": 1}
+    await cache.get_library(2)
+    assert cache.misses == 4
+
+@pytest.mark.asyncio
+async def test_cache_patch_and_invalidate(temp_db):
+    """Local updates are patched in place; global changes drop every guild."""
+    game_id = await temp_db.add_game(title="Raft", added_by=1, guild_id=1, min_players=1, max_players=8)
+    cache = GameLibraryCache(temp_db)
+    await cache.get_library(1)
+    await cache.get_library(2)
+
+    cache.patch_game(1, game_id, {"status": "played", "title": "Raft (2022)"})
+    [game] = await cache.get_games(1, [game_id])
+    assert game["status"] == "played" and game["title"] == "Raft (2022)"
+    assert cache.misses == 2
+
+    cache.invalidate(1)
+    assert cache.stats()["guilds"] == 1
+    cache.invalidate(0)
+    assert cache.stats()["guilds"] == 0
+
+@pytest.mark.asyncio
+async def test_cache_player_filters_use_range_index(temp_db):
+    """Player-count filters match the SQL path, and patches rebuild the index."""
+    await temp_db.add_game(title="Factorio", added_by=1, guild_id=12345, min_players=1, max_players=65535)
+    await temp_db.add_game(title="Portal 2", added_by=1, guild_id=12345, min_players=2, max_players=2)
+    game_id = await temp_db.add_game(title="Raft", added_by=1, guild_id=12345, min_players=1, max_players=8)
+    await temp_db.add_game(title="Unknown Size", added_by=1, guild_id=12345)
+    cache = GameLibraryCache(temp_db)
+
+    for players in (1, 2, 5, 100):
+        expected = [g["title"] for g in await temp_db.get_game_library(12345, player_count=players)]
+        assert [g["title"] for g in await cache.get_library(12345, player_count=players)] == expected
+    assert {g["title"] for g in await cache.sample(12345, min_players=3, limit=10)} == {"Factorio", "Raft"}
+
+    cache.patch_game(12345, game_id, {"max_players": 4})
+    assert [g["title"] for g in await cache.get_library(12345, player_count=5)] == ["Factorio"]
+
+@pytest.mark.asyncio
+async def test_cache_filters_and_pages_match_sql(temp_db):
+    """Every filter combination and keyset page agrees with DatabaseHandler.get_game_library."""
+    rng = random.Random(9)
+    tag_pool = ["Co-op", "Survival", "Puzzle", "Horror", "Automation"]
+    for i in range(40):
+        await temp_db.add_game(
+            title=f"Game {rng.randint(0, 25):02d}", added_by=1, guild_id=rng.choice([12345, 0]),
+            min_players=rng.choice([1, 2, None]), max_players=rng.choice([2, 4, 8, 65535]),
+            status=rng.choice(["playing", "played", "unknown"]),
+            release_state=rng.choice([None, "TBA", "full release"]),
+            tags=rng.sample(tag_pool, rng.randint(0, 3)),
+        )
+    cache = GameLibraryCache(temp_db)
+
+    combos = [
+        {}, {"status_filter": "playing"}, {"release_state": "TBA"}, {"player_count": 3},
+        {"tag_filter": "co"}, {"tag_filter": ["co-op", "surv"]},
+        {"tag_filter": ["horror", "puzzle"], "match_all_tags": False},
+        {"tag_filter": ["auto"], "status_filter": "played", "player_count": 2},
+    ]
+    for filters in combos:
+        expected = await temp_db.get_game_library(12345, **filters)
+        assert await cache.get_library(12345, **filters) == expected, filters
+        assert await cache.count(12345, **filters) == len(expected)
+
+        page = await cache.get_page(12345, limit=4, **filters)
+        assert page == expected[:4]
+        if len(expected) > 4:
+            cursor = (page[-1]["title"], page[-1]["id"])
+            assert await cache.get_page(12345, limit=4, after=cursor, **filters) == \
+                await temp_db.get_game_library(12345, limit=4, after=cursor, **filters)
+            cursor = (expected[-1]["title"], expected[-1]["id"])
+            assert await cache.get_page(12345, limit=4, before=cursor, **filters) == expected[-5:-1]
+
+@pytest.mark.asyncio
+async def test_cache_sample_reuses_candidates_and_honours_exclude(temp_db):
+    """Sampling draws from cached candidate positions, skips excluded ids, and sees patches."""
+    ids = [await temp_db.add_game(title=f"Game {i}", added_by=1, guild_id=1, min_players=1, max_players=4)
+           for i in range(6)]
+    cache = GameLibraryCache(temp_db)
+
+    for _ in range(20):
+        picks = await cache.sample(1, min_players=3, limit=3, exclude=ids[:2])
+        assert len(picks) == 3 and not {g["id"] for g in picks} & set(ids[:2])
+    library = await cache._library(1)
+    assert list(library._candidates) == [(None, 3)]
+
+    assert {g["id"] for g in await cache.sample(1, min_players=3, limit=10, exclude=ids[1:])} == {ids[0]}
+    assert [g["id"] for g in await cache.get_games(1, [ids[3], 999, ids[0]], min_players=3)] == [ids[3], ids[0]]
+
+    cache.patch_game(1, ids[0], {"max_players": 2})
+    assert not library._candidates
+    assert await cache.get_games(1, [ids[0]], min_players=3) == []
+    assert ids[0] not in {g["id"] for g in await cache.sample(1, min_players=3, limit=10)}
+
+@pytest.mark.asyncio
+async def test_cache_patch_during_load_is_not_lost(temp_db):
+    """An update landing while the guild's library is loading isn't masked by the stale load."""
+    game_id = await temp_db.add_game(title="Raft", added_by=1, guild_id=5)
+    cache = GameLibraryCache(temp_db)
+    loading, release = asyncio.Event(), asyncio.Event()
+    get_game_library = temp_db.get_game_library
+
+    async def held_get_game_library(guild_id):
+        rows = await get_game_library(guild_id)
+        loading.set()
+        await release.wait()
+        return rows
+
+    temp_db.get_game_library = held_get_game_library
+    load = asyncio.create_task(cache.get_library(5))
+    await loading.wait()
+    temp_db.get_game_library = get_game_library
+
+    await temp_db.update_game("Raft", guild_id=5, status="played")
+    cache.patch_game(5, game_id, {"status": "played"})
+    release.set()
+    await load
+
+    [game] = await cache.get_library(5)
+    assert game["status"] == "played"
@@ -0,0 +1,35 @@
+import pytest
+import asyncio
+from utils.history_retention import HistoryRetention
+
+@pytest.mark.asyncio
+async def test_run_once_prunes_history(temp_db):
+    """A retention pass trims each user down to the configured turn count."""
+    for i in range(5):
+        await temp_db.add_ai_message(1, 999, "user", f"question {i}")
+        await temp_db.add_ai_message(1, 999, "model", f"answer {i}")
+
+    retention = HistoryRetention(temp_db, keep_turns=2)
+    assert await retention.run_once() == 6
+    assert len(await temp_db.get_ai_history(1, None, limit=100)) == 4
+
+    # Nothing left to prune on the second pass
+    assert await retention.run_once() == 0
+
+@pytest.mark.asyncio
+async def test_background_task_lifecycle(temp_db):
+    """start() runs a pass in the background; stop() cancels it cleanly."""
+    for i in range(3):
+        await temp_db.add_ai_message(1, 999, "user", f"question {i}")
+
+    retention = HistoryRetention(temp_db, keep_turns=1, interval_minutes=60)
+    retention.start()
+    await asyncio.sleep(0.1)
+    await retention.stop()
+
+    assert len(await temp_db.get_ai_history(1, None)) == 2
+
+    # Disabled retention never schedules a task
+    idle = HistoryRetention(temp_db, keep_turns=0, max_age_days=0)
+    idle.start()
+    assert idle._task is None
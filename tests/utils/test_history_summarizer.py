@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from utils.history_summarizer import HistorySummarizer
+from utils.metrics import Metrics
+
+
+async def add_turns(db, user_id, count, start=0):
+    for i in range(start, start + count):
+        await db.add_ai_message(user_id, 999, "user", f"question {i}")
+        await db.add_ai_message(user_id, 999, "model", f"answer {i}")
+
+
+@pytest.mark.asyncio
+async def test_summarizes_older_messages_past_threshold(temp_db):
+    prompts = []
+
+    async def generate(prompt, user_id):
+        prompts.append(prompt)
+        return f"summary #{len(prompts)}"
+
+    summarizer = HistorySummarizer(temp_db, generate, threshold=10, keep_recent=4, metrics=Metrics())
+    await add_turns(temp_db, 1, 5)  # 10 messages: not over the threshold yet
+    assert await summarizer.summarize(1) is False
+
+    await add_turns(temp_db, 1, 1, start=5)  # 12 messages
+    assert await summarizer.summarize(1) is True
+    assert "question 0" in prompts[0] and "answer 3" in prompts[0]
+    assert "question 4" not in prompts[0]  # The newest 4 messages stay verbatim
+
+    summary, covered = await temp_db.get_ai_summary(1)
+    assert summary == "summary #1"
+    recent = await temp_db.get_ai_history(1, None, after_id=covered)
+    assert [content for _, content in recent] == ["question 4", "answer 4", "question 5", "answer 5"]
+
+    # The next pass builds on the previous summary
+    await add_turns(temp_db, 1, 4, start=6)
+    assert await summarizer.summarize(1) is True
+    assert "summary #1" in prompts[1] and "question 0" not in prompts[1]
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_keeps_old_summary(temp_db):
+    async def fail(prompt, user_id):
+        raise RuntimeError("Ollama is busy")
+
+    summarizer = HistorySummarizer(temp_db, fail, threshold=2, keep_recent=0, metrics=Metrics())
+    await add_turns(temp_db, 1, 2)
+    assert await summarizer.summarize(1) is False
+    assert await temp_db.get_ai_summary(1) is None
+
+
+@pytest.mark.asyncio
+async def test_notify_runs_in_background_and_clear_drops_summary(temp_db):
+    async def generate(prompt, user_id):
+        return "likes propane"
+
+    summarizer = HistorySummarizer(temp_db, generate, threshold=2, keep_recent=0, metrics=Metrics())
+    await add_turns(temp_db, 1, 2)
+    summarizer.notify(1)
+    summarizer.notify(1)  # Already running for this user: no second task
+    assert len(summarizer._tasks) == 1
+    await asyncio.gather(*summarizer._tasks.values())
+
+    # One bounded pass: the oldest `threshold` messages; the remaining 2 are within the threshold
+    assert await temp_db.get_ai_summary(1) == ("likes propane", 2)
+
+    await temp_db.clear_ai_history(1)
+    assert await temp_db.get_ai_summary(1) is None
+
+
+@pytest.mark.asyncio
+async def test_long_backlog_is_folded_in_bounded_passes(temp_db):
+    folded = []
+
+    async def generate(prompt, user_id):
+        conversation = prompt.split("New conversation:\n")[1].split("\n\nUpdated summary:")[0]
+        folded.append(conversation.count("\n") + 1)
+        return f"summary #{len(folded)}"
+
+    summarizer = HistorySummarizer(temp_db, generate, threshold=10, keep_recent=4, metrics=Metrics())
+    await add_turns(temp_db, 1, 100)  # 200 messages, none summarized yet
+    assert await summarizer.summarize(1) is True
+
+    assert len(folded) > 1 and max(folded) <= 10
+    summary, covered = await temp_db.get_ai_summary(1)
+    assert summary == f"summary #{len(folded)}"
+    pending = await temp_db.get_ai_history(1, None, limit=100, after_id=covered)
+    assert 4 <= len(pending) <= 10
+    assert pending[-1] == ("model", "answer 99")
@@ -0,0 +1,49 @@
+import random
+from utils.library_index import LibraryFilterIndex, PlayerRangeIndex, bit_positions
+
+def test_bit_positions():
+    assert list(bit_positions(0)) == []
+    assert list(bit_positions(0b101001)) == [0, 3, 5]
+    assert list(bit_positions(1 << 200)) == [200]
+
+def test_player_range_index_matches_brute_force():
+    """Bitmap answers agree with the SQL predicates, including NULLs and huge maximums."""
+    rng = random.Random(5)
+    mins, maxes = [], []
+    for _ in range(300):
+        lo = rng.choice([None, 1, 1, 2, 3, 4])
+        hi = rng.choice([None, 2, 4, 6, 8, 16, 65535])
+        mins.append(lo)
+        maxes.append(hi if hi is None or lo is None else max(lo, hi))
+    index = PlayerRangeIndex(mins, maxes)
+
+    for players in (0, 1, 2, 3, 5, 8, 9, 100, 65535, 70000):
+        supports = [i for i, (lo, hi) in enumerate(zip(mins, maxes))
+                    if lo is not None and hi is not None and lo <= players <= hi]
+        at_least = [i for i, (lo, hi) in enumerate(zip(mins, maxes))
+                    if lo is not None and hi is not None and hi >= players]
+        assert list(bit_positions(index.supports(players))) == supports
+        assert list(bit_positions(index.max_at_least(players))) == at_least
+
+def test_player_range_index_empty():
+    index = PlayerRangeIndex([], [])
+    assert index.supports(4) == 0 and index.max_at_least(1) == 0
+
+def test_library_filter_index_combines_filters():
+    """Status, state, tags (AND/OR, substring, any case) and players combine as bitmaps."""
+    index = LibraryFilterIndex(
+        statuses=["playing", "Played", "playing", None],
+        release_states=["full release", None, "Early Access", "TBA"],
+        tags=["Co-op, Survival", "Puzzle", "Co-op, Puzzle", None],
+        mins=[1, 1, 2, None],
+        maxes=[8, 1, 4, None],
+    )
+    assert list(bit_positions(index.select())) == [0, 1, 2, 3]
+    assert list(bit_positions(index.select(status_filter="PLAYING"))) == [0, 2]
+    assert list(bit_positions(index.select(release_state="early access"))) == [2]
+    assert list(bit_positions(index.select(tags=["co-op", "puz"]))) == [2]
+    assert list(bit_positions(index.select(tags=["surv", "puzzle"], match_all_tags=False))) == [0, 1, 2]
+    assert list(bit_positions(index.select(tags=["op"], player_count=6))) == [0]
+    assert list(bit_positions(index.select(min_players=2, status_filter="playing"))) == [0, 2]
+    assert index.select(tags=["nope"]) == 0
+    assert index.tag_names() == ["co-op", "puzzle", "survival"]
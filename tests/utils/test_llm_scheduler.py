@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from utils.llm_scheduler import LLMScheduler, Priority, SchedulerFull
+from utils.metrics import Metrics
+
+
+async def hold(scheduler, order, name, priority=Priority.INTERACTIVE, user_id=None, release=None):
+    async with scheduler.slot(priority, user_id):
+        order.append(name)
+        if release is not None:
+            await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_and_priority_order():
+    scheduler = LLMScheduler(max_concurrent=1, metrics=Metrics())
+    order = []
+    gate = asyncio.Event()
+
+    blocker = asyncio.create_task(hold(scheduler, order, "blocker", release=gate))
+    await settle()
+    assert scheduler.active == 1
+
+    waiters = [
+        asyncio.create_task(hold(scheduler, order, "background", Priority.BACKGROUND)),
+        asyncio.create_task(hold(scheduler, order, "fun", Priority.FUN)),
+        asyncio.create_task(hold(scheduler, order, "chat", Priority.INTERACTIVE)),
+    ]
+    await settle()
+    assert scheduler.queued() == 3 and order == ["blocker"]
+
+    gate.set()
+    await asyncio.gather(blocker, *waiters)
+    assert order == ["blocker", "chat", "fun", "background"]
+    assert scheduler.active == 0 and scheduler.queued() == 0
+
+
+@pytest.mark.asyncio
+async def test_users_take_turns_within_a_class():
+    scheduler = LLMScheduler(max_concurrent=1, metrics=Metrics())
+    order = []
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(hold(scheduler, order, "blocker", release=gate))
+    await settle()
+
+    # User 1 queues three requests before user 2 queues one
+    tasks = [asyncio.create_task(hold(scheduler, order, f"u1-{i}", Priority.FUN, user_id=1)) for i in range(3)]
+    await settle()
+    tasks.append(asyncio.create_task(hold(scheduler, order, "u2-0", Priority.FUN, user_id=2)))
+    await settle()
+
+    gate.set()
+    await asyncio.gather(blocker, *tasks)
+    assert order == ["blocker", "u1-0", "u2-0", "u1-1", "u1-2"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_fast():
+    metrics = Metrics()
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=1, metrics=metrics)
+    order = []
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(hold(scheduler, order, "blocker", release=gate))
+    queued = asyncio.create_task(hold(scheduler, order, "queued", Priority.FUN))
+    await settle()
+
+    with pytest.raises(SchedulerFull):
+        await hold(scheduler, order, "rejected", Priority.FUN)
+    assert metrics.counters["llm.rejected.fun"] == 1
+
+    # Limits are per class: chat can still queue
+    chat = asyncio.create_task(hold(scheduler, order, "chat"))
+    await settle()
+    gate.set()
+    await asyncio.gather(blocker, queued, chat)
+    assert order == ["blocker", "chat", "queued"]
+    assert metrics.timings["llm.queue_wait_ms.fun"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = LLMScheduler(max_concurrent=1, metrics=Metrics())
+    order = []
+    gate = asyncio.Event()
+    blocker = asyncio.create_task(hold(scheduler, order, "blocker", release=gate))
+    cancelled = asyncio.create_task(hold(scheduler, order, "cancelled"))
+    later = asyncio.create_task(hold(scheduler, order, "later"))
+    await settle()
+
+    cancelled.cancel()
+    await settle()
+    assert scheduler.queued() == 1
+
+    gate.set()
+    await asyncio.gather(blocker, later)
+    assert order == ["blocker", "later"]
+    assert scheduler.active == 0
@@ -0,0 +1,22 @@
+from utils.metrics import Metrics
+
+
+def test_counters_gauges_and_percentiles():
+    metrics = Metrics(sample_size=100)
+    metrics.incr("requests")
+    metrics.incr("requests", 2)
+    metrics.gauge("queued", 4)
+    for value in range(1, 201):
+        metrics.observe("wait_ms", value)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["requests"] == 3
+    assert snapshot["queued"] == 4
+    # Only the latest 100 observations (101..200) are kept
+    assert snapshot["wait_ms.count"] == 100
+    assert snapshot["wait_ms.p50"] == 151
+    assert snapshot["wait_ms.p99"] == 200
+    assert metrics.percentile("missing", 50) is None
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
@@ -0,0 +1,166 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from config import BotConfig
+from utils.ai_handler import AIHandler
+from utils.metrics import Metrics
+from utils.ollama_pool import OllamaPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+async def start_node(name, models=("gemma4:e2b",), fail=False):
+    """A stub Ollama node answering /api/tags and /api/generate; returns (runner, url, hits)."""
+    hits = []
+
+    async def tags(request):
+        return web.json_response({"models": [{"name": m} for m in models]})
+
+    async def generate(request):
+        hits.append(name)
+        if fail:
+            return web.Response(status=500)
+        return web.json_response({"response": name})
+
+    app = web.Application()
+    app.router.add_get("/api/tags", tags)
+    app.router.add_post("/api/generate", generate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}", hits
+
+
+def test_pick_least_outstanding_with_model_affinity():
+    pool = OllamaPool(["http://a", "http://b", "http://c"], metrics=Metrics())
+    a, b, c = pool.backends
+    a.models, b.models, c.models = {"gemma4:e2b"}, {"gemma4:e2b"}, {"llama3"}
+
+    assert pool.pick("gemma4:e2b") is a
+    a.outstanding = 2
+    assert pool.pick("gemma4:e2b") is b
+    # c is idle but doesn't have the model pulled
+    b.outstanding = 5
+    assert pool.pick("gemma4:e2b") is a
+    assert pool.pick("llama3") is c
+    # Nobody has it: fall back to the least loaded node
+    assert pool.pick("mistral") is c
+
+
+@pytest.mark.asyncio
+async def test_passive_ejection_and_recovery():
+    clock = FakeClock()
+    pool = OllamaPool(["http://a", "http://b"], max_failures=2, eject_seconds=30, metrics=Metrics(), clock=clock)
+    a, b = pool.backends
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            async with pool.lease("m") as backend:
+                assert backend is a
+                raise RuntimeError("boom")
+    assert a.outstanding == 0
+    assert pool.pick("m") is b  # a is ejected
+
+    clock.now += 31
+    assert pool.pick("m") is a
+    async with pool.lease("m"):
+        pass
+    assert a.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_probe_tracks_health_and_models():
+    runner, url, _ = await start_node("up", models=("gemma4:e2b", "llama3"))
+    pool = OllamaPool([url, "http://127.0.0.1:9"], metrics=Metrics())
+    up, down = pool.backends
+    try:
+        async with aiohttp.ClientSession() as session:
+            await pool.probe(session)
+    finally:
+        await runner.cleanup()
+
+    assert up.healthy and up.models == {"gemma4:e2b", "llama3"}
+    assert not down.healthy
+    down.outstanding = -1  # Even "less busy", an unhealthy node isn't picked
+    assert pool.pick("gemma4:e2b") is up
+
+
+@pytest.mark.asyncio
+async def test_handler_spreads_load_and_routes_around_a_failing_node(temp_db, monkeypatch):
+    good_runner, good_url, good_hits = await start_node("good")
+    bad_runner, bad_url, bad_hits = await start_node("bad", fail=True)
+    monkeypatch.setattr(BotConfig, "OLLAMA_URLS", [bad_url, good_url])
+    monkeypatch.setattr(BotConfig, "OLLAMA_MAX_FAILURES", 1)
+
+    handler = AIHandler(temp_db, None)
+    try:
+        # Two concurrent requests land on different nodes
+        results = await asyncio.gather(handler._generate("a"), handler._generate("b"), return_exceptions=True)
+        assert sorted(map(str, results))[-1] == "good"
+        assert len(bad_hits) == 1 and len(good_hits) == 1
+
+        # The failing node is now ejected, so everything goes to the good one
+        assert await handler._generate("c") == "good"
+        assert await handler._generate("d") == "good"
+        assert len(bad_hits) == 1
+    finally:
+        await handler.close()
+        await good_runner.cleanup()
+        await bad_runner.cleanup()
+
+
+async def start_stalled_node(release: asyncio.Event):
+    """A node that accepts requests and doesn't answer until `release` is set."""
+    async def stall(request):
+        await release.wait()
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_post("/api/generate", stall)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_stalled_node_times_out_and_is_ejected(temp_db, monkeypatch, stream):
+    release = asyncio.Event()
+    stalled_runner, stalled_url = await start_stalled_node(release)
+    good_runner, good_url, good_hits = await start_node("good")
+    monkeypatch.setattr(BotConfig, "OLLAMA_URLS", [stalled_url, good_url])
+    monkeypatch.setattr(BotConfig, "OLLAMA_MAX_FAILURES", 1)
+    monkeypatch.setattr(BotConfig, "OLLAMA_GENERATE_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(BotConfig, "OLLAMA_STREAM_READ_TIMEOUT_SECONDS", 0.2)
+
+    handler = AIHandler(temp_db, None)
+    stalled = handler.pool.backends[0]
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            if stream:
+                async for _ in handler._stream("hello"):
+                    pass
+            else:
+                await handler._generate("hello")
+
+        # The timeout freed the scheduler slot and counted against the node
+        assert handler.scheduler.active == 0 and stalled.outstanding == 0
+        assert handler.pool.pick(handler.model_name) is not stalled
+        assert await handler._generate("again") == "good"
+    finally:
+        await handler.close()
+        await good_runner.cleanup()
+        release.set()
+        await stalled_runner.cleanup()
@@ -0,0 +1,57 @@
+from utils.metrics import Metrics
+from utils.prompt_builder import PromptBuilder, estimate_tokens
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("x" * 400) == 100
+
+
+def test_sections_in_order_with_duplicates_and_empties_dropped():
+    prompt = (PromptBuilder(100, words, Metrics())
+              .section("persona", "You are Cave.")
+              .section("location", "LOCATION: Lab.")
+              .section("location_again", "LOCATION: Lab.")
+              .section("games", "")
+              .section("message", "User: hi")
+              .build())
+    assert prompt == "You are Cave.\n\nLOCATION: Lab.\n\nUser: hi"
+
+
+def test_history_keeps_newest_turns_that_fit():
+    metrics = Metrics()
+    builder = PromptBuilder(12, words, metrics)
+    builder.section("persona", "one two three")
+    builder.history("history", ["User: old turn", "Model: middle turn", "User: new turn"], header="History:")
+    builder.section("message", "User: hi")
+    prompt = builder.build()
+
+    # 5 fixed tokens leave 7: the header (1) plus two 3-word turns (+1 newline each doesn't fit a third)
+    assert prompt == "one two three\n\nHistory:\nUser: new turn\n\nUser: hi"
+    assert builder.trimmed == 2
+    assert builder.counts["persona"] == 3 and builder.counts["message"] == 2
+    assert builder.counts["total"] == 5 + words("History:\nUser: new turn")
+    assert metrics.counters["llm.prompt.history_trimmed"] == 2
+    assert metrics.timings["llm.prompt_tokens.history"][-1] == builder.counts["history"]
+
+
+def test_over_budget_fixed_sections_are_kept_without_history():
+    builder = PromptBuilder(3, words, Metrics())
+    builder.section("persona", "a b c d e")
+    builder.history("history", ["User: x"], header="History:", empty="History: None")
+    prompt = builder.build()
+    # The turn was trimmed, not absent: no "History: None" claim
+    assert prompt == "a b c d e"
+    assert builder.trimmed == 1
+
+
+def test_empty_placeholder_only_when_there_is_no_history():
+    builder = PromptBuilder(100, words, Metrics())
+    builder.section("persona", "a b c")
+    builder.history("history", [], header="History:", empty="History: None")
+    assert builder.build() == "a b c\n\nHistory: None"
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from utils.recommender import GuildRatingModel, GameRecommender
+
+# Users 1-4 love games 10 and 11 and dislike 12 and 13; user 5 has only rated 10
+RATINGS = [(u, 10, 9) for u in range(1, 5)] + [(u, 11, 8) for u in range(1, 5)] + \
+          [(u, 12, 2) for u in range(1, 5)] + [(u, 13, 3) for u in range(1, 5)] + \
+          [(5, 10, 10), (5, 12, 4)]
+
+def test_similar_games_follow_co_ratings():
+    """Games rated the same way by the same users are each other's nearest neighbours."""
+    model = GuildRatingModel(RATINGS)
+    assert model.shape == (5, 4)
+    assert model.similar(10, limit=1)[0][0] == 11
+    assert model.similar(12, limit=1)[0][0] == 13
+    assert model.similar(999) == []
+
+def test_recommend_skips_rated_games():
+    """A user is pointed at the unrated neighbour of the game they liked."""
+    model = GuildRatingModel(RATINGS)
+    picks = [game_id for game_id, _ in model.recommend(5)]
+    assert picks[0] == 11
+    assert 10 not in picks and 12 not in picks
+    assert model.recommend(999) == []
+
+def test_incremental_update_matches_rebuild():
+    """Applying ratings one at a time ends in the same neighbour lists as a fresh build."""
+    rng = np.random.default_rng(3)
+    ratings = {}
+    for _ in range(300):
+        ratings[(int(rng.integers(30)), int(rng.integers(40)))] = int(rng.integers(1, 11))
+    rows = [(u, g, r) for (u, g), r in ratings.items()]
+
+    incremental = GuildRatingModel(rows[:150], top_k=5)
+    for u, g, r in rows[150:]:
+        incremental.update(u, g, r)
+    rebuilt = GuildRatingModel(rows, top_k=5)
+
+    for game_id in rebuilt.game_ids:
+        expected = dict(rebuilt.similar(game_id))
+        got = dict(incremental.similar(game_id))
+        # Neighbour scores agree wherever both lists have them (ties may order differently)
+        for neighbour in set(expected) & set(got):
+            assert got[neighbour] == pytest.approx(expected[neighbour], abs=1e-5)
+        assert sorted(got.values(), reverse=True)[:1] == pytest.approx(sorted(expected.values(), reverse=True)[:1], abs=1e-5)
+
+@pytest.mark.asyncio
+async def test_recommender_loads_and_tracks_ratings(temp_db):
+    """The guild model is built from game_ratings once and patched by record_rating."""
+    ids = {}
+    for title in ("Portal", "Portal 2", "Raft", "Valheim"):
+        ids[title] = await temp_db.add_game(title=title, added_by=1, guild_id=12345)
+    for user in (1, 2, 3):
+        await temp_db.rate_game(ids["Portal"], user, 12345, 9)
+        await temp_db.rate_game(ids["Portal 2"], user, 12345, 10)
+        await temp_db.rate_game(ids["Raft"], user, 12345, 2)
+    await temp_db.rate_game(ids["Portal"], 99, 999, 10)  # Another guild's rating isn't loaded
+
+    recommender = GameRecommender(temp_db)
+    model = await recommender.model(12345)
+    assert model.shape == (3, 3)
+    assert await recommender.similar_games(12345, ids["Portal"], limit=1) == [ids["Portal 2"]]
+
+    await recommender.record_rating(12345, 4, ids["Portal"], 10)
+    await recommender.record_rating(12345, 4, ids["Raft"], 1)
+    assert (await recommender.model(12345)) is model and model.shape == (4, 3)
+    assert await recommender.recommend_for_user(12345, 4) == [ids["Portal 2"]]
+
+@pytest.mark.asyncio
+async def test_record_rating_updates_off_the_event_loop(temp_db):
+    """Incremental updates run in a worker thread, and reads of that guild wait for them to finish."""
+    ids = [await temp_db.add_game(title=title, added_by=1, guild_id=1) for title in ("A", "B", "C")]
+    for user in (1, 2):
+        await temp_db.rate_game(ids[0], user, 1, 9)
+        await temp_db.rate_game(ids[1], user, 1, 10)
+        await temp_db.rate_game(ids[2], user, 1, 2)
+    recommender = GameRecommender(temp_db)
+    model = await recommender.model(1)
+
+    threads = []
+    update = model.update
+
+    def slow_update(*args):
+        threads.append(threading.current_thread())
+        time.sleep(0.05)
+        update(*args)
+
+    model.update = slow_update
+    rating = asyncio.create_task(recommender.record_rating(1, 3, ids[0], 10))
+    while not threads:
+        await asyncio.sleep(0.001)
+    assert threads[0] is not threading.main_thread()
+    # Asked mid-update, but answered from the updated model
+    assert await recommender.recommend_for_user(1, 3) == [ids[1]]
+    await rating
@@ -0,0 +1,69 @@
+import pytest
+
+from utils.metrics import Metrics
+from utils.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_depends_on_model_prompt_and_options():
+    key = ResponseCache.key("gemma", "hi")
+    assert key == ResponseCache.key("gemma", "hi", {})
+    assert key != ResponseCache.key("llama", "hi")
+    assert key != ResponseCache.key("gemma", "hi!")
+    assert ResponseCache.key("gemma", "hi", {"a": 1, "b": 2}) == ResponseCache.key("gemma", "hi", {"b": 2, "a": 1})
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_lru():
+    clock = FakeClock()
+    metrics = Metrics()
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, metrics=metrics, clock=clock)
+
+    await cache.put("a", "A")
+    await cache.put("b", "B")
+    assert await cache.get("a") == "A"  # a is now most recently used
+    await cache.put("c", "C")
+    assert await cache.get("b") is None  # b was evicted
+    assert await cache.get("a") == "A"
+
+    clock.now += 61
+    assert await cache.get("a") is None
+    assert metrics.counters["llm.cache.hits"] == 2
+    assert metrics.counters["llm.cache.evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_collects_k_variants_before_serving():
+    cache = ResponseCache(variants=3, metrics=Metrics())
+    for response in ["one", "two", "two", "three"]:
+        assert await cache.get("k") is None
+        await cache.put("k", response)
+
+    served = {await cache.get("k") for _ in range(50)}
+    assert served == {"one", "two", "three"}
+    # A single-variant caller gets the first answer straight away
+    assert await cache.get("k", variants=1) == "one"
+
+
+@pytest.mark.asyncio
+async def test_persists_to_sqlite(temp_db):
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=60, db=temp_db, metrics=Metrics(), clock=clock)
+    await cache.put("k", "Propane!")
+
+    # A fresh cache (e.g. after a restart) finds it in the database
+    restarted = ResponseCache(ttl_seconds=60, db=temp_db, metrics=Metrics(), clock=clock)
+    assert await restarted.get("k") == "Propane!"
+
+    clock.now += 61
+    fresh = ResponseCache(ttl_seconds=60, db=temp_db, metrics=Metrics(), clock=clock)
+    assert await fresh.get("k") is None
+    assert await fresh.prune() == 1
+    assert await temp_db.get_cached_responses("k") == []
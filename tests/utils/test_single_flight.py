@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from utils.metrics import Metrics
+from utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    metrics = Metrics()
+    flight = SingleFlight("test", metrics)
+    calls = 0
+    gate = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await gate.wait()
+        return "result"
+
+    waiters = [asyncio.create_task(flight.do("k", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert flight.in_flight("k")
+    gate.set()
+
+    assert await asyncio.gather(*waiters) == ["result"] * 5
+    assert calls == 1
+    assert metrics.counters == {"test.calls": 1, "test.shared": 4}
+    assert not flight.in_flight("k")
+
+    # Once finished, the next caller starts a fresh call
+    assert await flight.do("k", work) == "result"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight("test", Metrics())
+    gate = asyncio.Event()
+
+    async def fail():
+        await gate.wait()
+        raise ValueError("overheated")
+
+    waiters = [asyncio.create_task(flight.do("k", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert not flight.in_flight("k")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_only_when_every_waiter_leaves():
+    flight = SingleFlight("test", Metrics())
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def slow():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "done"
+
+    first = asyncio.create_task(flight.do("k", slow))
+    second = asyncio.create_task(flight.do("k", slow))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()  # second still wants it
+    assert flight.in_flight("k")
+
+    second.cancel()
+    await asyncio.sleep(0.01)
+    assert cancelled.is_set()
+    assert not flight.in_flight("k")
+    for task in (first, second):
+        with pytest.raises(asyncio.CancelledError):
+            await task
@@ -0,0 +1,113 @@
+import pytest
+
+from utils.streaming import relay_stream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def fragments(parts, clock=None, step=0.0):
+    for part in parts:
+        if clock:
+            clock.now += step
+        yield part
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+        self.edits = []
+
+    async def send(self, text):
+        self.sent.append(text)
+        return "message"
+
+    async def edit(self, message, text):
+        assert message == "message"
+        self.edits.append(text)
+
+
+@pytest.mark.asyncio
+async def test_relay_posts_first_text_then_final_edit():
+    recorder = Recorder()
+    text = await relay_stream(fragments(["  ", "Hello", " there", ", tester"]), recorder.send, recorder.edit,
+                              interval=10, clock=FakeClock())
+
+    assert text == "Hello there, tester"
+    assert recorder.sent == ["Hello"]  # Whitespace-only fragments don't post anything
+    assert recorder.edits == ["Hello there, tester"]  # Rate limited: only the final edit
+
+
+@pytest.mark.asyncio
+async def test_relay_edits_at_most_once_per_interval():
+    clock = FakeClock()
+    recorder = Recorder()
+    await relay_stream(fragments(["a", "b", "c", "d", "e"], clock, step=0.5), recorder.send, recorder.edit,
+                       interval=1.0, clock=clock)
+
+    assert recorder.sent == ["a"]
+    assert recorder.edits == ["abc", "abcde"]
+
+
+@pytest.mark.asyncio
+async def test_relay_empty_stream_sends_nothing():
+    recorder = Recorder()
+    assert await relay_stream(fragments([]), recorder.send, recorder.edit) == ""
+    assert recorder.sent == [] and recorder.edits == []
+
+
+@pytest.mark.asyncio
+async def test_relay_truncates_to_message_limit():
+    recorder = Recorder()
+    text = await relay_stream(fragments(["x" * 30]), recorder.send, recorder.edit, limit=10)
+    assert text == "x" * 30
+    assert recorder.sent == ["x" * 10]
+
+
+async def failing(parts):
+    for part in parts:
+        yield part
+    raise RuntimeError("node went away")
+
+
+@pytest.mark.asyncio
+async def test_relay_marks_partial_reply_and_reraises():
+    recorder = Recorder()
+    with pytest.raises(RuntimeError):
+        await relay_stream(failing(["Science ", "is"]), recorder.send, recorder.edit,
+                           interval=10, failure_text="*overheating*", clock=FakeClock())
+    assert recorder.sent == ["Science"]
+    assert recorder.edits == ["Science is\n\n*overheating*"]
+
+
+@pytest.mark.asyncio
+async def test_relay_failure_before_any_text_sends_failure_text():
+    recorder = Recorder()
+    with pytest.raises(RuntimeError):
+        await relay_stream(failing([]), recorder.send, recorder.edit, failure_text="*overheating*")
+    assert recorder.sent == ["*overheating*"] and recorder.edits == []
+
+
+@pytest.mark.asyncio
+async def test_relay_closes_stream_when_sending_fails():
+    closed = False
+
+    async def endless():
+        nonlocal closed
+        try:
+            while True:
+                yield "x"
+        finally:
+            closed = True
+
+    async def broken_send(text):
+        raise ConnectionError("discord is down")
+
+    with pytest.raises(ConnectionError):
+        await relay_stream(endless(), broken_send, Recorder().edit)
+    assert closed
@@ -0,0 +1,90 @@
+import pytest
+import asyncio
+from utils.write_behind import WriteBehindQueue
+
+INSERT_MESSAGE = "INSERT INTO ai_history (user_id, guild_id, role, content) VALUES (?, ?, ?, ?)"
+
+async def count_rows(db, table):
+    async with db.get_connection(readonly=True) as conn:
+        async with conn.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+            return (await cursor.fetchone())[0]
+
+@pytest.mark.asyncio
+async def test_queued_writes_commit_in_background(temp_db):
+    """Queued rows land on their own shortly after submission, in order."""
+    temp_db.queue_ai_message(1, 999, "user", "Hello cave")
+    temp_db.queue_ai_message(1, 999, "model", "Hello test subject")
+    assert temp_db.writes.pending == 2
+
+    await asyncio.sleep(0.1)
+    assert temp_db.writes.pending == 0
+    assert await count_rows(temp_db, "ai_history") == 2
+
+@pytest.mark.asyncio
+async def test_batch_is_a_single_transaction(temp_db):
+    """A full batch is written with one commit instead of one per row."""
+    queue = WriteBehindQueue(temp_db, max_batch=50, max_delay=10)
+    commits = 0
+
+    async with temp_db.get_connection() as conn:
+        original_commit = conn.commit
+
+        async def counting_commit():
+            nonlocal commits
+            commits += 1
+            await original_commit()
+
+        conn.commit = counting_commit
+
+    try:
+        for i in range(50):
+            queue.submit(INSERT_MESSAGE, (1, 999, "user", f"message {i}"))
+        # Hitting max_batch flushes immediately, long before max_delay
+        await asyncio.sleep(0.1)
+        assert queue.pending == 0
+        assert commits == 1
+    finally:
+        del conn.commit
+        await queue.close()
+
+    assert await count_rows(temp_db, "ai_history") == 50
+
+@pytest.mark.asyncio
+async def test_reads_see_queued_writes(temp_db):
+    """Read methods flush the queue first, so queued rows are never invisible."""
+    game_id = await temp_db.add_game(title="Portal", added_by=1, guild_id=12345)
+    temp_db.queue_rating(game_id, user_id=1, guild_id=12345, rating=7)
+    temp_db.queue_ai_message(1, 12345, "user", "Did my rating stick?")
+
+    library = await temp_db.get_game_library(12345)
+    assert library[0]["avg_rating"] == 7.0
+    assert await temp_db.get_ai_history(1, 12345) == [("user", "Did my rating stick?")]
+
+@pytest.mark.asyncio
+async def test_bad_row_does_not_sink_batch(temp_db):
+    """A row that violates a constraint is dropped; the rest of the batch still commits."""
+    game_id = await temp_db.add_game(title="Portal", added_by=1, guild_id=12345)
+    temp_db.queue_rating(game_id, user_id=1, guild_id=12345, rating=8)
+    temp_db.queue_rating(game_id, user_id=2, guild_id=12345, rating=99) # Fails CHECK
+    temp_db.queue_rating(game_id, user_id=3, guild_id=12345, rating=10)
+
+    await temp_db.writes.flush()
+    assert await count_rows(temp_db, "game_ratings") == 2
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_writes(tmp_path):
+    """Shutting the database down commits anything still queued."""
+    from utils.database import DatabaseHandler
+
+    db_path = str(tmp_path / "shutdown.db")
+    db = DatabaseHandler(db_path=db_path)
+    await db.setup_tables()
+    db.queue_ai_message(1, 999, "user", "Last words")
+    await db.close()
+
+    db = DatabaseHandler(db_path=db_path)
+    await db.setup_tables()
+    try:
+        assert await db.get_ai_history(1, 999) == [("user", "Last words")]
+    finally:
+        await db.close()
@@ -1,11 +1,19 @@
 """AI handling utilities for the Discord bot"""
 
 import os
+import json
 import aiohttp
 import logging
-from typing import Optional, Dict, List, Tuple
+from typing import AsyncIterator, Optional, Dict, List, Tuple
 from config import BotConfig
+from utils.llm_scheduler import LLMScheduler, Priority
+from utils.ollama_pool import OllamaPool
+from utils.response_cache import ResponseCache
+from utils.single_flight import SingleFlight
+from utils.prompt_builder import PromptBuilder, estimate_tokens
+from utils.history_summarizer import HistorySummarizer
 import asyncio
+from contextlib import aclosing
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +23,57 @@ class AIHandler:
         self.db = db_handler
         self.bot = bot
         self.model_name = "gemma4:e2b"
-        self.ollama_url = self.config.OLLAMA_URL + "/api/generate"
+        # Every configured Ollama node; each request goes to the least busy healthy one
+        self.pool = OllamaPool(
+            self.config.OLLAMA_URLS or [self.config.OLLAMA_URL],
+            probe_interval=self.config.OLLAMA_PROBE_INTERVAL_SECONDS,
+            eject_seconds=self.config.OLLAMA_EJECT_SECONDS,
+            max_failures=self.config.OLLAMA_MAX_FAILURES
+        )
+        self.pool_limit = self.config.OLLAMA_POOL_LIMIT
+        self.keepalive_seconds = self.config.OLLAMA_KEEPALIVE_SECONDS
+        self.dns_cache_seconds = self.config.OLLAMA_DNS_CACHE_SECONDS
+        # A node that connects but then stalls must time out, so the pool can eject it and the slot frees up
+        self.generate_timeout = aiohttp.ClientTimeout(
+            total=self.config.OLLAMA_GENERATE_TIMEOUT_SECONDS,
+            sock_connect=self.config.OLLAMA_CONNECT_TIMEOUT_SECONDS
+        )
+        # Streams may run long overall, but a gap this long between chunks means the node is stuck
+        self.stream_timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.config.OLLAMA_CONNECT_TIMEOUT_SECONDS,
+            sock_read=self.config.OLLAMA_STREAM_READ_TIMEOUT_SECONDS
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Bounds concurrent generations; chat goes ahead of fun commands
+        self.scheduler = LLMScheduler(
+            max_concurrent=self.config.LLM_MAX_CONCURRENT * len(self.pool),
+            max_queue=self.config.LLM_MAX_QUEUE
+        )
+        # Character, beer and image-prompt generations depend only on their prompt, so repeats are cached
+        self.response_cache = ResponseCache(
+            max_entries=self.config.LLM_CACHE_SIZE,
+            ttl_seconds=self.config.LLM_CACHE_TTL_SECONDS,
+            variants=self.config.LLM_CACHE_VARIANTS,
+            db=self.db if self.config.LLM_CACHE_PERSIST else None
+        ) if self.config.LLM_CACHE_SIZE > 0 else None
+        # Identical prompts generated at the same moment share one Ollama call
+        self.in_flight = SingleFlight("llm.singleflight")
+        # Chat prompts are trimmed to this many tokens; replace count_tokens with a real tokenizer if available
+        self.prompt_token_budget = self.config.AI_PROMPT_TOKEN_BUDGET
+        self.count_tokens = estimate_tokens
+        # Long histories are condensed into a per-user summary by background-priority generations
+        self.summarizer = HistorySummarizer(
+            self.db,
+            lambda prompt, user_id: self._generate(prompt, Priority.BACKGROUND, user_id),
+            threshold=self.config.AI_SUMMARY_THRESHOLD,
+            keep_recent=self.config.AI_SUMMARY_KEEP_RECENT
+        )
         self.client = self._setup_ai()
     
     def _setup_ai(self):
         """Initialize Ollama AI"""
-        logger.info(f"Ollama AI initialized for {self.model_name} at {self.ollama_url}")
+        logger.info(f"Ollama AI initialized for {self.model_name} at {', '.join(b.url for b in self.pool.backends)}")
         return True
 
     def _get_persona_system_prompt(self) -> str:
@@ -47,159 +100,264 @@ class AIHandler:
         """Check if AI is available"""
         return self.client is not None
 
-    async def _generate(self, prompt: str) -> str:
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False
-            }
-            async with session.post(self.ollama_url, json=payload) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
-                return data.get("response", "")
+    async def start(self):
+        """Open the shared Ollama session (called from setup_hook; needs a running loop)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                keepalive_timeout=self.keepalive_seconds,
+                ttl_dns_cache=self.dns_cache_seconds
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.generate_timeout)
+            if len(self.pool) > 1:
+                self.pool.start(self._session)
+        return self._session
+
+    async def close(self):
+        """Stop background summaries and health probes, then close the shared session and its pooled connections."""
+        await self.summarizer.stop()
+        await self.pool.stop()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _generate(self, prompt: str, priority: Priority = Priority.INTERACTIVE, user_id: int = None) -> str:
+        # One long-lived session: requests reuse keep-alive connections instead of
+        # paying a TCP connect (and DNS lookup) each time. Opened lazily if start() wasn't called.
+        session = await self.start()
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": False
+        }
+        async with self.scheduler.slot(priority, user_id):
+            async with self.pool.lease(self.model_name) as backend:
+                async with session.post(f"{backend.url}/api/generate", json=payload,
+                                        timeout=self.generate_timeout) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json()
+                    return data.get("response", "")
+
+    async def _cached_generate(self, prompt: str, priority: Priority = Priority.FUN, user_id: int = None,
+                               variants: int = None) -> str:
+        """
+        _generate through the response cache (for prompts built only from config and user input).
+        Concurrent misses on the same prompt are coalesced into one generation.
+        """
+        key = ResponseCache.key(self.model_name, prompt)
+        if self.response_cache is not None:
+            cached = await self.response_cache.get(key, variants)
+            if cached is not None:
+                return cached
+
+        async def generate():
+            response = await self._generate(prompt, priority, user_id)
+            if self.response_cache is not None:
+                await self.response_cache.put(key, response, variants)
+            return response
+
+        return await self.in_flight.do(key, generate)
+
+    async def _stream(self, prompt: str, priority: Priority = Priority.INTERACTIVE, user_id: int = None) -> AsyncIterator[str]:
+        """Yield response fragments from Ollama's streaming (NDJSON, one object per line) API."""
+        session = await self.start()
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": True
+        }
+        # The slot is held until the stream ends: the model is busy the whole time
+        async with self.scheduler.slot(priority, user_id):
+            async with self.pool.lease(self.model_name) as backend:
+                async with session.post(f"{backend.url}/api/generate", json=payload,
+                                        timeout=self.stream_timeout) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.content:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if "error" in chunk:
+                            raise RuntimeError(f"Ollama error: {chunk['error']}")
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
     
-    async def get_character_response(self, character: str, user_input: str) -> Optional[str]:
+    async def get_character_response(self, character: str, user_input: str, user_id: int = None) -> Optional[str]:
         """Get AI response for a specific character"""
         if not self.is_available() or character not in self.config.CHARACTER_PROMPTS:
             return None
         
         try:
             prompt = f"{self.config.CHARACTER_PROMPTS[character]}\n\nUser said: '{user_input}'\n\nRespond in character:"
-            response_text = await self._generate(prompt)
+            response_text = await self._cached_generate(prompt, Priority.FUN, user_id)
             return response_text.strip()
         except Exception as e:
             logger.error(f"AI character response error for {character}: {e}")
             return None
     
-    async def get_chat_response(self, user_id: int, message: str, guild_id: int = None, reply_context: str = None) -> Optional[str]:
-        """Get AI response for general chat with persistent database memory and context awareness"""
-        if not self.is_available():
-            return None
+    async def _build_chat_prompt(self, user_id: int, message: str, guild_id: int = None, reply_context: str = None) -> str:
+        """Assemble the Cave Johnson chat prompt: persona, location, RAG results and history"""
+        # 1. Get recent context from DB
+        # Use Global Context (pass None for guild_id) so Cave remembers you everywhere.
+        # Turns already folded into the user's summary are left out.
+        summary, summarized_up_to = await self.db.get_ai_summary(user_id) or ("", 0)
+        history = await self.db.get_ai_history(user_id, None, limit=20, after_id=summarized_up_to)
         
-        try:
-            # 1. Get recent context from DB
-            # Use Global Context (pass None for guild_id) so Cave remembers you everywhere
-            history = await self.db.get_ai_history(user_id, None, limit=20)
-            
-            # 2. Build context string
-            context = ""
-            if history:
-                context = "Previous conversation history:\n"
-                for role, content in history:
-                    context += f"{role.capitalize()}: {content}\n"
-                context += "\n"
-            else:
-                context = "Previous conversation history: None\n"
-            
-            # --- REPLY CONTEXT ---
-            if reply_context:
-                context += f"\n[SYSTEM NOTICE]: The user is replying to a specific message:\n{reply_context}\n"
-            
-            # Server Awareness
-            location_data = BotConfig.SERVER_CONTEXTS.get(
-                guild_id, 
-                "LOCATION: Unknown Field Site. Assume everyone is a spy from Black Mesa."
-            ) if guild_id else "LOCATION: Private Secure Line."            
-            
-            # Game RAG (Game Recommender)
-            database_context = ""
-            msg_lower = message.lower()
-            
-            # --- ADVANCED INTENT DETECTION ---
-            # Keywords for "The Act of Suggesting"
-            action_keywords = {'recommend', 'suggest', 'pick', 'find', 'ideas', 'what should we', 'what can we', 'play'}
+        # 2. History turns, oldest first (trimmed to the token budget below)
+        turns = [f"{role.capitalize()}: {content}" for role, content in history]
+        
+        # Server Awareness
+        location_data = BotConfig.SERVER_CONTEXTS.get(
+            guild_id, 
+            "LOCATION: Unknown Field Site. Assume everyone is a spy from Black Mesa."
+        ) if guild_id else "LOCATION: Private Secure Line."            
+        
+        # Game RAG (Game Recommender)
+        database_context = ""
+        msg_lower = message.lower()
+        
+        # --- ADVANCED INTENT DETECTION ---
+        # Keywords for "The Act of Suggesting"
+        action_keywords = {'recommend', 'suggest', 'pick', 'find', 'ideas', 'what should we', 'what can we', 'play'}
 
-            # Keywords for "The Item being Requested"
-            target_keywords = {'game', 'simulation', 'testing protocol', 'something', 'fun module'}
+        # Keywords for "The Item being Requested"
+        target_keywords = {'game', 'simulation', 'testing protocol', 'something', 'fun module'}
 
-            # Check for the intersection of intents
-            has_action = any(word in msg_lower for word in action_keywords)
-            has_target = any(word in msg_lower for word in target_keywords)
+        # Check for the intersection of intents
+        has_action = any(word in msg_lower for word in action_keywords)
+        has_target = any(word in msg_lower for word in target_keywords)
 
-            if has_action and has_target:
-                logger.info("Intent Confirmed: Game RAG Triggered.")
-                
-                # 1. Initialize our Search Filters
-                min_players = 0
-                tag = None
+        if has_action and has_target:
+            logger.info("Intent Confirmed: Game RAG Triggered.")
+            
+            # 1. Initialize our Search Filters
+            min_players = 0
+            tag = None
 
-                # 2. Extract Player Count (Looking for numbers + 'player')
-                # Use a simple regex or keyword check
-                import re
-                player_match = re.search(r'(\d+)\s*player', msg_lower)
-                if player_match:
-                    min_players = int(player_match.group(1))
-                elif "solo" in msg_lower or "singleplayer" in msg_lower:
-                    min_players = 1
+            # 2. Extract Player Count (Looking for numbers + 'player')
+            # Use a simple regex or keyword check
+            import re
+            player_match = re.search(r'(\d+)\s*player', msg_lower)
+            if player_match:
+                min_players = int(player_match.group(1))
+            elif "solo" in msg_lower or "singleplayer" in msg_lower:
+                min_players = 1
 
-                # 3. Dynamic Tag Detection
-                # We poll the DB for existing tags so the AI is always up to date
-                # Or, we use a curated list of high-priority tags:
-                known_tags = await self.db.get_tags(guild_id) if guild_id else []
-                for t in known_tags:
-                    if t in msg_lower:
-                        tag = t
-                        break # Take the first match for simplicity
+            # 3. Dynamic Tag Detection
+            # We poll the DB for existing tags so the AI is always up to date
+            # Or, we use a curated list of high-priority tags:
+            known_tags = await self.db.get_tags(guild_id) if guild_id else []
+            for t in known_tags:
+                if t in msg_lower:
+                    tag = t
+                    break # Take the first match for simplicity
 
-                # 4. Fire the Query
-                recommendations = await self.db.recommend_games(guild_id=guild_id, min_players=min_players, tag=tag) if guild_id else "No server context."
-                database_context = f"\n{recommendations}\n"
-            
-            # Context: Music Status
-            music_context = ""
-            
-            # --- MUSIC RAG TRIGGER ---
-            music_keywords = {'playing', 'song', 'music', 'track', 'tune', 'audio', 'listening', 'singer', 'band', 'artist'}
-            music_intents = {'what', 'who', 'current', 'whats', "what's", 'which', 'tell'}
-            
-            has_music_target = any(word in msg_lower for word in music_keywords)
-            has_music_intent = any(word in msg_lower for word in music_intents)
-            
-            direct_music_query = 'what is playing' in msg_lower or 'whats playing' in msg_lower or 'current song' in msg_lower or 'who is playing' in msg_lower
-            
-            if direct_music_query or (has_music_target and has_music_intent):
-                logger.info("Intent Confirmed: Music RAG Triggered.")
-                if self.bot and guild_id:
-                    music_cog = self.bot.get_cog("MusicCommands")
-                    if music_cog:
-                        # Retrieve comprehensive status for the server
-                        guild = self.bot.get_guild(guild_id)
-                        if guild:
-                            status_str = music_cog.get_music_status(guild)
-                            music_context = f"\n[DATABASE QUERY RESULT - MUSIC STATUS]\nCURRENT FACILITY MUSIC STATUS:\n{status_str}\nReport this exact status to the user to let them know what is currently playing.\n"
-            
-            # 3. Create prompt
-            system_prompt = self._get_persona_system_prompt()
-            
-            prompt = f"""{system_prompt}
-            
-            {location_data}
-            {location_data}
-            {database_context}
-            {music_context}
-            
-            {context}User: "{message}"
-            
-            Respond as Cave Johnson. Remember: 
-            1. If there is DATABASE QUERY RESULT above, refer to it first.
-            2. Answer the prompt first, then add flavor."""
-            
-            # 4. Generate Response
-            response_text = await self._generate(prompt)
-            response_text = response_text.strip()
+            # 4. Fire the Query
+            # Inside the bot, GameService ranks by the guild's ratings and serves from its cache
+            game_service = getattr(self.bot, 'game_service', None)
+            if not guild_id:
+                recommendations = "No server context."
+            elif game_service:
+                recommendations = await game_service.recommend_games(guild_id=guild_id, min_players=min_players, tag=tag, user_id=user_id)
+            else:
+                recommendations = await self.db.recommend_games(guild_id=guild_id, min_players=min_players, tag=tag)
+            database_context = f"\n{recommendations}\n"
+        
+        # Context: Music Status
+        music_context = ""
+        
+        # --- MUSIC RAG TRIGGER ---
+        music_keywords = {'playing', 'song', 'music', 'track', 'tune', 'audio', 'listening', 'singer', 'band', 'artist'}
+        music_intents = {'what', 'who', 'current', 'whats', "what's", 'which', 'tell'}
+        
+        has_music_target = any(word in msg_lower for word in music_keywords)
+        has_music_intent = any(word in msg_lower for word in music_intents)
+        
+        direct_music_query = 'what is playing' in msg_lower or 'whats playing' in msg_lower or 'current song' in msg_lower or 'who is playing' in msg_lower
+        
+        if direct_music_query or (has_music_target and has_music_intent):
+            logger.info("Intent Confirmed: Music RAG Triggered.")
+            if self.bot and guild_id:
+                music_cog = self.bot.get_cog("MusicCommands")
+                if music_cog:
+                    # Retrieve comprehensive status for the server
+                    guild = self.bot.get_guild(guild_id)
+                    if guild:
+                        status_str = music_cog.get_music_status(guild)
+                        music_context = f"\n[DATABASE QUERY RESULT - MUSIC STATUS]\nCURRENT FACILITY MUSIC STATUS:\n{status_str}\nReport this exact status to the user to let them know what is currently playing.\n"
+        
+        # 3. Create prompt: fixed sections always go in, history fills what's left of the budget
+        builder = PromptBuilder(self.prompt_token_budget, self.count_tokens)
+        builder.section("persona", self._get_persona_system_prompt())
+        builder.section("location", location_data)
+        builder.section("games", database_context)
+        builder.section("music", music_context)
+        if summary:
+            builder.section("summary", f"What you remember about this user from earlier conversations:\n{summary}")
+        builder.history("history", turns, header="Previous conversation history:",
+                        empty="Previous conversation history: None")
+        
+        # --- REPLY CONTEXT ---
+        if reply_context:
+            builder.section("reply", f"[SYSTEM NOTICE]: The user is replying to a specific message:\n{reply_context}")
+        
+        builder.section("message", f"""User: "{message}"
+        
+        Respond as Cave Johnson. Remember: 
+        1. If there is DATABASE QUERY RESULT above, refer to it first.
+        2. Answer the prompt first, then add flavor.""")
+        return builder.build()
 
-            # 5. Save to DB (User message AND Bot response)
-            await self.db.add_ai_message(user_id, guild_id, "user", message)
-            await self.db.add_ai_message(user_id, guild_id, "model", response_text)
-            
+    def _save_chat_turn(self, user_id: int, guild_id: Optional[int], message: str, response_text: str):
+        # Save to DB (User message AND Bot response)
+        # Queued write-behind so the commit doesn't delay the reply
+        self.db.queue_ai_message(user_id, guild_id, "user", message)
+        self.db.queue_ai_message(user_id, guild_id, "model", response_text)
+        self.summarizer.notify(user_id)
+
+    async def get_chat_response(self, user_id: int, message: str, guild_id: int = None, reply_context: str = None) -> Optional[str]:
+        """Get AI response for general chat with persistent database memory and context awareness"""
+        if not self.is_available():
+            return None
+        
+        try:
+            prompt = await self._build_chat_prompt(user_id, message, guild_id, reply_context)
+            response_text = await self._generate(prompt, Priority.INTERACTIVE, user_id)
+            response_text = response_text.strip()
+            self._save_chat_turn(user_id, guild_id, message, response_text)
             return response_text
             
         except Exception as e:
             logger.error(f"AI chat response error: {e}")
             return None
+
+    async def stream_chat_response(self, user_id: int, message: str, guild_id: int = None,
+                                   reply_context: str = None) -> AsyncIterator[str]:
+        """
+        Same as get_chat_response, but yields the reply piece by piece as Ollama generates it.
+        Errors are logged and re-raised, so the caller can tell a cut-off reply from a finished
+        one; the turn is only saved if generation finished.
+        """
+        if not self.is_available():
+            return
+
+        parts = []
+        try:
+            prompt = await self._build_chat_prompt(user_id, message, guild_id, reply_context)
+            # aclosing: if our consumer stops early, the inner stream (slot, lease, response) is released now
+            async with aclosing(self._stream(prompt, Priority.INTERACTIVE, user_id)) as fragments:
+                async for fragment in fragments:
+                    parts.append(fragment)
+                    yield fragment
+        except Exception as e:
+            logger.error(f"AI chat stream error: {e}")
+            raise
+
+        self._save_chat_turn(user_id, guild_id, message, "".join(parts).strip())
     
-    async def get_roast_response(self, character: str, target_name: str, chat_history: List[Tuple[str, str]] = None) -> Optional[str]:
+    async def get_roast_response(self, character: str, target_name: str, chat_history: List[Tuple[str, str]] = None,
+                                 user_id: int = None) -> Optional[str]:
         """Generate a character-based roast"""
         if not self.is_available() or character not in self.config.CHARACTER_PROMPTS:
             return None
@@ -243,14 +401,15 @@ class AIHandler:
             else:
                 prompt = base_prompt
 
-            response_text = await self._generate(prompt)
+            response_text = await self._generate(prompt, Priority.FUN, user_id)
             return response_text.strip()
             
         except Exception as e:
             logger.error(f"AI roast error for {character}: {e}")
             return None
     
-    async def get_compliment_response(self, character: str, target_name: str, chat_history: List[Tuple[str, str]] = None) -> Optional[str]:
+    async def get_compliment_response(self, character: str, target_name: str, chat_history: List[Tuple[str, str]] = None,
+                                      user_id: int = None) -> Optional[str]:
         """Generate a character-based compliment"""
         if not self.is_available() or character not in self.config.CHARACTER_PROMPTS:
             return None
@@ -293,14 +452,14 @@ class AIHandler:
             else:
                 prompt = base_prompt
 
-            response_text = await self._generate(prompt)
+            response_text = await self._generate(prompt, Priority.FUN, user_id)
             return response_text.strip()
             
         except Exception as e:
             logger.error(f"AI compliment error for {character}: {e}")
             return None
     
-    async def get_beer_recommendation(self, preferences: str = None) -> Optional[str]:
+    async def get_beer_recommendation(self, preferences: str = None, user_id: int = None) -> Optional[str]:
         """Get AI beer recommendation"""
         if not self.is_available():
             return None
@@ -312,7 +471,7 @@ class AIHandler:
             else:
                 prompt = f"{system_prompt}\n\nThe user wants a beer recommendation. Give them a recommendation in character as Cave Johnson. Perhaps relate it to testing or science."
             
-            response_text = await self._generate(prompt)
+            response_text = await self._cached_generate(prompt, Priority.FUN, user_id)
             return response_text.strip()
             
         except Exception as e:
@@ -323,7 +482,7 @@ class AIHandler:
         """Clear conversation history for a specific user"""
         await self.db.clear_ai_history(user_id)
 
-    async def enhance_image_prompt(self, user_prompt: str) -> str:
+    async def enhance_image_prompt(self, user_prompt: str, user_id: int = None) -> str:
         """
         Check image prompt for safety and enhance it using Gemini.
         Returns:
@@ -350,7 +509,8 @@ class AIHandler:
             
             prompt = f"{system_instruction}\n\nInput: \"{user_prompt}\"\nOutput:"
             
-            result = await self._generate(prompt)
+            # One cached answer per prompt: the safety verdict shouldn't vary between requests
+            result = await self._cached_generate(prompt, Priority.FUN, user_id, variants=1)
             result = result.strip()
             
             # Remove quotes if Ollama adds them
@@ -0,0 +1,204 @@
+"""In-process autocomplete indexes for game titles and tags"""
+
+import heapq
+import logging
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Substring postings are keyed by trigram; shorter queries scan the names.
+GRAM = 3
+# Matches ranked per keystroke, mirroring AUTOCOMPLETE_CANDIDATES in the FTS search
+CANDIDATES = 200
+
+
+class AutocompleteIndex:
+    """
+    Case-insensitive substring search over a set of names.
+
+    Names are kept in a sorted array (prefix matches are a bisect away) plus
+    trigram postings (substring matches). Ranking matches
+    DatabaseHandler.search_game_titles: prefix hits first, then shorter names,
+    then alphabetical, over a bounded candidate set. Adds and removes are
+    reference counted, so the same title existing locally and globally only
+    disappears when both copies are gone.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: List[Optional[str]] = []
+        self._lower: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._refs: Dict[str, int] = {}
+        self._sorted: List[Tuple[str, int]] = []
+        self._postings: Dict[str, List[int]] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+    def add(self, name: str):
+        if not name:
+            return
+        if name in self._ids:
+            self._refs[name] += 1
+            return
+
+        name_id = len(self._names)
+        lower = name.lower()
+        self._names.append(name)
+        self._lower.append(lower)
+        self._ids[name] = name_id
+        self._refs[name] = 1
+        insort(self._sorted, (lower, name_id))
+        for gram in self._grams(lower):
+            self._postings.setdefault(gram, []).append(name_id)
+
+    def remove(self, name: str):
+        if name not in self._ids:
+            return
+        self._refs[name] -= 1
+        if self._refs[name] > 0:
+            return
+
+        name_id = self._ids.pop(name)
+        del self._refs[name]
+        lower = self._lower[name_id]
+        self._names[name_id] = self._lower[name_id] = None
+        del self._sorted[bisect_left(self._sorted, (lower, name_id))]
+        for gram in self._grams(lower):
+            postings = self._postings[gram]
+            postings.remove(name_id)
+            if not postings:
+                del self._postings[gram]
+
+    def rename(self, old: str, new: str):
+        self.remove(old)
+        self.add(new)
+
+    def _prefix_ids(self, query: str) -> List[int]:
+        start = bisect_left(self._sorted, (query,))
+        ids = []
+        # A slice, not islice: islice would step through the list from index 0 to reach start
+        for lower, name_id in self._sorted[start:start + CANDIDATES]:
+            if not lower.startswith(query):
+                break
+            ids.append(name_id)
+        return ids
+
+    def _substring_ids(self, query: str) -> Iterator[int]:
+        if len(query) >= GRAM:
+            # Walk the rarest trigram's postings and confirm the whole query is there
+            postings = [self._postings.get(query[i:i + GRAM], []) for i in range(len(query) - GRAM + 1)]
+            ids = min(postings, key=len)
+        else:
+            ids = (name_id for _, name_id in self._sorted)
+        return (name_id for name_id in ids if query in self._lower[name_id])
+
+    def search(self, query: str, limit: int = 25) -> List[str]:
+        """Names containing `query` (case-insensitive), best matches first."""
+        query = query.strip().lower()
+        if not query:
+            return [self._names[name_id] for _, name_id in self._sorted[:limit]]
+
+        def rank(name_id):
+            name = self._names[name_id]
+            return (len(name), name)
+
+        prefix = self._prefix_ids(query)
+        results = heapq.nsmallest(limit, prefix, key=rank)
+        if len(results) < limit:
+            # Only look at mid-word matches when prefixes don't fill the dropdown
+            seen = set(prefix)
+            others = islice((i for i in self._substring_ids(query) if i not in seen), CANDIDATES)
+            results += heapq.nsmallest(limit - len(results), others, key=rank)
+        return [self._names[name_id] for name_id in results]
+
+
+class GuildAutocomplete:
+    """The title and tag indexes for one guild (its own entries plus global ones)."""
+
+    __slots__ = ("titles", "tags")
+
+    def __init__(self, titles: Iterable[str], tags: Iterable[str]):
+        self.titles = AutocompleteIndex(titles)
+        self.tags = AutocompleteIndex(tags)
+
+
+class AutocompleteCache:
+    """
+    Lazily built per-guild autocomplete indexes, evicted LRU across guilds.
+
+    The first keystroke in a guild loads its titles and tags once; after that
+    GameService keeps the index current on add/update and autocomplete never
+    touches the database.
+    """
+
+    def __init__(self, db, max_guilds: int = 64):
+        self.db = db
+        self.max_guilds = max(1, max_guilds)
+        self._guilds: "OrderedDict[int, GuildAutocomplete]" = OrderedDict()
+        # Bumped on every write and invalidation so a build that raced one isn't cached
+        self._generation = 0
+
+    async def get(self, guild_id: int) -> GuildAutocomplete:
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            self._guilds.move_to_end(guild_id)
+            return index
+
+        generation = self._generation
+        index = GuildAutocomplete(await self.db.get_game_titles(guild_id), await self.db.get_tags(guild_id))
+        if generation != self._generation:
+            return index
+        self._guilds[guild_id] = index
+        if len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+        return index
+
+    async def search_titles(self, guild_id: int, query: str, limit: int = 25) -> List[str]:
+        return (await self.get(guild_id)).titles.search(query, limit)
+
+    async def search_tags(self, guild_id: int, query: str, limit: int = 25) -> List[str]:
+        return (await self.get(guild_id)).tags.search(query, limit)
+
+    def _loaded(self, guild_id: int) -> Iterable[GuildAutocomplete]:
+        # Global (guild 0) entries show up in every guild's index
+        if guild_id == 0:
+            return list(self._guilds.values())
+        index = self._guilds.get(guild_id)
+        return [index] if index is not None else []
+
+    def add_game(self, guild_id: int, title: str, tags: Iterable[str] = ()):
+        # A build still in flight read the database before this write: don't let it be cached
+        self._generation += 1
+        tags = list(tags)
+        for index in self._loaded(guild_id):
+            index.titles.add(title)
+            for tag in tags:
+                # Tag names are unique per guild, so only count each one once
+                if tag not in index.tags:
+                    index.tags.add(tag)
+
+    def rename_game(self, guild_id: int, old_title: str, new_title: str):
+        self._generation += 1
+        for index in self._loaded(guild_id):
+            index.titles.rename(old_title, new_title)
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Drop one guild's indexes, or everything when guild_id is None or the global guild 0."""
+        self._generation += 1
+        if guild_id is None or guild_id == 0:
+            self._guilds.clear()
+        else:
+            self._guilds.pop(guild_id, None)
@@ -1,23 +1,163 @@
 import aiosqlite
+import asyncio
 import logging
 import os
+import random
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Tuple, Optional, Dict
+from itertools import islice
+from typing import List, Tuple, Optional, Dict, Iterable, Any, Sequence, Union
+
+from utils.db_pool import ConnectionPool
+from utils.write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
+# Tag names of one game, as stored in games_fts.tags. The separator keeps
+# trigrams from matching across two neighbouring tag names.
+FTS_TAGS_SQL = "SELECT GROUP_CONCAT(t.name, ' | ') FROM game_tags gt JOIN tags t ON gt.tag_id = t.id WHERE gt.game_id = {game_id}"
+
+# Trigram MATCH needs at least this many characters; shorter searches fall back to LIKE
+FTS_MIN_QUERY_LENGTH = 3
+
+# Optional game columns accepted by bulk_import_games (title/added_by/guild_id are handled separately)
+GAME_COLUMNS = ('category', 'min_players', 'max_players', 'ideal_players', 'status', 'external_rating',
+                'notes', 'release_date', 'release_state', 'last_update', 'store_link')
+
+# Autocomplete ranks at most this many FTS hits before returning Discord's 25
+AUTOCOMPLETE_CANDIDATES = 200
+
+# How many (guild, filter) candidate id lists sample_games() keeps around
+SAMPLE_CACHE_SIZE = 256
+
+# --- Schema Migrations ---
+# Applied in order on top of the base tables created in setup_tables().
+# The highest applied version is stored in PRAGMA user_version, so each
+# migration runs exactly once per database file. Append only; never edit
+# a migration that has already shipped.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Indexes for AI history, wishlist and tag lookups", [
+        # get_ai_history (global): WHERE user_id = ? ORDER BY id DESC.
+        # id is the rowid, which every index already carries in order.
+        "CREATE INDEX IF NOT EXISTS idx_ai_history_user ON ai_history (user_id)",
+        # get_ai_history (local): WHERE user_id = ? AND guild_id = ? ORDER BY id DESC
+        "CREATE INDEX IF NOT EXISTS idx_ai_history_user_guild ON ai_history (user_id, guild_id)",
+        # GiftService.get_wishlist: covers every selected column, so the table is never touched
+        "CREATE INDEX IF NOT EXISTS idx_gifts_user_guild ON gifts (user_id, guild_id, item_name, link, claimed_by)",
+        # Tag filters: tag id -> game ids
+        "CREATE INDEX IF NOT EXISTS idx_game_tags_tag ON game_tags (tag_id, game_id)",
+    ]),
+    (2, "FTS5 trigram index over game titles, notes and tags", [
+        # rowid = games.id. Trigram tokens give case-insensitive substring matching
+        # (same semantics as LIKE '%q%') for queries of 3+ characters.
+        "CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(title, notes, tags, tokenize='trigram')",
+        f"""INSERT INTO games_fts (rowid, title, notes, tags)
+            SELECT g.id, g.title, g.notes, ({FTS_TAGS_SQL.format(game_id='g.id')}) FROM games g""",
+
+        # Keep the index in sync with games...
+        f"""CREATE TRIGGER IF NOT EXISTS games_fts_insert AFTER INSERT ON games BEGIN
+                INSERT INTO games_fts (rowid, title, notes, tags)
+                VALUES (new.id, new.title, new.notes, ({FTS_TAGS_SQL.format(game_id='new.id')}));
+            END""",
+        """CREATE TRIGGER IF NOT EXISTS games_fts_update AFTER UPDATE OF title, notes ON games BEGIN
+                UPDATE games_fts SET title = new.title, notes = new.notes WHERE rowid = new.id;
+            END""",
+        """CREATE TRIGGER IF NOT EXISTS games_fts_delete AFTER DELETE ON games BEGIN
+                DELETE FROM games_fts WHERE rowid = old.id;
+            END""",
+        # ...and with tag links and tag renames
+        f"""CREATE TRIGGER IF NOT EXISTS game_tags_fts_insert AFTER INSERT ON game_tags BEGIN
+                UPDATE games_fts SET tags = ({FTS_TAGS_SQL.format(game_id='new.game_id')}) WHERE rowid = new.game_id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS game_tags_fts_delete AFTER DELETE ON game_tags BEGIN
+                UPDATE games_fts SET tags = ({FTS_TAGS_SQL.format(game_id='old.game_id')}) WHERE rowid = old.game_id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS tags_fts_update AFTER UPDATE OF name ON tags BEGIN
+                UPDATE games_fts SET tags = ({FTS_TAGS_SQL.format(game_id='games_fts.rowid')})
+                WHERE rowid IN (SELECT game_id FROM game_tags WHERE tag_id = new.id);
+            END""",
+    ]),
+    (3, "Index new games in FTS once, after their tags are linked", [
+        # The insert triggers rewrote a game's FTS row on insert and again for every
+        # tag link, which dominated bulk imports. add_game, add_tags_bulk and
+        # bulk_import_games (the only writers of new games and links) now call
+        # _index_games() once per game instead. Update/delete triggers stay.
+        "DROP TRIGGER IF EXISTS games_fts_insert",
+        "DROP TRIGGER IF EXISTS game_tags_fts_insert",
+    ]),
+    (4, "Index games by (title, id) for keyset-paginated library pages", [
+        # The implicit rowid suffix makes this an index on (title, id), so a page
+        # is a range seek that is already in ORDER BY g.title, g.id order.
+        "CREATE INDEX IF NOT EXISTS idx_games_title ON games(title)",
+    ]),
+    (5, "Covering index for loading a guild's ratings into the recommender", [
+        "CREATE INDEX IF NOT EXISTS idx_game_ratings_guild ON game_ratings(guild_id, user_id, game_id, rating)",
+    ]),
+    (6, "Persistent LLM response cache", [
+        # One row per cached variant; cache_key hashes (model, prompt, options)
+        """CREATE TABLE IF NOT EXISTS ai_response_cache (
+            cache_key TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_ai_response_cache_key ON ai_response_cache(cache_key, created_at)",
+        # Expiry sweeps: WHERE created_at < ?
+        "CREATE INDEX IF NOT EXISTS idx_ai_response_cache_created ON ai_response_cache(created_at)",
+    ]),
+    (7, "Rolling per-user conversation summaries", [
+        # last_message_id: the newest ai_history id folded into the summary;
+        # chat context is the summary plus the messages after it
+        """CREATE TABLE IF NOT EXISTS ai_summaries (
+            user_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]),
+]
+
+
+def format_recommendations(rows: List[Dict]) -> str:
+    """Format sampled games into the block the AI reads as its game RAG context."""
+    if not rows:
+        return "DATABASE QUERY RESULT: No simulations found matching those criteria."
+    
+    result_text = "DATABASE QUERY RESULT (Cave Johnson's Approved List):\n"
+    for row in rows:
+        result_text += f"- {row['title']} (Players: {row['min_players']}-{row['max_players']}). Note: {row['notes']}\n"
+    
+    return result_text
+
+
 class DatabaseHandler:
-    def __init__(self, db_path: str = 'data/doodlab.db'):
+    def __init__(self, db_path: str = 'data/doodlab.db', reader_pool_size: int = 4, pragma_profile: str = 'fast'):
         self.db_path = db_path
         if self.db_path != ":memory:":
             os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.pool = ConnectionPool(self.db_path, reader_pool_size, pragma_profile)
+        # Fire-and-forget inserts (chat history, ratings) are batched through here
+        self.writes = WriteBehindQueue(self)
+        # (guild_id, min_players, tag) -> candidate game ids for sample_games(), LRU ordered
+        self._sample_candidates: OrderedDict = OrderedDict()
     
-    def get_connection(self):
-        return aiosqlite.connect(self.db_path)
+    def get_connection(self, readonly: bool = False):
+        """
+        Borrow a pooled connection (the writer unless readonly=True).
+        Before setup_tables() opens the pool, this hands out a one-off connection instead.
+        """
+        if not self.pool.is_open:
+            return aiosqlite.connect(self.db_path)
+        return self.pool.reader() if readonly else self.pool.writer()
+
+    async def close(self):
+        """Flush queued writes and close the connection pool. Called on bot shutdown."""
+        await self.writes.close()
+        await self.pool.close()
     
     async def setup_tables(self):
         """Initialize all database tables, now including the Recreation Repository."""
         try:
+            await self.pool.open()
             async with self.get_connection() as conn:
                 # --- Existing Tables ---
                 await conn.execute('''CREATE TABLE IF NOT EXISTS gifts
@@ -81,10 +221,56 @@ class DatabaseHandler:
                              FOREIGN KEY(tag_id) REFERENCES tags(id) ON DELETE CASCADE)''')
                 
                 await conn.commit()
+
+                await self._run_migrations(conn)
             logger.info("Aperture Science Database Tables Initialized.")
         except Exception as e:
             logger.error(f"Database Initialization Failed: {e}")
 
+    async def _run_migrations(self, conn):
+        """Apply every migration newer than the database's user_version, one transaction each."""
+        async with conn.execute("PRAGMA user_version") as cursor:
+            current_version = (await cursor.fetchone())[0]
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            try:
+                # Explicit BEGIN so DDL and the version bump commit (or roll back) together
+                await conn.execute("BEGIN")
+                for statement in statements:
+                    await conn.execute(statement)
+                # PRAGMA arguments can't be bound; version is a trusted int from MIGRATIONS
+                await conn.execute(f"PRAGMA user_version = {int(version)}")
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                logger.error(f"Schema migration {version} ({description}) failed.")
+                raise
+
+            logger.info(f"Applied schema migration {version}: {description}")
+
+    @staticmethod
+    def _fts_phrase(column: str, term: str) -> str:
+        """Build a column-scoped FTS5 phrase query, with the user's text safely quoted."""
+        return f'{column} : "{term.replace(chr(34), chr(34) * 2)}"'
+
+    def _tag_filter_sql(self, tag: str, game_id_column: str) -> Tuple[str, str]:
+        """SQL predicate (and its parameter) restricting games to those with a tag containing `tag`."""
+        tag = tag.strip()
+        if len(tag) >= FTS_MIN_QUERY_LENGTH:
+            return (f"{game_id_column} IN (SELECT rowid FROM games_fts WHERE games_fts MATCH ?)",
+                    self._fts_phrase("tags", tag))
+
+        # Too short for trigrams; scan tag names instead (there are far fewer tags than games)
+        return (f"""{game_id_column} IN (
+                        SELECT gt.game_id 
+                        FROM game_tags gt 
+                        JOIN tags t ON gt.tag_id = t.id 
+                        WHERE t.name LIKE ?
+                    )""", f"%{tag}%")
+
     # --- Game Methods ---
 
     async def add_game(self, title: str, added_by: int, guild_id: int, tags: Optional[List[str]] = None, **kwargs) -> int:
@@ -103,13 +289,20 @@ class DatabaseHandler:
                         placeholders.append('?')
                 
                 query = f"INSERT INTO games ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
-                cursor = await conn.execute(query, values)
-                game_id = cursor.lastrowid
-                await conn.commit()
-            
-            # Handle tags if provided
-            if tags and game_id:
-                await self.add_tags(game_id, tags, guild_id)
+                try:
+                    cursor = await conn.execute(query, values)
+                    game_id = cursor.lastrowid
+
+                    # Tags ride along in the same transaction as the game itself
+                    if tags and game_id:
+                        await self._attach_tags(conn, {game_id: tags}, guild_id)
+                    await self._index_games(conn, [game_id])
+
+                    await conn.commit()
+                    self._invalidate_game_caches()
+                except Exception:
+                    await conn.rollback()
+                    raise
                 
             return game_id
         except aiosqlite.IntegrityError:
@@ -119,6 +312,86 @@ class DatabaseHandler:
             logger.error(f"Failed to add game: {e}")
             return -1
 
+    async def bulk_import_games(self, records: Iterable[Dict[str, Any]], guild_id: int = 0,
+                                added_by: int = 0, chunk_size: int = 500) -> Dict[str, int]:
+        """
+        Stream game records into the library in chunked transactions.
+
+        Each record is a dict keyed by games column names plus 'title' and an optional
+        'tags' (list or comma separated string). `records` is consumed lazily, so a
+        generator over a huge CSV/JSONL file never sits in memory all at once.
+        Titles that already exist (or repeat within the import) are skipped, not updated.
+        Returns counts: {'inserted', 'duplicates', 'invalid'} (invalid = missing title or failed chunk).
+        """
+        counts = {'inserted': 0, 'duplicates': 0, 'invalid': 0}
+        unknown_columns = set()
+        records = iter(records)
+
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            # Normalize and dedupe within the chunk before touching the database
+            rows: Dict[str, Tuple[tuple, List[str]]] = {}
+            for record in chunk:
+                title = (record.get('title') or '').strip()
+                if not title:
+                    counts['invalid'] += 1
+                    continue
+                if title in rows:
+                    counts['duplicates'] += 1
+                    continue
+
+                unknown_columns.update(set(record) - set(GAME_COLUMNS) - {'title', 'tags'})
+                fields = {col: record.get(col) for col in GAME_COLUMNS}
+                fields['status'] = fields['status'] or 'unknown' # Matches the column default
+
+                tags = record.get('tags') or []
+                if isinstance(tags, str):
+                    tags = tags.split(',')
+                rows[title] = (tuple(fields.values()), tags)
+
+            if not rows:
+                continue
+
+            try:
+                async with self.get_connection() as conn:
+                    placeholders = ', '.join('?' * len(rows))
+                    async with conn.execute(f"SELECT title FROM games WHERE guild_id = ? AND title IN ({placeholders})",
+                                            (guild_id, *rows)) as cursor:
+                        existing = {r[0] for r in await cursor.fetchall()}
+                    new_titles = [t for t in rows if t not in existing]
+
+                    if new_titles:
+                        columns = ('title', 'added_by', 'guild_id') + GAME_COLUMNS
+                        await conn.executemany(
+                            f"INSERT INTO games ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                            [(t, added_by, guild_id, *rows[t][0]) for t in new_titles]
+                        )
+
+                        placeholders = ', '.join('?' * len(new_titles))
+                        async with conn.execute(f"SELECT id, title FROM games WHERE guild_id = ? AND title IN ({placeholders})",
+                                                (guild_id, *new_titles)) as cursor:
+                            ids = {title: game_id for game_id, title in await cursor.fetchall()}
+                        await self._attach_tags(conn, {ids[t]: rows[t][1] for t in new_titles}, guild_id)
+                        await self._index_games(conn, ids.values())
+
+                    await conn.commit()
+                # Only counted once the chunk is committed: a failed chunk counts all of its rows as invalid
+                counts['inserted'] += len(new_titles)
+                counts['duplicates'] += len(existing)
+                self._invalidate_game_caches()
+            except Exception as e:
+                logger.error(f"Bulk import chunk of {len(rows)} games failed: {e}")
+                counts['invalid'] += len(rows)
+
+        if unknown_columns:
+            logger.warning(f"Bulk import ignored unknown fields: {', '.join(sorted(unknown_columns))}")
+        logger.info(f"Bulk import finished: {counts['inserted']} inserted, "
+                    f"{counts['duplicates']} duplicates, {counts['invalid']} invalid.")
+        return counts
+
     async def rate_game(self, game_id: int, user_id: int, guild_id: int, rating: int):
         """Submit a mandatory performance review for a simulation."""
         try:
@@ -129,109 +402,212 @@ class DatabaseHandler:
         except Exception as e:
             logger.error(f"Rating failed: {e}")
 
+    def queue_rating(self, game_id: int, user_id: int, guild_id: int, rating: int):
+        """Queue a rating on the write-behind queue instead of committing it inline."""
+        self.writes.submit("INSERT OR REPLACE INTO game_ratings (game_id, user_id, guild_id, rating) VALUES (?, ?, ?, ?)",
+                           (game_id, user_id, guild_id, rating))
+
     async def add_tags(self, game_id: int, tags: List[str], guild_id: int):
         """Attach classifiction tags to a game using the new normalized schema."""
-        if not tags:
+        await self.add_tags_bulk({game_id: tags}, guild_id)
+
+    async def add_tags_bulk(self, tags_by_game: Dict[int, List[str]], guild_id: int):
+        """Attach tags to many games at once, in a single transaction."""
+        if not any(tags_by_game.values()):
             return
             
         try:
             async with self.get_connection() as conn:
-                for tag in tags:
-                    tag_clean = tag.strip() # maintain case for display, but search might be case-insensitive? 
-                    # Let's keep it simple: Store as provided, UNIQUE constraint might fail if casing differs?
-                    # Best practice: Store normalized or handle "INSERT OR IGNORE" carefully.
-                    # For now, we'll strip.
-                    
-                    # 1. Ensure tag exists in 'tags' table and get its ID
-                    # We use INSERT OR IGNORE then a SELECT to handle concurrency/duplicates
-                    await conn.execute("INSERT OR IGNORE INTO tags (name, guild_id) VALUES (?, ?)", (tag_clean, guild_id))
-                    
-                    # If it was ignored, we still need the ID.
-                    async with conn.execute("SELECT id FROM tags WHERE name = ? AND guild_id = ?", (tag_clean, guild_id)) as cursor:
-                        result = await cursor.fetchone()
-                    
-                    if result:
-                        tag_id = result[0]
-                        # 2. Link game to tag
-                        await conn.execute("INSERT OR IGNORE INTO game_tags (game_id, tag_id) VALUES (?, ?)", (game_id, tag_id))
-                
+                await self._attach_tags(conn, tags_by_game, guild_id)
+                await self._index_games(conn, tags_by_game)
                 await conn.commit()
+            self._invalidate_game_caches()
         except Exception as e:
             logger.error(f"Tagging failed: {e}")
 
+    async def _attach_tags(self, conn, tags_by_game: Dict[int, List[str]], guild_id: int):
+        """
+        Create any missing tags and link them to their games, inside the caller's transaction.
+        Two statements no matter how many games or tags: one executemany to upsert the tag
+        names, one executemany that resolves each tag id and inserts the link in the same step.
+        Callers re-index the affected games with _index_games() afterwards.
+        """
+        # Tags keep the casing they were given; UNIQUE(name, guild_id) dedupes exact repeats
+        links = {(game_id, tag.strip()) for game_id, tags in tags_by_game.items() for tag in tags or [] if tag.strip()}
+        if not links:
+            return
+
+        await conn.executemany(
+            "INSERT OR IGNORE INTO tags (name, guild_id) VALUES (?, ?)",
+            [(name, guild_id) for name in {name for _, name in links}]
+        )
+        await conn.executemany(
+            "INSERT OR IGNORE INTO game_tags (game_id, tag_id) SELECT ?, id FROM tags WHERE name = ? AND guild_id = ?",
+            [(game_id, name, guild_id) for game_id, name in links]
+        )
+
+    async def _index_games(self, conn, game_ids: Iterable[int]):
+        """(Re)write the games_fts rows for these games, inside the caller's transaction."""
+        await conn.executemany(
+            f"""INSERT OR REPLACE INTO games_fts (rowid, title, notes, tags)
+                SELECT g.id, g.title, g.notes, ({FTS_TAGS_SQL.format(game_id='g.id')}) FROM games g WHERE g.id = ?""",
+            [(game_id,) for game_id in game_ids]
+        )
+
+    def _invalidate_game_caches(self):
+        """Forget cached game id lists. Called by every method that adds or changes games/tags."""
+        self._sample_candidates.clear()
+
+    def _library_filter_sql(self, guild_id: int, status_filter: Optional[str] = None,
+                            tag_filter: Optional[Union[str, Sequence[str]]] = None, player_count: Optional[int] = None,
+                            release_state: Optional[str] = None, match_all_tags: bool = True) -> Tuple[str, list]:
+        """WHERE clause (and parameters) shared by get_game_library and count_games."""
+        query = " WHERE g.guild_id IN (?, 0)"
+        params = [guild_id]
+        
+        # Dynamic Filters
+        if status_filter:
+            query += " AND LOWER(g.status) = ?"
+            params.append(status_filter.lower())
+            
+        if release_state:
+            query += " AND LOWER(g.release_state) = ?"
+            params.append(release_state.lower())
+            
+        if player_count is not None:
+            # Find games that support this number of players
+            query += " AND g.min_players <= ? AND g.max_players >= ?"
+            params.append(player_count)
+            params.append(player_count)
+        
+        terms = [tag_filter] if isinstance(tag_filter, str) else list(tag_filter or [])
+        terms = [t for t in terms if t and t.strip()]
+        if terms:
+            # Games linked to a tag whose name contains each (or any) search term
+            clauses = []
+            for term in terms:
+                clause, param = self._tag_filter_sql(term, "g.id")
+                clauses.append(clause)
+                params.append(param)
+            query += " AND (" + (" AND " if match_all_tags else " OR ").join(clauses) + ")"
+        
+        return query, params
+
     async def get_game_library(self, 
                          guild_id: int,
                          status_filter: Optional[str] = None, 
-                         tag_filter: Optional[str] = None, 
+                         tag_filter: Optional[Union[str, Sequence[str]]] = None, 
                          player_count: Optional[int] = None,
-                         release_state: Optional[str] = None) -> List[Dict]:
+                         release_state: Optional[str] = None,
+                         match_all_tags: bool = True,
+                         limit: Optional[int] = None,
+                         after: Optional[Tuple[str, int]] = None,
+                         before: Optional[Tuple[str, int]] = None) -> List[Dict]:
         """
         Retrieve the dossier of games with optional filtering.
         Returns a list of dictionaries containing game data + average rating.
+        
+        `tag_filter` is one search term or a list of them; a game must carry a matching
+        tag for every term, or for any term with match_all_tags=False.
+        
+        Pass `limit` to fetch one page, ordered by (title, id). `after` / `before` take the
+        (title, id) of the last / first game on the current page and return the next /
+        previous page; each page is a range seek on idx_games_title, however deep it is.
         """
         try:
-            async with self.get_connection() as conn:
+            await self.writes.flush() # Pick up any queued ratings
+            async with self.get_connection(readonly=True) as conn:
                 conn.row_factory = aiosqlite.Row # Allows accessing columns by name
                 
-                # Using basic concatenation for the JOIN condition parameter isn't standard SQL binding for identifiers or logic blocks unless we construct the string carefully.
-                # However, we can simply bind the guild_id in the execute call.
-                
+                # Ratings and tags are aggregated per game in correlated subqueries
+                # (each one an index search on the game_id primary key prefix).
+                # Joining both tables in one GROUP BY would multiply every rating by
+                # every tag before AVG/GROUP_CONCAT run, repeating tag names.
                 query = """
                     SELECT g.*, 
-                           AVG(r.rating) as avg_rating,
-                           GROUP_CONCAT(t.name, ', ') as tags
+                           (SELECT AVG(r.rating) FROM game_ratings r WHERE r.game_id = g.id) as avg_rating,
+                           (SELECT COUNT(*) FROM game_ratings r WHERE r.game_id = g.id) as rating_count,
+                           (SELECT GROUP_CONCAT(t.name, ', ')
+                              FROM game_tags gt JOIN tags t ON gt.tag_id = t.id
+                             WHERE gt.game_id = g.id) as tags
                     FROM games g
-                    LEFT JOIN game_ratings r ON g.id = r.game_id
-                    LEFT JOIN game_tags gt ON g.id = gt.game_id
-                    LEFT JOIN tags t ON gt.tag_id = t.id
-                    WHERE g.guild_id IN (?, 0)
                 """
                 
-                params = [guild_id, guild_id] # Start with guild_id for WHERE IN clause (local, global are bound)
-                # Note: SQLite IN (?, 0) naturally takes [guild_id], but let's bind explicitly to just be safe.
-                # Actually, IN (?, 0) is static 0. We just need to pass `guild_id` once.
-                params = [guild_id] 
+                where, params = self._library_filter_sql(guild_id, status_filter, tag_filter, player_count,
+                                                         release_state, match_all_tags)
+                query += where
                 
-                # Dynamic Filters
-                if status_filter:
-                    query += " AND LOWER(g.status) = ?"
-                    params.append(status_filter.lower())
-                    
-                if release_state:
-                    query += " AND LOWER(g.release_state) = ?"
-                    params.append(release_state.lower())
-                    
-                if player_count is not None:
-                    # Find games that support this number of players
-                    query += " AND g.min_players <= ? AND g.max_players >= ?"
-                    params.append(player_count)
-                    params.append(player_count)
+                if after:
+                    query += " AND (g.title, g.id) > (?, ?)"
+                    params.extend(after)
+                elif before:
+                    query += " AND (g.title, g.id) < (?, ?)"
+                    params.extend(before)
                 
-                if tag_filter:
-                    # Subquery to find games linked to a tag with similar name
-                    query += """ AND g.id IN (
-                        SELECT gt.game_id 
-                        FROM game_tags gt 
-                        JOIN tags t ON gt.tag_id = t.id 
-                        WHERE t.name LIKE ?
-                    )"""
-                    params.append(f"%{tag_filter}%")
+                # Walk backwards from `before`, then flip the page back into title order
+                query += " ORDER BY g.title DESC, g.id DESC" if before and not after else " ORDER BY g.title ASC, g.id ASC"
                 
-                query += " GROUP BY g.id ORDER BY g.title ASC"
+                if limit is not None:
+                    query += " LIMIT ?"
+                    params.append(limit)
                 
                 async with conn.execute(query, params) as cursor:
                     rows = await cursor.fetchall()
                 
                 # Convert aiosqlite.Row objects to real dicts
-                return [dict(row) for row in rows]
+                games = [dict(row) for row in rows]
+                if before and not after:
+                    games.reverse()
+                return games
         except Exception as e:
             logger.error(f"Failed to fetch library: {e}")
             return []
 
-    async def update_game(self, title: str, guild_id: int, **kwargs) -> bool:
+    async def count_games(self, 
+                          guild_id: int,
+                          status_filter: Optional[str] = None, 
+                          tag_filter: Optional[Union[str, Sequence[str]]] = None, 
+                          player_count: Optional[int] = None,
+                          release_state: Optional[str] = None,
+                          match_all_tags: bool = True) -> int:
+        """Number of games get_game_library would return for these filters."""
+        try:
+            async with self.get_connection(readonly=True) as conn:
+                where, params = self._library_filter_sql(guild_id, status_filter, tag_filter, player_count,
+                                                         release_state, match_all_tags)
+                async with conn.execute("SELECT COUNT(*) FROM games g" + where, params) as cursor:
+                    return (await cursor.fetchone())[0]
+        except Exception as e:
+            logger.error(f"Failed to count library: {e}")
+            return 0
+
+    async def get_game_id(self, title: str, guild_id: int, include_global: bool = True) -> Optional[int]:
+        """
+        Resolve an exact title to a game id: the guild's own game first, then the global (guild 0) one.
+        Two point lookups on the UNIQUE(title, guild_id) index; never touches the rest of the library.
+        """
+        try:
+            async with self.get_connection(readonly=True) as conn:
+                if include_global:
+                    query = """SELECT COALESCE(
+                                   (SELECT id FROM games WHERE title = ? AND guild_id = ?),
+                                   (SELECT id FROM games WHERE title = ? AND guild_id = 0))"""
+                    params = (title, guild_id, title)
+                else:
+                    query = "SELECT id FROM games WHERE title = ? AND guild_id = ?"
+                    params = (title, guild_id)
+
+                async with conn.execute(query, params) as cursor:
+                    row = await cursor.fetchone()
+                    return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Failed to look up game {title}: {e}")
+            return None
+
+    async def update_game(self, title: str, /, guild_id: int, **kwargs) -> bool:
         """
         Generic update method for game fields.
-        Usage: db.update_game("Factorio", status="playing", min_players=10)
+        Usage: db.update_game("Factorio", guild_id, status="playing", min_players=10, title="Factorio 2")
         """
         try:
             if not kwargs:
@@ -258,16 +634,38 @@ class DatabaseHandler:
                 success = cursor.rowcount > 0
                 await conn.commit()
                 
-                return success
+            if success:
+                self._invalidate_game_caches()
+            return success
         except Exception as e:
             logger.error(f"Failed to update game {title}: {e}")
             return False
 
     async def search_game_titles(self, query: str, guild_id: int) -> List[str]:
-        """Search game titles for autocomplete"""
+        """Search game titles for autocomplete (titles starting with the query rank first)"""
         try:
-            async with self.get_connection() as conn:
-                async with conn.execute("SELECT title FROM games WHERE title LIKE ? AND guild_id IN (?, 0) LIMIT 25", (f'%{query}%', guild_id)) as cursor:
+            query = query.strip()
+            async with self.get_connection(readonly=True) as conn:
+                if len(query) >= FTS_MIN_QUERY_LENGTH:
+                    # Rank a bounded candidate set instead of every match. bm25 would have
+                    # to score every hit for a common word like "the", which costs far more
+                    # than the search itself; prefix hits, then the tightest titles, read
+                    # better in a dropdown anyway.
+                    sql = """
+                        SELECT title FROM (
+                            SELECT g.title FROM games_fts f JOIN games g ON g.id = f.rowid
+                            WHERE games_fts MATCH ? AND g.guild_id IN (?, 0)
+                            LIMIT ?
+                        )
+                        ORDER BY instr(lower(title), lower(?)) = 1 DESC, length(title), title
+                        LIMIT 25
+                    """
+                    params = (self._fts_phrase("title", query), guild_id, AUTOCOMPLETE_CANDIDATES, query)
+                else:
+                    sql = "SELECT title FROM games WHERE title LIKE ? AND guild_id IN (?, 0) LIMIT 25"
+                    params = (f'%{query}%', guild_id)
+
+                async with conn.execute(sql, params) as cursor:
                     rows = await cursor.fetchall()
                 return [r[0] for r in rows]
         except Exception as e:
@@ -283,16 +681,23 @@ class DatabaseHandler:
         except Exception as e:
             logger.error(f"Failed to add AI message: {e}")
 
-    async def get_ai_history(self, user_id: int, guild_id: Optional[int] = None, limit: int = 20) -> List[Tuple[str, str]]:
+    def queue_ai_message(self, user_id: int, guild_id: int, role: str, content: str):
+        """Queue a chat message on the write-behind queue instead of committing it inline."""
+        self.writes.submit("INSERT INTO ai_history (user_id, guild_id, role, content) VALUES (?, ?, ?, ?)",
+                           (user_id, guild_id, role, content))
+
+    async def get_ai_history(self, user_id: int, guild_id: Optional[int] = None, limit: int = 20,
+                             after_id: int = 0) -> List[Tuple[str, str]]:
         try:
-            async with self.get_connection() as conn:
+            await self.writes.flush()
+            async with self.get_connection(readonly=True) as conn:
                 if guild_id is None:
                     # Global Context (All Servers)
-                    async with conn.execute("SELECT role, content FROM ai_history WHERE user_id = ? ORDER BY id DESC LIMIT ?", (user_id, limit)) as cursor:
+                    async with conn.execute("SELECT role, content FROM ai_history WHERE user_id = ? AND id > ? ORDER BY id DESC LIMIT ?", (user_id, after_id, limit)) as cursor:
                         rows = await cursor.fetchall()
                 else:
                     # Local Context (Specific Server)
-                    async with conn.execute("SELECT role, content FROM ai_history WHERE user_id = ? AND guild_id = ? ORDER BY id DESC LIMIT ?", (user_id, guild_id, limit)) as cursor:
+                    async with conn.execute("SELECT role, content FROM ai_history WHERE user_id = ? AND guild_id = ? AND id > ? ORDER BY id DESC LIMIT ?", (user_id, guild_id, after_id, limit)) as cursor:
                         rows = await cursor.fetchall()
                 
                 return list(reversed(rows))
@@ -302,15 +707,207 @@ class DatabaseHandler:
 
     async def clear_ai_history(self, user_id: int):
         try:
+            await self.writes.flush() # Don't let queued messages reappear after the wipe
             async with self.get_connection() as conn:
                 await conn.execute("DELETE FROM ai_history WHERE user_id = ?", (user_id,))
+                await conn.execute("DELETE FROM ai_summaries WHERE user_id = ?", (user_id,))
                 await conn.commit()
         except Exception as e:
             logger.error(f"Failed to clear AI history: {e}")
 
-    async def get_tags(self, guild_id: int) -> List[str]:
+    # --- AI Conversation Summaries ---
+    async def get_ai_messages_after(self, user_id: int, after_id: int = 0, limit: int = 100) -> List[Tuple[int, str, str]]:
+        """(id, role, content) for the oldest `limit` messages of the user's (global) history after `after_id`, oldest first."""
+        try:
+            await self.writes.flush()
+            async with self.get_connection(readonly=True) as conn:
+                async with conn.execute(
+                    "SELECT id, role, content FROM ai_history WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (user_id, after_id, limit)
+                ) as cursor:
+                    return [tuple(r) for r in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to get AI messages: {e}")
+            return []
+
+    async def get_ai_summary(self, user_id: int) -> Optional[Tuple[str, int]]:
+        """(summary, last_message_id) for the user, or None if nothing has been summarized yet."""
+        try:
+            async with self.get_connection(readonly=True) as conn:
+                async with conn.execute(
+                    "SELECT summary, last_message_id FROM ai_summaries WHERE user_id = ?", (user_id,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                    return tuple(row) if row else None
+        except Exception as e:
+            logger.error(f"Failed to get AI summary: {e}")
+            return None
+
+    async def save_ai_summary(self, user_id: int, summary: str, last_message_id: int):
+        try:
+            async with self.get_connection() as conn:
+                # Skipped if the summarized messages were wiped meanwhile (e.g. /clearhistory)
+                await conn.execute("""
+                    INSERT INTO ai_summaries (user_id, summary, last_message_id)
+                    SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM ai_history WHERE id = ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        summary = excluded.summary,
+                        last_message_id = excluded.last_message_id,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (user_id, summary, last_message_id, last_message_id))
+                await conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to save AI summary: {e}")
+
+    # --- AI History Retention ---
+    async def prune_ai_history(self, keep_turns: int, max_age_days: int = 0, batch_size: int = 500) -> int:
+        """
+        Trim ai_history down to the newest `keep_turns` turns (user + model pair) per user,
+        and optionally drop anything older than `max_age_days`.
+        Deletes in batches of `batch_size`, each in its own short transaction, so the
+        writer is never held for long. Returns the number of rows deleted.
+        """
+        deleted = 0
         try:
+            if keep_turns > 0:
+                keep_rows = keep_turns * 2
+
+                async with self.get_connection(readonly=True) as conn:
+                    async with conn.execute(
+                        "SELECT user_id FROM ai_history GROUP BY user_id HAVING COUNT(*) > ?", (keep_rows,)
+                    ) as cursor:
+                        over_limit = [r[0] for r in await cursor.fetchall()]
+
+                for user_id in over_limit:
+                    # Newest id that falls outside the window; everything at or below it goes
+                    async with self.get_connection(readonly=True) as conn:
+                        async with conn.execute(
+                            "SELECT id FROM ai_history WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                            (user_id, keep_rows)
+                        ) as cursor:
+                            row = await cursor.fetchone()
+                    if not row:
+                        continue
+
+                    deleted += await self._delete_in_batches(
+                        "DELETE FROM ai_history WHERE id IN "
+                        "(SELECT id FROM ai_history WHERE user_id = ? AND id <= ? LIMIT ?)",
+                        (user_id, row[0]), batch_size
+                    )
+
+            if max_age_days > 0:
+                # ids grow with time, so only the oldest `batch_size` rows are ever examined.
+                # A short batch means we've reached rows that are still fresh.
+                deleted += await self._delete_in_batches(
+                    "DELETE FROM ai_history WHERE id IN "
+                    "(SELECT id FROM ai_history ORDER BY id LIMIT ?) AND timestamp < datetime('now', ?)",
+                    (f"-{int(max_age_days)} days",), batch_size, limit_first=True
+                )
+        except Exception as e:
+            logger.error(f"Failed to prune AI history: {e}")
+
+        return deleted
+
+    async def _delete_in_batches(self, query: str, params: tuple, batch_size: int, limit_first: bool = False) -> int:
+        """Run a bounded DELETE repeatedly until a batch comes back short."""
+        deleted = 0
+        while True:
+            batch_params = (batch_size, *params) if limit_first else (*params, batch_size)
             async with self.get_connection() as conn:
+                cursor = await conn.execute(query, batch_params)
+                count = cursor.rowcount
+                await conn.commit()
+
+            deleted += count
+            if count < batch_size:
+                return deleted
+            # Let queued chat writes in between batches
+            await asyncio.sleep(0)
+
+    async def incremental_vacuum(self, max_pages: int = 1000) -> bool:
+        """
+        Return up to `max_pages` free pages to the filesystem.
+        Databases created before incremental auto_vacuum was enabled are converted
+        with a one-off full VACUUM first. Returns False if vacuuming failed.
+        """
+        try:
+            async with self.get_connection() as conn:
+                async with conn.execute("PRAGMA auto_vacuum") as cursor:
+                    mode = (await cursor.fetchone())[0]
+
+                if mode != 2:  # 2 = INCREMENTAL
+                    logger.info("Converting database to incremental auto_vacuum (one-off full VACUUM)...")
+                    await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    await conn.execute("VACUUM")
+
+                # incremental_vacuum only frees pages as its result rows are stepped
+                await conn.execute_fetchall(f"PRAGMA incremental_vacuum({int(max_pages)})")
+            return True
+        except Exception as e:
+            logger.error(f"Incremental vacuum failed: {e}")
+            return False
+
+    # --- LLM Response Cache ---
+    async def get_cached_responses(self, cache_key: str, min_created_at: float = 0) -> List[Tuple[str, float]]:
+        """(response, created_at) for every stored variant of a cache key newer than min_created_at, oldest first."""
+        try:
+            await self.writes.flush()
+            async with self.get_connection(readonly=True) as conn:
+                async with conn.execute("""
+                    SELECT response, created_at FROM ai_response_cache
+                    WHERE cache_key = ? AND created_at >= ? ORDER BY created_at
+                """, (cache_key, min_created_at)) as cursor:
+                    return [tuple(r) for r in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to load cached responses: {e}")
+            return []
+
+    def queue_cached_response(self, cache_key: str, response: str, created_at: float):
+        """Persist one response variant through the write-behind queue."""
+        self.writes.submit("INSERT INTO ai_response_cache (cache_key, response, created_at) VALUES (?, ?, ?)",
+                           (cache_key, response, created_at))
+
+    async def prune_response_cache(self, older_than: float, batch_size: int = 500) -> int:
+        """Delete cached responses created before `older_than` (a Unix timestamp). Returns rows deleted."""
+        try:
+            await self.writes.flush()
+            return await self._delete_in_batches(
+                "DELETE FROM ai_response_cache WHERE rowid IN "
+                "(SELECT rowid FROM ai_response_cache WHERE created_at < ? LIMIT ?)",
+                (older_than,), batch_size)
+        except Exception as e:
+            logger.error(f"Failed to prune response cache: {e}")
+            return 0
+
+    async def get_guild_ratings(self, guild_id: int) -> List[Tuple[int, int, int]]:
+        """(user_id, game_id, rating) for every rating given in the guild on a game it can see."""
+        try:
+            await self.writes.flush() # Pick up any queued ratings
+            async with self.get_connection(readonly=True) as conn:
+                async with conn.execute("""
+                    SELECT r.user_id, r.game_id, r.rating
+                    FROM game_ratings r JOIN games g ON g.id = r.game_id
+                    WHERE r.guild_id = ? AND g.guild_id IN (?, 0)
+                """, (guild_id, guild_id)) as cursor:
+                    return [tuple(r) for r in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to load ratings: {e}")
+            return []
+
+    async def get_game_titles(self, guild_id: int) -> List[str]:
+        """Every title visible to the guild (local + global), one entry per game."""
+        try:
+            async with self.get_connection(readonly=True) as conn:
+                async with conn.execute("SELECT title FROM games WHERE guild_id IN (?, 0)", (guild_id,)) as cursor:
+                    rows = await cursor.fetchall()
+                return [r[0] for r in rows]
+        except Exception as e:
+            logger.error(f"Failed to get game titles: {e}")
+            return []
+
+    async def get_tags(self, guild_id: int) -> List[str]:
+        try:
+            async with self.get_connection(readonly=True) as conn:
                 # Get tags across both scopes
                 async with conn.execute("SELECT DISTINCT name FROM tags WHERE guild_id IN (?, 0) ORDER BY name ASC", (guild_id,)) as cursor:
                     rows = await cursor.fetchall()
@@ -319,46 +916,64 @@ class DatabaseHandler:
             logger.error(f"Failed to get tags: {e}")
             return []
 
-    async def recommend_games(self, guild_id: int, min_players: int = 0, tag: Optional[str] = None, limit: int = 5) -> str:
+    async def sample_games(self, guild_id: int, min_players: int = 0, tag: Optional[str] = None, limit: int = 5) -> List[Dict]:
         """
-        Searches the DB and returns a formatted string for the AI to read.
+        Pick up to `limit` random games (local + global) matching the filters.
+
+        The ids matching each (guild, filter) combination are fetched once and cached
+        until a game or tag write invalidates them; after that every call is a
+        random.sample over the cached ids plus one primary key lookup per pick,
+        instead of ORDER BY RANDOM() sorting the whole candidate set.
         """
-        try:
-            async with self.get_connection() as conn:
-                conn.row_factory = aiosqlite.Row
-                
-                query = "SELECT title, min_players, max_players, notes FROM games WHERE guild_id IN (?, 0)"
+        key = (guild_id, min_players, tag.strip().lower() if tag else None)
+        candidates = self._sample_candidates.get(key)
+
+        if candidates is None:
+            async with self.get_connection(readonly=True) as conn:
+                query = "SELECT id FROM games WHERE guild_id IN (?, 0)"
                 params = [guild_id]
-                
+
                 if min_players > 0:
                     query += " AND max_players >= ?"
                     params.append(min_players)
-                
+
                 if tag:
-                    # Sub-query to find games with specific tags
-                    query += """ AND id IN (
-                        SELECT gt.game_id 
-                        FROM game_tags gt 
-                        JOIN tags t ON gt.tag_id = t.id 
-                        WHERE t.name LIKE ?
-                    )"""
-                    params.append(f"%{tag}%")
-                
-                query += " ORDER BY RANDOM() LIMIT ?"
-                params.append(limit)
-                
+                    # Games with a matching tag, via the FTS index
+                    clause, param = self._tag_filter_sql(tag, "id")
+                    query += " AND " + clause
+                    params.append(param)
+
                 async with conn.execute(query, params) as cursor:
-                    rows = await cursor.fetchall()
-                
-                if not rows:
-                    return "DATABASE QUERY RESULT: No simulations found matching those criteria."
-                
-                # Format this into a string the AI can read
-                result_text = "DATABASE QUERY RESULT (Cave Johnson's Approved List):\n"
-                for row in rows:
-                    result_text += f"- {row['title']} (Players: {row['min_players']}-{row['max_players']}). Note: {row['notes']}\n"
-                
-                return result_text
+                    candidates = [r[0] for r in await cursor.fetchall()]
+
+            self._sample_candidates[key] = candidates
+            if len(self._sample_candidates) > SAMPLE_CACHE_SIZE:
+                self._sample_candidates.popitem(last=False)
+        else:
+            self._sample_candidates.move_to_end(key)
+
+        picks = random.sample(candidates, min(limit, len(candidates)))
+        if not picks:
+            return []
+
+        async with self.get_connection(readonly=True) as conn:
+            conn.row_factory = aiosqlite.Row
+            async with conn.execute(
+                f"SELECT id, title, min_players, max_players, notes FROM games WHERE id IN ({', '.join('?' * len(picks))})",
+                picks
+            ) as cursor:
+                rows = {row['id']: dict(row) for row in await cursor.fetchall()}
+
+        # Keep the random order; skip anything deleted behind the cache's back
+        return [rows[game_id] for game_id in picks if game_id in rows]
+
+    async def recommend_games(self, guild_id: int, min_players: int = 0, tag: Optional[str] = None, limit: int = 5) -> str:
+        """
+        Searches the DB and returns a formatted string for the AI to read.
+        """
+        try:
+            rows = await self.sample_games(guild_id, min_players=min_players, tag=tag, limit=limit)
+            return format_recommendations(rows)
                 
         except Exception as e:
             import traceback
@@ -0,0 +1,239 @@
+"""In-memory per-guild cache of the game library"""
+
+import logging
+import random
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from utils.library_index import LibraryFilterIndex, bit_positions
+
+logger = logging.getLogger(__name__)
+
+# Distinct (tag, min_players) filters whose sample candidates are kept per guild
+SAMPLE_FILTERS_PER_GUILD = 32
+
+
+class GuildLibrary:
+    """
+    One guild's library (its own games plus the global guild 0 games), sorted by (title, id).
+
+    Rows are stored as plain tuples sharing a single column list rather than one
+    dict per game; dicts are only built for the rows a caller actually gets back.
+    Filters are answered from a LibraryFilterIndex of bitmaps over row positions,
+    so bit order is title order. The filter bitmaps, the id -> position map and
+    the per-filter sample candidates are all derived from the rows and dropped
+    together whenever a row changes.
+    """
+
+    __slots__ = ("columns", "index", "rows", "_filters", "_positions", "_candidates")
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.columns: Tuple[str, ...] = tuple(rows[0].keys()) if rows else ()
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.columns)}
+        self.rows: List[tuple] = [tuple(row.values()) for row in rows]
+        self._filters: Optional[LibraryFilterIndex] = None
+        self._positions: Optional[Dict[int, int]] = None
+        # (tag, min_players) -> (bitmap, positions) of the rows sample() picks from
+        self._candidates: "OrderedDict[tuple, Tuple[int, List[int]]]" = OrderedDict()
+
+    @property
+    def filters(self) -> LibraryFilterIndex:
+        """Filter bitmaps, built on first use and dropped by patch()."""
+        if self._filters is None:
+            columns = ("status", "release_state", "tags", "min_players", "max_players")
+            self._filters = LibraryFilterIndex(*([self.value(row, c) for row in self.rows] if self.rows else []
+                                                 for c in columns))
+        return self._filters
+
+    @property
+    def positions(self) -> Dict[int, int]:
+        """Row position by game id, built on first use and dropped by patch()."""
+        if self._positions is None:
+            id_col = self.index["id"] if self.rows else 0
+            self._positions = {row[id_col]: i for i, row in enumerate(self.rows)}
+        return self._positions
+
+    def candidates(self, tag: Optional[str] = None, min_players: int = 0) -> Tuple[int, List[int]]:
+        """Bitmap and row positions passing the sample filters, cached per filter."""
+        key = (tag.strip().lower() if tag else None, min_players)
+        cached = self._candidates.get(key)
+        if cached is None:
+            bitmap = self.bitmap(tag_filter=tag, min_players=min_players)
+            cached = self._candidates[key] = (bitmap, list(bit_positions(bitmap)))
+            if len(self._candidates) > SAMPLE_FILTERS_PER_GUILD:
+                self._candidates.popitem(last=False)
+        else:
+            self._candidates.move_to_end(key)
+        return cached
+
+    def value(self, row: tuple, column: str) -> Any:
+        return row[self.index[column]]
+
+    def key(self, row: tuple) -> Tuple[str, int]:
+        return (self.value(row, "title"), self.value(row, "id"))
+
+    def as_dict(self, row: tuple) -> Dict[str, Any]:
+        return dict(zip(self.columns, row))
+
+    def bitmap(self, status_filter: Optional[str] = None, tag_filter: Optional[Union[str, Sequence[str]]] = None,
+               player_count: Optional[int] = None, release_state: Optional[str] = None,
+               match_all_tags: bool = True, min_players: int = 0) -> int:
+        """Rows passing the filters (same semantics as DatabaseHandler.get_game_library) as a bitmap."""
+        tags = [tag_filter] if isinstance(tag_filter, str) else list(tag_filter or [])
+        return self.filters.select(status_filter, release_state, tags, match_all_tags, player_count, min_players)
+
+    def select(self, *args, **kwargs) -> List[tuple]:
+        """Rows passing the filters, in title order."""
+        return [self.rows[i] for i in bit_positions(self.bitmap(*args, **kwargs))]
+
+    def page(self, bitmap: int, limit: int, after: Optional[Tuple[str, int]] = None,
+             before: Optional[Tuple[str, int]] = None) -> List[tuple]:
+        """Keyset page over the rows in `bitmap`, like get_game_library(limit=, after=, before=)."""
+        if before and not after:
+            end = bisect_left(self.rows, tuple(before), key=self.key)
+            positions = list(bit_positions(bitmap & ((1 << end) - 1)))[-limit:]
+        else:
+            start = bisect_right(self.rows, tuple(after), key=self.key) if after else 0
+            positions = [start + i for i in islice(bit_positions(bitmap >> start), limit)]
+        return [self.rows[i] for i in positions]
+
+    def contains(self, row_id: int) -> bool:
+        return row_id in self.positions
+
+    def patch(self, row_id: int, updates: Dict[str, Any]) -> bool:
+        """Apply column updates to one cached row in place. Returns False if it isn't cached."""
+        i = self.positions.get(row_id)
+        if i is None or any(column not in self.index for column in updates):
+            return False
+        values = list(self.rows[i])
+        for column, value in updates.items():
+            values[self.index[column]] = value
+        self.rows[i] = tuple(values)
+        if "title" in updates:
+            self.rows.sort(key=self.key)
+        self._filters = None
+        self._positions = None
+        self._candidates.clear()
+        return True
+
+class GameLibraryCache:
+    """
+    LRU cache of per-guild game libraries sitting in front of DatabaseHandler.
+
+    Writes that go through GameService keep it in sync: updates to a guild's own
+    game are patched in place, anything else (new games, tags, ratings) drops the
+    affected guild. Changes to global (guild 0) games drop every cached guild,
+    since those games appear in all of them.
+    """
+
+    def __init__(self, db, max_guilds: int = 64):
+        self.db = db
+        self.max_guilds = max(1, max_guilds)
+        self._libraries: "OrderedDict[int, GuildLibrary]" = OrderedDict()
+        # Bumped on every write and invalidation so a load that raced one isn't cached
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "guilds": len(self._libraries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def _library(self, guild_id: int) -> GuildLibrary:
+        library = self._libraries.get(guild_id)
+        if library is not None:
+            self.hits += 1
+            self._libraries.move_to_end(guild_id)
+            return library
+
+        self.misses += 1
+        generation = self._generation
+        library = GuildLibrary(await self.db.get_game_library(guild_id))
+        if generation != self._generation:
+            return library
+        self._libraries[guild_id] = library
+        if len(self._libraries) > self.max_guilds:
+            self._libraries.popitem(last=False)
+            self.evictions += 1
+        return library
+
+    async def get_library(self, guild_id: int, status_filter: Optional[str] = None,
+                          tag_filter: Optional[Union[str, Sequence[str]]] = None,
+                          player_count: Optional[int] = None, release_state: Optional[str] = None,
+                          match_all_tags: bool = True) -> List[Dict]:
+        """Filtered library for a guild, ordered by title (same shape as DatabaseHandler.get_game_library)."""
+        library = await self._library(guild_id)
+        rows = library.select(status_filter, tag_filter, player_count, release_state, match_all_tags)
+        return [library.as_dict(row) for row in rows]
+
+    async def get_page(self, guild_id: int, status_filter: Optional[str] = None,
+                       tag_filter: Optional[Union[str, Sequence[str]]] = None,
+                       player_count: Optional[int] = None, release_state: Optional[str] = None,
+                       match_all_tags: bool = True, limit: int = 10,
+                       after: Optional[Tuple[str, int]] = None, before: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """One keyset page of the filtered library (same cursors as DatabaseHandler.get_game_library)."""
+        library = await self._library(guild_id)
+        bitmap = library.bitmap(status_filter, tag_filter, player_count, release_state, match_all_tags)
+        return [library.as_dict(row) for row in library.page(bitmap, limit, after, before)]
+
+    async def count(self, guild_id: int, status_filter: Optional[str] = None,
+                    tag_filter: Optional[Union[str, Sequence[str]]] = None,
+                    player_count: Optional[int] = None, release_state: Optional[str] = None,
+                    match_all_tags: bool = True) -> int:
+        library = await self._library(guild_id)
+        return library.bitmap(status_filter, tag_filter, player_count, release_state, match_all_tags).bit_count()
+
+    async def get_games(self, guild_id: int, game_ids: List[int], min_players: int = 0,
+                        tag: Optional[str] = None) -> List[Dict]:
+        """The given games (in the given order) that are visible to the guild and pass the filters."""
+        library = await self._library(guild_id)
+        bitmap, _ = library.candidates(tag, min_players)
+        positions = (library.positions.get(game_id) for game_id in game_ids)
+        return [library.as_dict(library.rows[i]) for i in positions if i is not None and bitmap >> i & 1]
+
+    async def sample(self, guild_id: int, min_players: int = 0, tag: Optional[str] = None, limit: int = 5,
+                     exclude: Iterable[int] = ()) -> List[Dict]:
+        """
+        Random picks from the cached library (same filters as DatabaseHandler.sample_games).
+
+        Samples `limit` + len(exclude) of the cached candidate positions and drops
+        the excluded ones, so a call costs O(limit + exclude), not O(library).
+        """
+        library = await self._library(guild_id)
+        _, positions = library.candidates(tag, min_players)
+        exclude = set(exclude)
+        picks = random.sample(positions, min(limit + len(exclude), len(positions)))
+        kept = (row for row in map(library.rows.__getitem__, picks) if library.value(row, "id") not in exclude)
+        return [library.as_dict(row) for row in islice(kept, limit)]
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Drop one guild's library, or everything when guild_id is None or the global guild 0."""
+        self._generation += 1
+        if guild_id is None or guild_id == 0:
+            self._libraries.clear()
+        else:
+            self._libraries.pop(guild_id, None)
+
+    def invalidate_game(self, game_id: int):
+        """Drop every cached guild whose library contains the given game."""
+        self._generation += 1
+        for guild_id in [g for g, library in self._libraries.items() if library.contains(game_id)]:
+            del self._libraries[guild_id]
+
+    def patch_game(self, guild_id: int, game_id: int, updates: Dict[str, Any]):
+        """Mirror a successful update_game on a guild's own game into the cache."""
+        # A load still in flight may have read the row before this update
+        self._generation += 1
+        library = self._libraries.get(guild_id)
+        if library is None:
+            return
+        if not library.patch(game_id, updates):
+            self.invalidate(guild_id)
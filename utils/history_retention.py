@@ -0,0 +1,70 @@
+"""Background retention for the ai_history table"""
+
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryRetention:
+    """
+    Periodically trims ai_history to the newest N turns per user (plus optional
+    age-based expiry) and sweeps expired LLM response cache rows, then hands the
+    freed pages back with an incremental vacuum.
+    """
+
+    def __init__(self, db, keep_turns: int = 100, max_age_days: int = 0,
+                 interval_minutes: float = 60, batch_size: int = 500, vacuum_pages: int = 1000,
+                 response_cache=None):
+        self.db = db
+        self.keep_turns = keep_turns
+        self.max_age_days = max_age_days
+        self.interval_seconds = interval_minutes * 60
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.response_cache = response_cache
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_turns > 0 or self.max_age_days > 0 or self.response_cache is not None
+
+    async def run_once(self) -> int:
+        """Run a single prune + vacuum pass. Returns the number of rows deleted (history and cache)."""
+        deleted = await self.db.prune_ai_history(self.keep_turns, self.max_age_days, self.batch_size)
+        if self.response_cache is not None:
+            deleted += await self.response_cache.prune()
+        if deleted:
+            await self.db.incremental_vacuum(self.vacuum_pages)
+            logger.info(f"AI history retention pruned {deleted} rows.")
+        return deleted
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"AI history retention pass failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the background task (no-op if retention is disabled or already running)."""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop(), name="ai-history-retention")
+        logger.info(f"AI history retention started: keep {self.keep_turns} turns/user, "
+                    f"max age {self.max_age_days or 'unlimited'} days, every {self.interval_seconds / 60:g} min")
+
+    async def stop(self):
+        """Cancel the background task and wait for it to wind down."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
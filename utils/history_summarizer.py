@@ -0,0 +1,109 @@
+"""Rolling summaries of long chat histories"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain long-term memory for Cave Johnson, a Discord chatbot.
+Condense the conversation below into a brief summary of what is worth remembering about this user:
+their name or nicknames, preferences, projects, questions they keep coming back to, running jokes.
+Merge it with the previous summary, drop anything stale or trivial, and write plain notes
+(no roleplay) under {max_words} words.
+
+Previous summary:
+{summary}
+
+New conversation:
+{conversation}
+
+Updated summary:"""
+
+
+class HistorySummarizer:
+    """
+    Folds older chat turns into one stored summary per user.
+
+    After each chat turn AIHandler calls `notify`. Once a user has more than
+    `threshold` messages that aren't covered by their summary yet, everything
+    but the newest `keep_recent` is merged into the summary by a low-priority
+    generation, and the summary's last_message_id moves forward. Chat prompts
+    then carry the summary plus only the messages after it, so their size stays
+    flat however long someone has been talking to the bot.
+
+    Keep `threshold` at or below the chat history window, so no message ever
+    falls between the summary and the recent turns.
+    """
+
+    def __init__(self, db, generate: Callable[[str, int], Awaitable[str]], threshold: int = 20,
+                 keep_recent: int = 8, max_words: int = 150, metrics: Optional[Metrics] = None):
+        self.db = db
+        self.generate = generate
+        self.threshold = threshold
+        self.keep_recent = max(0, min(keep_recent, threshold))
+        self.max_words = max_words
+        self.metrics = metrics or default_metrics
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def notify(self, user_id: int):
+        """Summarize the user's history in the background if it has grown past the threshold."""
+        if not self.enabled or user_id in self._tasks:
+            return
+        task = asyncio.create_task(self.summarize(user_id), name=f"ai-summary-{user_id}")
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    async def summarize(self, user_id: int) -> bool:
+        """
+        Fold the user's pending messages into their summary. Each pass reads at most
+        `threshold` + `keep_recent` + 1 of the oldest pending messages and folds at most
+        `threshold` of them, so a long backlog (e.g. a user's first summary) becomes
+        several bounded prompts rather than one huge one. Returns True if the summary was updated.
+        """
+        updated = False
+        try:
+            while await self._fold_once(user_id):
+                updated = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AI history summarization failed for user {user_id}: {e}")
+        return updated
+
+    async def _fold_once(self, user_id: int) -> bool:
+        summary, covered = await self.db.get_ai_summary(user_id) or ("", 0)
+        messages = await self.db.get_ai_messages_after(user_id, covered, limit=self.threshold + self.keep_recent + 1)
+        if len(messages) <= self.threshold:
+            return False
+
+        # Everything here has at least keep_recent newer messages after it
+        older = messages[:min(self.threshold, len(messages) - self.keep_recent)]
+        conversation = "\n".join(f"{role.capitalize()}: {content}" for _, role, content in older)
+        prompt = SUMMARY_PROMPT.format(max_words=self.max_words, summary=summary or "None",
+                                       conversation=conversation)
+        updated = (await self.generate(prompt, user_id)).strip()
+        if not updated:
+            return False
+
+        await self.db.save_ai_summary(user_id, updated, older[-1][0])
+        if await self.db.get_ai_summary(user_id) != (updated, older[-1][0]):
+            return False  # Not saved (history wiped meanwhile, or a database error)
+        self.metrics.incr("llm.summaries")
+        self.metrics.incr("llm.summaries.messages_folded", len(older))
+        logger.info(f"Summarized {len(older)} older messages for user {user_id}")
+        return True
+
+    async def stop(self):
+        """Cancel any summaries still running."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -0,0 +1,143 @@
+"""Bitmap indexes over a cached guild library"""
+
+import operator
+from bisect import bisect_left, bisect_right
+from functools import reduce
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+def bit_positions(bitmap: int) -> Iterator[int]:
+    """Positions of the set bits, lowest first."""
+    bits = bin(bitmap)[:1:-1]  # Least significant bit first, without the '0b'
+    position = bits.find("1")
+    while position != -1:
+        yield position
+        position = bits.find("1", position + 1)
+
+
+def bitmap_from_positions(positions: Iterable[int], size: int) -> int:
+    """Bitmap with the given positions set. Built in a bytearray: OR-ing bits into an int one
+    at a time copies the whole int every time."""
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class PlayerRangeIndex:
+    """
+    Player-count filters as bitmaps over row positions (bit i = the library's i-th row).
+
+    "Supports p players" is min_players <= p AND max_players >= p, a two-sided
+    range no single B-tree serves well. Here it is the AND of two precomputed
+    bitmaps: games whose minimum is <= p (cumulative over the distinct minimums)
+    and games whose maximum is >= p (cumulative over the distinct maximums).
+    Bitmaps are only stored per distinct value, so a max_players of 65535 costs
+    one entry, not 65535. Rows with an unknown min or max never match, like NULL
+    in SQL.
+    """
+
+    __slots__ = ("_min_values", "_min_bitmaps", "_max_values", "_max_bitmaps")
+
+    def __init__(self, mins: Sequence[Optional[int]], maxes: Sequence[Optional[int]]):
+        known = [i for i, (lo, hi) in enumerate(zip(mins, maxes)) if lo is not None and hi is not None]
+        size = len(mins)
+
+        # _min_bitmaps[k]: rows with min_players <= _min_values[k]
+        self._min_values, self._min_bitmaps = self._cumulative(sorted((mins[i], i) for i in known), size)
+
+        # _max_bitmaps[k]: rows with max_players >= _max_values[k]
+        values, bitmaps = self._cumulative(sorted(((maxes[i], i) for i in known), reverse=True), size)
+        self._max_values: List[int] = values[::-1]
+        self._max_bitmaps: List[int] = bitmaps[::-1]
+
+    @staticmethod
+    def _cumulative(entries: List[tuple], size: int) -> tuple:
+        """Walk (value, position) pairs in order, snapshotting the bitmap at the end of each distinct value."""
+        buffer = bytearray((size + 7) // 8)
+        values, bitmaps = [], []
+        for e, (value, position) in enumerate(entries):
+            buffer[position >> 3] |= 1 << (position & 7)
+            if e + 1 == len(entries) or entries[e + 1][0] != value:
+                values.append(value)
+                bitmaps.append(int.from_bytes(buffer, "little"))
+        return values, bitmaps
+
+    def min_at_most(self, players: int) -> int:
+        k = bisect_right(self._min_values, players) - 1
+        return self._min_bitmaps[k] if k >= 0 else 0
+
+    def max_at_least(self, players: int) -> int:
+        k = bisect_left(self._max_values, players)
+        return self._max_bitmaps[k] if k < len(self._max_bitmaps) else 0
+
+    def supports(self, players: int) -> int:
+        """Rows whose player range includes `players`."""
+        return self.min_at_most(players) & self.max_at_least(players)
+
+
+class LibraryFilterIndex:
+    """
+    Every library filter as bitmaps over row positions, so any combination of
+    filters is a handful of integer ANDs/ORs instead of a per-row predicate.
+
+    One bitmap per status, release state and tag name (all case-insensitive),
+    plus a PlayerRangeIndex. A tag search term matches every tag whose name
+    contains it, the same as the SQL path; several terms combine with AND
+    (games carrying all of them) or OR (any of them).
+    """
+
+    __slots__ = ("size", "players", "_status", "_release_state", "_tags")
+
+    def __init__(self, statuses: Sequence[Optional[str]], release_states: Sequence[Optional[str]],
+                 tags: Sequence[Optional[str]], mins: Sequence[Optional[int]], maxes: Sequence[Optional[int]]):
+        self.size = len(statuses)
+        self.players = PlayerRangeIndex(mins, maxes)
+        self._status = self._bitmaps((s,) for s in statuses)
+        self._release_state = self._bitmaps((s,) for s in release_states)
+        # The library stores each game's tags as one "A, B" string
+        self._tags = self._bitmaps((t.split(", ") if t else ()) for t in tags)
+
+    def _bitmaps(self, values_per_row) -> Dict[str, int]:
+        positions: Dict[str, List[int]] = {}
+        for position, values in enumerate(values_per_row):
+            for value in values:
+                if value:
+                    positions.setdefault(value.lower(), []).append(position)
+        return {key: bitmap_from_positions(rows, self.size) for key, rows in positions.items()}
+
+    def tag_names(self) -> List[str]:
+        return sorted(self._tags)
+
+    def _tag_term(self, term: str) -> int:
+        term = term.strip().lower()
+        bitmap = 0
+        for name, tagged in self._tags.items():
+            if term in name:
+                bitmap |= tagged
+        return bitmap
+
+    def select(self, status_filter: Optional[str] = None, release_state: Optional[str] = None,
+               tags: Sequence[str] = (), match_all_tags: bool = True,
+               player_count: Optional[int] = None, min_players: int = 0) -> int:
+        """Bitmap of the rows passing every given filter."""
+        bitmap = (1 << self.size) - 1
+        if status_filter:
+            bitmap &= self._status.get(status_filter.lower(), 0)
+        if release_state:
+            bitmap &= self._release_state.get(release_state.lower(), 0)
+
+        terms = [t for t in tags if t and t.strip()]
+        if terms:
+            tagged = [self._tag_term(t) for t in terms]
+            if match_all_tags:
+                for t in tagged:
+                    bitmap &= t
+            else:
+                bitmap &= reduce(operator.or_, tagged)
+
+        if player_count is not None:
+            bitmap &= self.players.supports(player_count)
+        if min_players > 0:
+            bitmap &= self.players.max_at_least(min_players)
+        return bitmap
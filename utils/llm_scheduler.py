@@ -0,0 +1,122 @@
+"""Admission control for LLM generations: concurrency cap, priorities and per-user fairness"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Deque, Dict, Hashable, Optional
+
+from utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    INTERACTIVE = 0  # Mentions and /ai chat
+    FUN = 1          # Character, roast, compliment, beer and image-prompt commands
+    BACKGROUND = 2   # Maintenance work nobody is waiting on
+
+
+class SchedulerFull(Exception):
+    """Raised instead of queueing when a priority class's queue is already at its limit."""
+
+
+class LLMScheduler:
+    """
+    Lets at most `max_concurrent` generations run at once and queues the rest.
+
+    Queued requests are served strictly by priority class. Within a class,
+    users take turns (round robin), so one person spamming a command waits
+    behind their own requests, not in front of everybody else's. A class whose
+    queue already holds `max_queue` requests rejects new ones immediately with
+    SchedulerFull rather than letting the wait grow unbounded.
+
+    Queue waits are recorded as `llm.queue_wait_ms.<class>` timings.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 20, metrics: Optional[Metrics] = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.metrics = metrics or default_metrics
+        self.active = 0
+        # priority -> user -> waiting futures; the OrderedDict order is the round-robin rotation
+        self._queues: Dict[Priority, "OrderedDict[Hashable, Deque[asyncio.Future]]"] = {
+            p: OrderedDict() for p in Priority
+        }
+        self._queued: Dict[Priority, int] = {p: 0 for p in Priority}
+
+    def queued(self, priority: Optional[Priority] = None) -> int:
+        if priority is None:
+            return sum(self._queued.values())
+        return self._queued[priority]
+
+    def _update_gauges(self):
+        self.metrics.gauge("llm.active", self.active)
+        self.metrics.gauge("llm.queued", self.queued())
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE, user_id: Hashable = None) -> AsyncIterator[None]:
+        """Hold one generation slot for the duration of the block."""
+        await self._acquire(priority, user_id)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority, user_id: Hashable):
+        name = priority.name.lower()
+        if self.active < self.max_concurrent and not self.queued():
+            self.active += 1
+            self.metrics.observe(f"llm.queue_wait_ms.{name}", 0.0)
+            self._update_gauges()
+            return
+
+        if self._queued[priority] >= self.max_queue:
+            self.metrics.incr(f"llm.rejected.{name}")
+            raise SchedulerFull(f"LLM queue for {name} requests is full ({self.max_queue} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(user_id, deque()).append(future)
+        self._queued[priority] += 1
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self._release()
+            else:
+                self._discard(priority, user_id, future)
+            raise
+        self.metrics.observe(f"llm.queue_wait_ms.{name}", (time.perf_counter() - start) * 1000)
+
+    def _discard(self, priority: Priority, user_id: Hashable, future: asyncio.Future):
+        waiting = self._queues[priority].get(user_id)
+        if waiting and future in waiting:
+            waiting.remove(future)
+            self._queued[priority] -= 1
+            if not waiting:
+                del self._queues[priority][user_id]
+        self._update_gauges()
+
+    def _release(self):
+        self.active -= 1
+        for priority, users in self._queues.items():
+            while users:
+                user_id, waiting = next(iter(users.items()))
+                future = waiting.popleft()
+                self._queued[priority] -= 1
+                if waiting:
+                    users.move_to_end(user_id)  # Next turn goes to the next user
+                else:
+                    del users[user_id]
+                if not future.done():
+                    self.active += 1
+                    future.set_result(None)
+                    self._update_gauges()
+                    return
+        self._update_gauges()
@@ -0,0 +1,60 @@
+"""Lightweight in-process metrics: counters, gauges and latency samples"""
+
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# Recent observations kept per timing for percentiles
+SAMPLE_SIZE = 1024
+
+
+class Metrics:
+    """
+    A registry of named counters, gauges and timings (kept as a rolling window
+    of the latest SAMPLE_SIZE observations). Names are dotted strings such as
+    "llm.queue_wait_ms.interactive"; `snapshot` flattens everything for logging
+    or an admin command.
+    """
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, Deque[float]] = {}
+
+    def incr(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        samples = self.timings.get(name)
+        if samples is None:
+            samples = self.timings[name] = deque(maxlen=self.sample_size)
+        samples.append(value)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """The pct-th percentile (0-100) of the recent observations, or None if there are none."""
+        samples = sorted(self.timings.get(name, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def snapshot(self) -> Dict[str, float]:
+        result: Dict[str, float] = dict(self.counters)
+        result.update(self.gauges)
+        for name, samples in self.timings.items():
+            if samples:
+                result[f"{name}.count"] = len(samples)
+                result[f"{name}.p50"] = self.percentile(name, 50)
+                result[f"{name}.p99"] = self.percentile(name, 99)
+        return result
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.timings.clear()
+
+
+# Shared registry used by default across the bot
+metrics = Metrics()
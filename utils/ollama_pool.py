@@ -0,0 +1,146 @@
+"""Health-aware load balancing across several Ollama nodes"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Sequence, Set
+
+import aiohttp
+
+from utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaBackend:
+    """One Ollama node and what the pool knows about it."""
+
+    __slots__ = ("url", "outstanding", "healthy", "models", "failures", "ejected_until")
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        # Models the node has pulled, from its last /api/tags probe; None until probed
+        self.models: Optional[Set[str]] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def has_model(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def __repr__(self) -> str:
+        return f"OllamaBackend({self.url!r}, outstanding={self.outstanding}, healthy={self.healthy})"
+
+
+class OllamaPool:
+    """
+    Routes each generation to the Ollama node with the fewest requests in flight.
+
+    Only nodes that passed their last health probe (GET /api/tags) and are not
+    ejected are considered, and among those the ones that have the requested
+    model pulled are preferred, so a request never waits on a node that would
+    have to download it first. A node whose requests fail `max_failures` times
+    in a row is ejected for `eject_seconds` (passive health checking), in
+    addition to the active probe every `probe_interval` seconds. If every node
+    is down the least-loaded one is tried anyway rather than failing outright.
+    """
+
+    def __init__(self, urls: Sequence[str], probe_interval: float = 30, eject_seconds: float = 30,
+                 max_failures: int = 3, probe_timeout: float = 5, metrics: Optional[Metrics] = None,
+                 clock=time.monotonic):
+        if not urls:
+            raise ValueError("OllamaPool needs at least one URL")
+        self.backends: List[OllamaBackend] = [OllamaBackend(url) for url in urls]
+        self.probe_interval = probe_interval
+        self.eject_seconds = eject_seconds
+        self.max_failures = max(1, max_failures)
+        self.probe_timeout = probe_timeout
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def pick(self, model: str) -> OllamaBackend:
+        now = self.clock()
+        candidates = [b for b in self.backends if b.available(now)] or self.backends
+        with_model = [b for b in candidates if b.has_model(model)]
+        # min() keeps list order on ties, so an idle pool favours the first configured node
+        return min(with_model or candidates, key=lambda b: b.outstanding)
+
+    @asynccontextmanager
+    async def lease(self, model: str) -> AsyncIterator[OllamaBackend]:
+        """Pick a node for one request and track its outcome."""
+        backend = self.pick(model)
+        backend.outstanding += 1
+        self.metrics.incr(f"ollama.requests.{backend.url}")
+        try:
+            yield backend
+        except Exception:
+            self.record_failure(backend)
+            raise
+        else:
+            backend.failures = 0
+        finally:
+            backend.outstanding -= 1
+
+    def record_failure(self, backend: OllamaBackend):
+        backend.failures += 1
+        self.metrics.incr(f"ollama.errors.{backend.url}")
+        if backend.failures >= self.max_failures and self.clock() >= backend.ejected_until:
+            backend.ejected_until = self.clock() + self.eject_seconds
+            self.metrics.incr(f"ollama.ejections.{backend.url}")
+            logger.warning(f"Ejecting Ollama node {backend.url} for {self.eject_seconds:g}s "
+                           f"after {backend.failures} consecutive failures")
+
+    async def probe(self, session: aiohttp.ClientSession):
+        """Check every node's /api/tags once, updating its health and model list."""
+        await asyncio.gather(*(self._probe_one(session, backend) for backend in self.backends))
+
+    async def _probe_one(self, session: aiohttp.ClientSession, backend: OllamaBackend):
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.probe_timeout)
+            async with session.get(f"{backend.url}/api/tags", timeout=timeout) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+            backend.models = {m.get("name") for m in data.get("models", [])}
+            if not backend.healthy:
+                logger.info(f"Ollama node {backend.url} is healthy again")
+            backend.healthy = True
+        except Exception as e:
+            if backend.healthy:
+                logger.warning(f"Ollama node {backend.url} failed its health probe: {e}")
+            backend.healthy = False
+
+    async def _loop(self, session: aiohttp.ClientSession):
+        while True:
+            try:
+                await self.probe(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ollama health probe pass failed: {e}")
+            await asyncio.sleep(self.probe_interval)
+
+    def start(self, session: aiohttp.ClientSession):
+        """Start probing in the background (no-op if already running)."""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop(session), name="ollama-health-probe")
+
+    async def stop(self):
+        """Cancel the probe task and wait for it to wind down."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
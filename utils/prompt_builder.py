@@ -0,0 +1,98 @@
+"""Token-budgeted prompt assembly"""
+
+import logging
+import math
+from typing import Callable, List, Optional, Tuple
+
+from utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English); swap in a real tokenizer where precision matters."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+class PromptBuilder:
+    """
+    Builds a prompt from named sections under a total token budget.
+
+    Sections are kept in the order they're added, joined by blank lines; empty
+    sections and exact repeats of an earlier section are skipped. One section
+    may be a conversation history: after every fixed section is counted, it
+    keeps as many of the newest turns as still fit and drops the oldest. Fixed
+    sections are never cut, so a prompt whose fixed part alone is over budget
+    is sent anyway (with a warning) and the history section is left out.
+
+    `build` records each section's token count as `llm.prompt_tokens.<name>`
+    (plus `.total`) and the number of turns trimmed as `llm.prompt.history_trimmed`.
+    """
+
+    def __init__(self, budget: int, count_tokens: Callable[[str], int] = estimate_tokens,
+                 metrics: Optional[Metrics] = None):
+        self.budget = budget
+        self.count_tokens = count_tokens
+        self.metrics = metrics or default_metrics
+        # (name, text) for fixed sections; (name, None) marks where the history goes
+        self._sections: List[Tuple[str, Optional[str]]] = []
+        self._history_name: Optional[str] = None
+        self._history_header = ""
+        self._history_empty = ""
+        self._turns: List[str] = []
+        self.counts: dict = {}
+        self.trimmed = 0
+
+    def section(self, name: str, text: Optional[str]) -> "PromptBuilder":
+        text = (text or "").strip()
+        if text and all(text != existing for _, existing in self._sections):
+            self._sections.append((name, text))
+        return self
+
+    def history(self, name: str, turns: List[str], header: str, empty: str = "") -> "PromptBuilder":
+        """Place the history here: `header` followed by the `turns` that fit (oldest first), or `empty` if there are none."""
+        self._history_name = name
+        self._history_header = header
+        self._history_empty = empty
+        self._turns = list(turns)
+        self._sections.append((name, None))
+        return self
+
+    def _history_text(self, available: int) -> str:
+        kept: List[str] = []
+        used = self.count_tokens(self._history_header)
+        for turn in reversed(self._turns):
+            cost = self.count_tokens(turn) + 1  # + the newline joining it
+            if used + cost > available:
+                break
+            kept.append(turn)
+            used += cost
+        self.trimmed = len(self._turns) - len(kept)
+        if not self._turns:
+            return self._history_empty
+        if not kept:
+            # There is history, it just didn't fit: leave the section out rather than claim there's none
+            return ""
+        return "\n".join([self._history_header, *reversed(kept)])
+
+    def build(self) -> str:
+        self.counts = {name: self.count_tokens(text) for name, text in self._sections if text is not None}
+        fixed = sum(self.counts.values())
+        if fixed > self.budget:
+            logger.warning(f"Prompt sections use {fixed} tokens, over the {self.budget} token budget")
+
+        parts = []
+        for name, text in self._sections:
+            if text is None:
+                text = self._history_text(max(0, self.budget - fixed))
+                self.counts[name] = self.count_tokens(text)
+                if not text:
+                    continue
+            parts.append(text)
+
+        self.counts["total"] = sum(self.counts.values())
+        for name, tokens in self.counts.items():
+            self.metrics.observe(f"llm.prompt_tokens.{name}", tokens)
+        if self.trimmed:
+            self.metrics.incr("llm.prompt.history_trimmed", self.trimmed)
+        return "\n\n".join(parts)
@@ -0,0 +1,265 @@
+"""Item-item collaborative filtering over the game_ratings table"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Most similar games kept per game
+TOP_K = 20
+# Games scored per matrix product when (re)building, bounding the work matrix to BLOCK_SIZE x games
+BLOCK_SIZE = 512
+# Incremental updates keep each top-K list approximately right; rebuild from scratch after this many
+REBUILD_AFTER = 500
+
+
+class GuildRatingModel:
+    """
+    The user x game rating matrix for one guild plus every game's top-K most similar games.
+
+    Similarity is adjusted cosine: ratings are centred on each user's mean, so a
+    harsh and a generous rater who rank games the same way still look alike, and
+    unrated cells contribute nothing. A new rating only changes the rater's row,
+    so `update` recomputes the similarity rows of the games that user rated and
+    merges those fresh scores into everybody else's top-K instead of redoing the
+    whole games x games product.
+    """
+
+    def __init__(self, ratings: Sequence[Tuple[int, int, int]], top_k: int = TOP_K):
+        self.top_k = top_k
+        self.updates = 0
+
+        users = sorted({user_id for user_id, _, _ in ratings})
+        games = sorted({game_id for _, game_id, _ in ratings})
+        self.user_index = {user_id: i for i, user_id in enumerate(users)}
+        self.game_ids: List[int] = games
+        self.game_index = {game_id: j for j, game_id in enumerate(games)}
+
+        self.ratings = np.zeros((len(users), len(games)), dtype=np.float32)
+        if ratings:
+            rows, cols, values = zip(*((self.user_index[u], self.game_index[g], r) for u, g, r in ratings))
+            self.ratings[list(rows), list(cols)] = values
+
+        self.centred = np.zeros_like(self.ratings)
+        self.unit = np.zeros_like(self.ratings)
+        self.neighbours = np.full((len(games), top_k), -1, dtype=np.int32)
+        self.similarities = np.full((len(games), top_k), -np.inf, dtype=np.float32)
+
+        self._centre(np.arange(len(users)))
+        self._normalise(np.arange(len(games)))
+        for start in range(0, len(games), BLOCK_SIZE):
+            block = np.arange(start, min(start + BLOCK_SIZE, len(games)))
+            self._set_top(block, self._similarities(block))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.ratings.shape
+
+    def _centre(self, rows: np.ndarray):
+        ratings = self.ratings[rows]
+        rated = ratings > 0
+        means = ratings.sum(axis=1) / np.maximum(rated.sum(axis=1), 1)
+        self.centred[rows] = (ratings - means[:, None]) * rated
+
+    def _normalise(self, cols: np.ndarray):
+        columns = self.centred[:, cols]
+        norms = np.linalg.norm(columns, axis=0)
+        self.unit[:, cols] = columns / np.where(norms > 0, norms, 1)
+
+    def _similarities(self, cols: np.ndarray) -> np.ndarray:
+        """Similarity of each game in `cols` to every game (len(cols) x games); self and no-overlap are -inf."""
+        sims = self.unit[:, cols].T @ self.unit
+        sims[sims <= 0] = -np.inf
+        sims[np.arange(len(cols)), cols] = -np.inf
+        return sims
+
+    def _top(self, candidates: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Best top_k (candidate, score) pairs per row, best first, padded with (-1, -inf)."""
+        k = min(self.top_k, scores.shape[1])
+        picked = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, picked, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        picked = np.take_along_axis(picked, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        rows = len(scores)
+        neighbours = np.full((rows, self.top_k), -1, dtype=np.int32)
+        similarities = np.full((rows, self.top_k), -np.inf, dtype=np.float32)
+        neighbours[:, :k] = np.where(np.isfinite(top_scores), np.take_along_axis(candidates, picked, axis=1), -1)
+        similarities[:, :k] = top_scores
+        return neighbours, similarities
+
+    def _set_top(self, rows: np.ndarray, sims: np.ndarray):
+        if not len(rows) or not sims.shape[1]:
+            return
+        candidates = np.broadcast_to(np.arange(sims.shape[1], dtype=np.int32), sims.shape)
+        self.neighbours[rows], self.similarities[rows] = self._top(candidates, sims)
+
+    def _add_user(self, user_id: int) -> int:
+        self.user_index[user_id] = len(self.user_index)
+        blank = np.zeros((1, self.shape[1]), dtype=np.float32)
+        self.ratings = np.vstack([self.ratings, blank])
+        self.centred = np.vstack([self.centred, blank])
+        self.unit = np.vstack([self.unit, blank])
+        return self.user_index[user_id]
+
+    def _add_game(self, game_id: int) -> int:
+        self.game_index[game_id] = len(self.game_ids)
+        self.game_ids.append(game_id)
+        blank = np.zeros((self.shape[0], 1), dtype=np.float32)
+        self.ratings = np.hstack([self.ratings, blank])
+        self.centred = np.hstack([self.centred, blank])
+        self.unit = np.hstack([self.unit, blank])
+        self.neighbours = np.vstack([self.neighbours, np.full((1, self.top_k), -1, dtype=np.int32)])
+        self.similarities = np.vstack([self.similarities, np.full((1, self.top_k), -np.inf, dtype=np.float32)])
+        return self.game_index[game_id]
+
+    def update(self, user_id: int, game_id: int, rating: int):
+        """Apply one (new or changed) rating."""
+        u = self.user_index.get(user_id)
+        if u is None:
+            u = self._add_user(user_id)
+        j = self.game_index.get(game_id)
+        if j is None:
+            j = self._add_game(game_id)
+
+        self.ratings[u, j] = rating
+        self.updates += 1
+
+        # The user's mean moved, so every game they rated has a new centred column
+        touched = np.flatnonzero(self.ratings[u] > 0)
+        self._centre(np.array([u]))
+        self._normalise(touched)
+
+        sims = self._similarities(touched)
+        self._set_top(touched, sims)
+
+        # Everyone else: drop stale entries for the touched games, then let the
+        # fresh scores compete with the rest of their top-K
+        others = np.setdiff1d(np.arange(self.shape[1]), touched)
+        if not len(others):
+            return
+        old_neighbours = self.neighbours[others]
+        old_sims = self.similarities[others].copy()
+        old_sims[np.isin(old_neighbours, touched)] = -np.inf
+
+        candidates = np.hstack([old_neighbours, np.broadcast_to(touched.astype(np.int32), (len(others), len(touched)))])
+        scores = np.hstack([old_sims, sims[:, others].T])
+        self.neighbours[others], self.similarities[others] = self._top(candidates, scores)
+
+    def similar(self, game_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """(game_id, similarity) for the games most like `game_id`."""
+        j = self.game_index.get(game_id)
+        if j is None:
+            return []
+        return [(self.game_ids[n], float(s))
+                for n, s in zip(self.neighbours[j][:limit], self.similarities[j][:limit]) if n >= 0]
+
+    def recommend(self, user_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        (game_id, predicted preference) for games the user hasn't rated, best first.
+        Each rated game votes for its neighbours, weighted by similarity and by how
+        far above or below their own average the user rated it.
+        """
+        u = self.user_index.get(user_id)
+        if u is None:
+            return []
+        rated = np.flatnonzero(self.ratings[u] > 0)
+        weights = self.centred[u, rated]
+        if not weights.any():
+            # Every rating identical (or just one): fall back to the 1-10 scale's midpoint
+            weights = self.ratings[u, rated] - 5.5
+
+        neighbours = self.neighbours[rated]
+        sims = self.similarities[rated]
+        valid = neighbours >= 0
+        scores = np.zeros(self.shape[1], dtype=np.float32)
+        totals = np.zeros(self.shape[1], dtype=np.float32)
+        np.add.at(scores, neighbours[valid], (sims * weights[:, None])[valid])
+        np.add.at(totals, neighbours[valid], sims[valid])
+
+        scores = np.divide(scores, totals, out=np.full_like(scores, -np.inf), where=totals > 0)
+        scores[rated] = -np.inf
+        candidates = np.flatnonzero(scores > 0)
+        best = candidates[np.argsort(-scores[candidates], kind="stable")[:limit]]
+        return [(self.game_ids[j], float(scores[j])) for j in best]
+
+
+class GameRecommender:
+    """
+    Per-guild GuildRatingModels, built lazily from the database and evicted LRU.
+
+    GameService feeds every rating through `record_rating`, which patches a
+    loaded model in place; a model that has drifted through REBUILD_AFTER
+    incremental updates is dropped and rebuilt from the database on next use.
+
+    Builds and updates run in a worker thread, so a guild's lock keeps its
+    recommendations from reading a model halfway through an update.
+    """
+
+    def __init__(self, db, max_guilds: int = 64, top_k: int = TOP_K, rebuild_after: int = REBUILD_AFTER):
+        self.db = db
+        self.max_guilds = max(1, max_guilds)
+        self.top_k = top_k
+        self.rebuild_after = rebuild_after
+        self._models: "OrderedDict[int, GuildRatingModel]" = OrderedDict()
+        self._locks: Dict[int, asyncio.Lock] = {}
+        # Bumped on every rating so a build that raced a write isn't cached
+        self._generation = 0
+
+    async def model(self, guild_id: int) -> GuildRatingModel:
+        model = self._models.get(guild_id)
+        if model is not None:
+            self._models.move_to_end(guild_id)
+            return model
+
+        generation = self._generation
+        ratings = await self.db.get_guild_ratings(guild_id)
+        # The similarity products release the GIL; keep a big build off the event loop
+        model = await asyncio.to_thread(GuildRatingModel, ratings, self.top_k)
+        logger.info(f"Built rating model for guild {guild_id}: {model.shape[0]} users x {model.shape[1]} games")
+        if generation != self._generation:
+            return model
+        self._models[guild_id] = model
+        if len(self._models) > self.max_guilds:
+            self._models.popitem(last=False)
+        return model
+
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        return self._locks.setdefault(guild_id, asyncio.Lock())
+
+    async def record_rating(self, guild_id: int, user_id: int, game_id: int, rating: int):
+        self._generation += 1
+        model = self._models.get(guild_id)
+        if model is None:
+            return
+        # Shielded so a cancelled caller can't release the lock while the thread still writes to the model
+        await asyncio.shield(self._update(guild_id, model, user_id, game_id, rating))
+
+    async def _update(self, guild_id: int, model: GuildRatingModel, user_id: int, game_id: int, rating: int):
+        async with self._lock(guild_id):
+            # A rating costs a (touched games x users x games) product, and a new user or game copies the matrices
+            await asyncio.to_thread(model.update, user_id, game_id, rating)
+        if model.updates >= self.rebuild_after and self._models.get(guild_id) is model:
+            del self._models[guild_id]
+
+    async def recommend_for_user(self, guild_id: int, user_id: int, limit: int = 10) -> List[int]:
+        model = await self.model(guild_id)
+        async with self._lock(guild_id):
+            return [game_id for game_id, _ in model.recommend(user_id, limit)]
+
+    async def similar_games(self, guild_id: int, game_id: int, limit: int = 10) -> List[int]:
+        model = await self.model(guild_id)
+        async with self._lock(guild_id):
+            return [game_id for game_id, _ in model.similar(game_id, limit)]
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        self._generation += 1
+        if guild_id is None:
+            self._models.clear()
+        else:
+            self._models.pop(guild_id, None)
@@ -23,6 +23,10 @@ if os.path.exists(db_path):
         print("Dropping tags...")
         c.execute("DROP TABLE IF EXISTS game_tags")
         c.execute("DROP TABLE IF EXISTS tags")
+        print("Dropping search index...")
+        c.execute("DROP TABLE IF EXISTS games_fts")
+        # Re-run schema migrations against the fresh tables on next startup
+        c.execute("PRAGMA user_version = 0")
         conn.commit()
         print("Tables dropped successfully.")
     except Exception as e:
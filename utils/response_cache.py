@@ -0,0 +1,116 @@
+"""Cache of LLM responses for prompts that are fully determined by their input"""
+
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """The response variants stored under one key, and when the first was generated."""
+
+    __slots__ = ("created_at", "variants")
+
+    def __init__(self, created_at: float, variants: Optional[List[str]] = None):
+        self.created_at = created_at
+        self.variants: List[str] = variants or []
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of generations keyed by a hash of (model, prompt, options).
+
+    With `variants` = K > 1 the cache keeps generating until it holds K distinct
+    responses for a key and only then starts answering, picking one of the K at
+    random, so a repeated /hank propane doesn't say the exact same thing every
+    time. A key expires `ttl_seconds` after its first response was stored.
+
+    Given a DatabaseHandler, every stored variant is also written to the
+    ai_response_cache table (through the write-behind queue), and keys missing
+    from memory are looked up there, so the cache survives restarts.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 86400, variants: int = 1, db=None,
+                 metrics: Optional[Metrics] = None, clock=time.time):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.variants = max(1, variants)
+        self.db = db
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps([model, prompt, options or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, entry: CachedResponse) -> bool:
+        return self.ttl_seconds > 0 and self.clock() - entry.created_at >= self.ttl_seconds
+
+    async def _entry(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None and self.db is not None:
+            min_created = self.clock() - self.ttl_seconds if self.ttl_seconds > 0 else 0
+            rows = await self.db.get_cached_responses(key, min_created)
+            if rows:
+                entry = CachedResponse(rows[0][1], list(dict.fromkeys(response for response, _ in rows)))
+                self._store(key, entry)
+        if entry is not None and self._expired(entry):
+            del self._entries[key]
+            return None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, entry: CachedResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics.incr("llm.cache.evictions")
+
+    async def get(self, key: str, variants: Optional[int] = None) -> Optional[str]:
+        """A cached response, or None if the key is missing, expired, or still collecting variants."""
+        wanted = self.variants if variants is None else max(1, variants)
+        entry = await self._entry(key)
+        if entry is None or len(entry.variants) < wanted:
+            self.metrics.incr("llm.cache.misses")
+            return None
+        self.metrics.incr("llm.cache.hits")
+        return random.choice(entry.variants[:wanted]) if wanted > 1 else entry.variants[0]
+
+    async def put(self, key: str, response: str, variants: Optional[int] = None):
+        if not response:
+            return
+        wanted = self.variants if variants is None else max(1, variants)
+        entry = await self._entry(key)
+        if entry is None:
+            entry = CachedResponse(self.clock())
+            self._store(key, entry)
+        if response in entry.variants or len(entry.variants) >= wanted:
+            return
+        entry.variants.append(response)
+        if self.db is not None:
+            self.db.queue_cached_response(key, response, self.clock())
+
+    async def prune(self) -> int:
+        """Drop expired keys from memory and the database. Returns the number of database rows deleted."""
+        for key in [k for k, entry in self._entries.items() if self._expired(entry)]:
+            del self._entries[key]
+        if self.db is None or self.ttl_seconds <= 0:
+            return 0
+        return await self.db.prune_response_cache(self.clock() - self.ttl_seconds)
+
+    def clear(self):
+        self._entries.clear()
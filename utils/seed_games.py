@@ -1,8 +1,10 @@
 import sqlite3
 import sys
 import io
+import csv
+import json
 import asyncio
-from database import DatabaseHandler
+from utils.database import DatabaseHandler
 
 # Force UTF-8 encoding for stdout
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -186,45 +188,51 @@ def get_unique_tags(manifest):
     # Return a sorted list for better readability
     return sorted(list(unique_tags))
 
-async def seed_database():
+def manifest_records(manifest):
+    """Translate manifest entries (short keys) into games column records for bulk_import_games."""
+    for game in manifest:
+        yield {
+            "title": game["title"],
+            "tags": game.get("tags", []),
+            "min_players": game["min"],
+            "max_players": game["max"],
+            "ideal_players": game["ideal"],
+            "status": game.get("status", "unknown"),
+            "external_rating": game["rating"],
+            "release_date": game["date"],
+            "release_state": game["state"],
+            "notes": game["note"],
+            "store_link": game["link"],
+        }
+
+def load_records(path):
+    """Stream game records from a .csv (header row = column names) or .jsonl file."""
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                # Empty CSV cells mean "not provided", not an empty string
+                yield {key: value for key, value in row.items() if value not in ("", None)}
+    else:
+        raise ValueError(f"Unsupported import format: {path} (expected .csv or .jsonl)")
+
+async def seed_database(records=None):
     print("🔬 Aperture Science Database Hard-Link Protocol Initiated.")
     
     await db.setup_tables()
-    added_count = 0
-    tag_count = 0
-    
-    for game in seed_manifest:
-        # Check if game was successfully added (assuming add_game returns an ID or None)
-        game_id = await db.add_game(
-            title=game["title"],
-            added_by=0, # System
-            guild_id=0, # Global
-            # Note: Depending on your DB schema, tags might need to be a string or list
-            tags=game["tags"], 
-            min_players=game["min"],
-            max_players=game["max"],
-            ideal_players=game["ideal"],
-            # Using the 'status' key we already defined in the manifest
-            status=game.get("status", "unknown"), 
-            external_rating=game["rating"],
-            release_date=game["date"],
-            release_state=game["state"],
-            notes=game["note"],
-            store_link=game["link"]
-        )
-
-        if game_id:
-            added_count += 1
-            # Increment tag count based on the length of the tags list
-            tag_count += len(game.get("tags", []))
-            print(f"✅ Simulation Archived: {game['title']}")
-        else:
-            # This triggers if the game already exists in the DB or fails
-            print(f"⚠️  Duplicate/Error Simulation: {game['title']}")
+
+    # System-owned (added_by 0) entries in the global library (guild 0)
+    counts = await db.bulk_import_games(records if records is not None else manifest_records(seed_manifest),
+                                        guild_id=0, added_by=0)
 
     print("--------------------------------------------------")
-    print(f"🎉 SUCCESS! {added_count} simulations archived.")
-    print(f"🏷️  {tag_count} metadata tags applied.")
+    print(f"🎉 SUCCESS! {counts['inserted']} simulations archived.")
+    print(f"⚠️  {counts['duplicates']} duplicates skipped, {counts['invalid']} invalid entries.")
+    await db.close()
     print("Cave Johnson here—we're done. Get back to work.")
 
 def get_unique_tags(manifest):
@@ -242,6 +250,12 @@ def get_unique_tags(manifest):
     return sorted(list(unique_tags))
 
 if __name__ == "__main__":
+    # Usage: python -m utils.seed_games [games.csv | games.jsonl]
+    # Without a file, the built-in seed_manifest is used.
+    if len(sys.argv) > 1:
+        asyncio.run(seed_database(load_records(sys.argv[1])))
+        sys.exit(0)
+
     # Execute and print
     asyncio.run(seed_database())
     all_tags = get_unique_tags(seed_manifest)
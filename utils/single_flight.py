@@ -0,0 +1,66 @@
+"""Coalesce concurrent identical requests into one in-flight call"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from utils.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; callers arriving while it is in
+    flight await the same result (or exception) instead of starting another.
+
+    The shared call runs as its own task, so one caller being cancelled doesn't
+    cancel it for the others. It is only cancelled when every caller waiting on
+    it has gone away. Counters `<name>.calls` (calls actually made) and
+    `<name>.shared` (callers served by someone else's call, i.e. work saved) are
+    recorded in the metrics registry.
+    """
+
+    def __init__(self, name: str = "singleflight", metrics: Optional[Metrics] = None):
+        self.name = name
+        self.metrics = metrics or default_metrics
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def _finished(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark a failure as seen even if every waiter had already left
+        if not call.task.cancelled():
+            call.task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._finished(key, call))
+            self.metrics.incr(f"{self.name}.calls")
+        else:
+            self.metrics.incr(f"{self.name}.shared")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Last interested caller left: nobody wants the result any more
+                call.task.cancel()
+                if self._calls.get(key) is call:
+                    del self._calls[key]
@@ -0,0 +1,72 @@
+"""Relay a streamed LLM reply into a Discord message that fills in as it generates"""
+
+import logging
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Discord's message length cap
+MESSAGE_LIMIT = 2000
+
+
+async def relay_stream(fragments: AsyncIterator[str], send: Callable[[str], Awaitable],
+                       edit: Callable[[object, str], Awaitable], interval: float = 1.0,
+                       limit: int = MESSAGE_LIMIT, failure_text: Optional[str] = None,
+                       clock: Callable[[], float] = time.monotonic) -> str:
+    """
+    Post the first visible text as soon as it arrives, then keep editing that message.
+
+    `send(text)` posts the message and returns it; `edit(message, text)` updates it.
+    Edits are at most one per `interval` seconds (message edits share a tight
+    per-channel rate limit), fragments arriving in between are batched into the
+    next one, and a final edit always lands the complete text. Returns the full
+    reply, or '' if nothing visible was generated (nothing is sent then).
+
+    If the stream (or sending) fails, the reply is marked with `failure_text`
+    (appended to the partial message, or sent on its own if nothing was posted
+    yet) and the exception is re-raised, so a cut-off reply never passes for a
+    finished one. The stream is always closed before this returns.
+    """
+    text = ""
+    shown = ""
+    message: Optional[object] = None
+    last_edit = 0.0
+
+    try:
+        async with aclosing(fragments):
+            async for fragment in fragments:
+                text += fragment
+                visible = text.strip()[:limit]
+                if not visible:
+                    continue
+                if message is None:
+                    message = await send(visible)
+                    shown, last_edit = visible, clock()
+                elif visible != shown and clock() - last_edit >= interval:
+                    await edit(message, visible)
+                    shown, last_edit = visible, clock()
+    except Exception:
+        if failure_text:
+            await _mark_failed(message, text.strip(), failure_text, send, edit, limit)
+        raise
+
+    visible = text.strip()[:limit]
+    if message is not None and visible != shown:
+        await edit(message, visible)
+    if len(text.strip()) > limit:
+        logger.warning(f"Streamed reply truncated to {limit} characters")
+    return text.strip()
+
+
+async def _mark_failed(message, text: str, failure_text: str, send, edit, limit: int):
+    """Best effort: the original error is what the caller needs to see, not a failure to report it."""
+    try:
+        if message is None:
+            await send(failure_text[:limit])
+        else:
+            suffix = f"\n\n{failure_text}"
+            await edit(message, text[:max(0, limit - len(suffix))] + suffix)
+    except Exception as e:
+        logger.error(f"Failed to mark streamed reply as failed: {e}")
@@ -1,5 +1,5 @@
 import asyncio
-from database import DatabaseHandler
+from utils.database import DatabaseHandler
 
 async def verify():
     db = DatabaseHandler()
@@ -0,0 +1,104 @@
+"""Write-behind batching queue for fire-and-forget database inserts"""
+
+import asyncio
+import logging
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Buffers INSERT-style statements and commits them in one transaction, either
+    every `max_delay` seconds or as soon as `max_batch` statements are waiting.
+
+    Callers don't wait for the commit. Anything that needs to read queued rows
+    should `await flush()` first (DatabaseHandler's read methods do this).
+    """
+
+    def __init__(self, db, max_batch: int = 100, max_delay: float = 0.005):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._buffer: List[Tuple[str, tuple]] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def submit(self, sql: str, params: tuple):
+        """Queue a statement. Returns immediately; the commit happens in the background."""
+        self._buffer.append((sql, params))
+        if len(self._buffer) >= self.max_batch:
+            self._full.set()
+        self._wakeup.set()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="db-write-behind")
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Give the batch a moment to fill up unless it already has
+            if not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    async def flush(self):
+        """Commit everything queued so far."""
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[str, tuple]]):
+        async with self.db.get_connection() as conn:
+            try:
+                # Consecutive runs of the same statement become one executemany,
+                # so submission order is kept across statement types
+                for sql, group in groupby(batch, key=lambda item: item[0]):
+                    await conn.executemany(sql, [params for _, params in group])
+                await conn.commit()
+                return
+            except Exception as e:
+                await conn.rollback()
+                logger.warning(f"Batched write of {len(batch)} statements failed ({e}); retrying one by one.")
+
+            # One bad row shouldn't take the rest of the batch down with it
+            for sql, params in batch:
+                try:
+                    await conn.execute(sql, params)
+                    await conn.commit()
+                except Exception as e:
+                    await conn.rollback()
+                    logger.error(f"Dropped queued write {sql!r} {params!r}: {e}")
+
+    async def close(self):
+        """Stop the background task and flush whatever is left. Called on shutdown."""
+        if self._task is not None:
+            # Hold the lock so the task can't be cancelled halfway through a write
+            async with self._lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()